@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from service.common.clients import get_sns
+from service.common.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Only changes between these statuses are alerted on, a suppressed or unchecked endpoint keeps
+# the status it had
+ALERT_STATUSES = ("online", "offline")
+
+# SNS messages are limited to 256KB, larger runs are split over several publishes
+MAX_MESSAGE_BYTES = 256 * 1024 - 1024
+ALERT_SUBJECT = "Endpoint status changes"
+
+
+class Transition(NamedTuple):
+    id: str
+    url: str
+    previous: str
+    status: str
+    error: str
+    checked_at: int
+
+
+def status_transition(
+    id: str, url: str, previous: Optional[str], status: str, error: str, checked_at: int
+) -> Optional[Transition]:
+    # The first check of an endpoint has nothing to compare against and is not a transition
+    if previous not in ALERT_STATUSES or status not in ALERT_STATUSES or previous == status:
+        return None
+    return Transition(id, url, str(previous), status, error, checked_at)
+
+
+def alert_messages(transitions: Iterable[Transition]) -> Iterator[str]:
+    rows: list[str] = []
+    size = 0
+    for transition in transitions:
+        row = json.dumps(transition._asdict(), separators=(",", ":"))
+        if rows and size + len(row) + 1 > MAX_MESSAGE_BYTES:
+            yield '{"transitions":[' + ",".join(rows) + "]}"
+            rows, size = [], 0
+        rows.append(row)
+        size += len(row) + 1
+    if rows:
+        yield '{"transitions":[' + ",".join(rows) + "]}"
+
+
+def publish_transitions(topic_arn: str, transitions: list[Transition]) -> int:
+    # One publish per run however many endpoints changed. Without a topic, e.g. when running
+    # locally, the messages are only logged. The checker's run summary names the changes too.
+    published = 0
+    for message in alert_messages(transitions):
+        if topic_arn:
+            get_sns().publish(TopicArn=topic_arn, Subject=ALERT_SUBJECT, Message=message)
+        else:
+            logger.info("No alert topic configured, not publishing: %s", message)
+        published += 1
+    logger.info("Published %s status transitions in %s messages", len(transitions), published)
+    return published
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from os import environ
+from threading import Lock
+from typing import TYPE_CHECKING, Optional
+
+from boto3 import Session
+from botocore.config import Config
+
+from service.common.logs import get_logger
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient, DynamoDBServiceResource
+    from mypy_boto3_dynamodb.service_resource import Table
+    from mypy_boto3_sns import SNSClient
+    from mypy_boto3_sqs import SQSClient
+
+
+logger = get_logger(__name__)
+
+# Created once per execution environment and reused by every warm invocation. Building a
+# session, resource and connection pool costs tens of milliseconds, so handlers must not do it
+# per call. Access is locked because the checker resolves tables from its worker threads.
+_lock = Lock()
+_session: Optional[Session] = None
+_dynamodb: Optional[DynamoDBServiceResource] = None
+_dynamodb_client: Optional[DynamoDBClient] = None
+_sqs: dict[Optional[str], SQSClient] = {}
+_sns: Optional[SNSClient] = None
+_tables: dict[str, Table] = {}
+
+
+def get_client_config() -> Config:
+    return Config(
+        tcp_keepalive=environ.get("AWS_CLIENT_TCP_KEEPALIVE", "true").lower() == "true",
+        max_pool_connections=int(environ.get("AWS_CLIENT_MAX_POOL_CONNECTIONS", 16)),
+        connect_timeout=float(environ.get("AWS_CLIENT_CONNECT_TIMEOUT", 2)),
+        read_timeout=float(environ.get("AWS_CLIENT_READ_TIMEOUT", 5)),
+        retries={
+            "mode": environ.get("AWS_CLIENT_RETRY_MODE", "standard"),  # type: ignore
+            "max_attempts": int(environ.get("AWS_CLIENT_MAX_ATTEMPTS", 3)),
+        },
+    )
+
+
+def _get_session() -> Session:
+    global _session
+    if _session is None:
+        _session = Session()
+    return _session
+
+
+def get_home_region() -> Optional[str]:
+    # Probe workers deployed to other regions reach the tables and the alert topic in the home
+    # region, everywhere else the lambda region is used
+    return environ.get("HOME_REGION") or None
+
+
+def get_dynamodb() -> DynamoDBServiceResource:
+    global _dynamodb
+    with _lock:
+        if _dynamodb is None:
+            logger.info("Opening connection to dynamodb")
+            _dynamodb = _get_session().resource(
+                "dynamodb", region_name=get_home_region(), config=get_client_config()
+            )
+        return _dynamodb
+
+
+def get_dynamodb_client() -> DynamoDBClient:
+    # A client of its own, the resource's meta.client carries the resource layer's type
+    # conversion handlers
+    global _dynamodb_client
+    with _lock:
+        if _dynamodb_client is None:
+            logger.info("Opening low-level connection to dynamodb")
+            _dynamodb_client = _get_session().client(
+                "dynamodb", region_name=get_home_region(), config=get_client_config()
+            )
+        return _dynamodb_client
+
+
+def get_table(table_name: str) -> Table:
+    table = _tables.get(table_name)
+    if table is None:
+        dynamodb = get_dynamodb()
+        with _lock:
+            table = _tables.setdefault(table_name, dynamodb.Table(table_name))
+    return table
+
+
+def get_sqs(region_name: Optional[str] = None) -> SQSClient:
+    # One client per region, a queue can only be reached through a client of its own region
+    with _lock:
+        sqs = _sqs.get(region_name)
+        if sqs is None:
+            logger.info("Opening connection to sqs in %s", region_name or "the lambda region")
+            sqs = _sqs[region_name] = _get_session().client(
+                "sqs", region_name=region_name, config=get_client_config()
+            )
+        return sqs
+
+
+def get_sns() -> SNSClient:
+    global _sns
+    with _lock:
+        if _sns is None:
+            logger.info("Opening connection to sns")
+            _sns = _get_session().client(
+                "sns", region_name=get_home_region(), config=get_client_config()
+            )
+        return _sns
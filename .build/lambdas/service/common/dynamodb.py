@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import random
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from threading import Event
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional
+
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb import DynamoDBClient, DynamoDBServiceResource
+    from mypy_boto3_dynamodb.service_resource import Table
+
+# Sparse index holding only active endpoints, keyed on a shard number so reads fan out
+# over several partitions. Changing the shard count requires re-running the backfill.
+ACTIVE_INDEX_NAME = "active-index"
+ACTIVE_INDEX_KEY = "active_shard"
+ACTIVE_INDEX_SHARDS = 8
+
+# Active endpoints sorted by the time their next check is due, shares the active index shards
+DUE_INDEX_NAME = "due-index"
+DUE_INDEX_KEY = "next_check_at"
+
+# Conditional puts in flight at once, within the client's default connection pool
+PUT_CONCURRENCY = 16
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+
+
+def projection(*attributes: str) -> dict[str, Any]:
+    # Placeholders keep attribute names clear of the DynamoDB reserved words
+    return {
+        "ProjectionExpression": ", ".join(f"#{attribute}" for attribute in attributes),
+        "ExpressionAttributeNames": {f"#{attribute}": attribute for attribute in attributes},
+    }
+
+
+def active_shard(id: str) -> int:
+    return zlib.crc32(id.encode()) % ACTIVE_INDEX_SHARDS
+
+
+def scan_pages(table: Table, **scan_kwargs: Any) -> Iterator[list[dict[str, Any]]]:
+    # Yield every page as soon as it arrives instead of collecting the whole table first
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield response.get("Items", [])  # type: ignore
+
+        if "LastEvaluatedKey" not in response:
+            return
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def query_pages(table: Table, **query_kwargs: Any) -> Iterator[list[dict[str, Any]]]:
+    while True:
+        response = table.query(**query_kwargs)
+        yield response.get("Items", [])  # type: ignore
+
+        if "LastEvaluatedKey" not in response:
+            return
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def merge_pages(
+    sources: Iterable[Iterator[list[dict[str, Any]]]],
+) -> Iterator[list[dict[str, Any]]]:
+    # Drain every page source on its own thread and yield pages in arrival order
+    sources = list(sources)
+    if len(sources) == 1:
+        yield from sources[0]
+        return
+
+    pages: Queue[Optional[list[dict[str, Any]]]] = Queue()
+    stop = Event()
+
+    def drain(source: Iterator[list[dict[str, Any]]]) -> None:
+        try:
+            for items in source:
+                if stop.is_set():
+                    return
+                pages.put(items)
+        finally:
+            pages.put(None)
+
+    with ThreadPoolExecutor(max_workers=max(len(sources), 1)) as executor:
+        futures = [executor.submit(drain, source) for source in sources]
+        try:
+            finished = 0
+            while finished < len(sources):
+                items = pages.get()
+                if items is None:
+                    finished += 1
+                else:
+                    yield items
+        finally:
+            stop.set()
+
+        for future in futures:
+            future.result()
+
+
+def parallel_scan_pages(
+    table: Table, total_segments: int, **scan_kwargs: Any
+) -> Iterator[list[dict[str, Any]]]:
+    if total_segments <= 1:
+        return scan_pages(table, **scan_kwargs)
+
+    return merge_pages(
+        scan_pages(table, Segment=segment, TotalSegments=total_segments, **scan_kwargs)
+        for segment in range(total_segments)
+    )
+
+
+def query_active_pages(table: Table, **query_kwargs: Any) -> Iterator[list[dict[str, Any]]]:
+    # Only active endpoints carry the index key, so reads scale with active rows not table size
+    return merge_pages(
+        query_pages(
+            table,
+            IndexName=ACTIVE_INDEX_NAME,
+            KeyConditionExpression=Key(ACTIVE_INDEX_KEY).eq(shard),
+            **query_kwargs,
+        )
+        for shard in range(ACTIVE_INDEX_SHARDS)
+    )
+
+
+def query_due_pages(table: Table, now: int, **query_kwargs: Any) -> Iterator[list[dict[str, Any]]]:
+    # Reads only the endpoints whose next check is due, so a run costs what needs checking
+    return merge_pages(
+        query_pages(
+            table,
+            IndexName=DUE_INDEX_NAME,
+            KeyConditionExpression=Key(ACTIVE_INDEX_KEY).eq(shard) & Key(DUE_INDEX_KEY).lte(now),
+            **query_kwargs,
+        )
+        for shard in range(ACTIVE_INDEX_SHARDS)
+    )
+
+
+def read_active_page(
+    read_shard: Callable[[int, int, Optional[dict[str, Any]]], dict[str, Any]],
+    limit: int,
+    cursor: Optional[dict[str, Any]],
+) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+    # Read up to `limit` active endpoints walking the shards in order. The cursor holds the shard
+    # to continue from and its LastEvaluatedKey, it is None once every shard is exhausted.
+    # `read_shard(shard, limit, start_key)` returns one query response.
+    shard = int(cursor["shard"]) if cursor else 0
+    start_key: Optional[dict[str, Any]] = cursor.get("key") if cursor else None
+
+    items: list[dict[str, Any]] = []
+    while shard < ACTIVE_INDEX_SHARDS and len(items) < limit:
+        response = read_shard(shard, limit - len(items), start_key)
+        items.extend(response.get("Items", []))
+
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            shard += 1
+
+    if shard >= ACTIVE_INDEX_SHARDS:
+        return items, None
+    return items, {"shard": shard, "key": start_key}
+
+
+def query_active_page(
+    table: Table, limit: int, cursor: Optional[dict[str, Any]], **query_kwargs: Any
+) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+    def read_shard(shard: int, limit: int, start_key: Optional[dict[str, Any]]) -> Any:
+        query: dict[str, Any] = {
+            "IndexName": ACTIVE_INDEX_NAME,
+            "KeyConditionExpression": Key(ACTIVE_INDEX_KEY).eq(shard),
+            "Limit": limit,
+            **query_kwargs,
+        }
+        if start_key:
+            query["ExclusiveStartKey"] = start_key
+        return table.query(**query)
+
+    return read_active_page(read_shard, limit, cursor)
+
+
+def plain_number(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+# Reads through the low-level client skip the resource layer's TypeDeserializer, which builds a
+# Decimal for every number. Attribute values are mapped straight to JSON-ready primitives instead,
+# numbers without a fraction become ints. Binary values stay bytes.
+def plain_value(value: dict[str, Any]) -> Any:
+    for kind, data in value.items():
+        if kind == "S" or kind == "BOOL" or kind == "B":
+            return data
+        if kind == "N":
+            return plain_number(data)
+        if kind == "M":
+            return {name: plain_value(attribute) for name, attribute in data.items()}
+        if kind == "L":
+            return [plain_value(element) for element in data]
+        if kind == "NULL":
+            return None
+        if kind == "NS":
+            return [plain_number(element) for element in data]
+        return list(data)
+    raise ValueError("attribute value has no type")
+
+
+def plain_item(item: dict[str, Any]) -> dict[str, Any]:
+    return {name: plain_value(value) for name, value in item.items()}
+
+
+def wire_value(value: Any) -> dict[str, Any]:
+    # The inverse for keys and expression values, which only hold strings and numbers
+    if isinstance(value, str):
+        return {"S": value}
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if value is None:
+        return {"NULL": True}
+    return {"N": str(value)}
+
+
+def query_active_page_plain(
+    client: DynamoDBClient,
+    table_name: str,
+    limit: int,
+    cursor: Optional[dict[str, Any]],
+    **query_kwargs: Any,
+) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+    # query_active_page through the low-level client, items and cursor hold plain values so the
+    # cursor makes the same next_token either way
+    names = {"#shard_key": ACTIVE_INDEX_KEY, **query_kwargs.pop("ExpressionAttributeNames", {})}
+
+    def read_shard(shard: int, limit: int, start_key: Optional[dict[str, Any]]) -> Any:
+        query: dict[str, Any] = {
+            "TableName": table_name,
+            "IndexName": ACTIVE_INDEX_NAME,
+            "KeyConditionExpression": "#shard_key = :shard",
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": {":shard": {"N": str(shard)}},
+            "Limit": limit,
+            **query_kwargs,
+        }
+        if start_key:
+            query["ExclusiveStartKey"] = {name: wire_value(key) for name, key in start_key.items()}
+        response = client.query(**query)
+        page: dict[str, Any] = {"Items": [plain_item(item) for item in response.get("Items", [])]}
+        if "LastEvaluatedKey" in response:
+            page["LastEvaluatedKey"] = plain_item(response["LastEvaluatedKey"])
+        return page
+
+    return read_active_page(read_shard, limit, cursor)
+
+
+def put_new_items(
+    dynamodb: DynamoDBServiceResource,
+    table_name: str,
+    key_name: str,
+    items: list[dict[str, Any]],
+    max_workers: int = PUT_CONCURRENCY,
+) -> dict[str, str]:
+    # Write `items` with one conditional PutItem each, unlike BatchWriteItem a put never
+    # overwrites an item whose key is already taken. Returns the keys that were not written,
+    # mapped to "duplicate" or to the error code of the failed put. Throttled puts are retried
+    # by botocore.
+    client = dynamodb.meta.client
+    serializer = TypeSerializer()
+
+    def put(item: dict[str, Any]) -> Optional[str]:
+        try:
+            client.put_item(
+                TableName=table_name,
+                Item={name: serializer.serialize(value) for name, value in item.items()},
+                ConditionExpression="attribute_not_exists(#key)",
+                ExpressionAttributeNames={"#key": key_name},
+            )
+        except ClientError as err:
+            code = str(err.response["Error"]["Code"])
+            return "duplicate" if code == "ConditionalCheckFailedException" else code
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(min(max_workers, len(items)), 1)) as executor:
+        outcomes = list(executor.map(put, items))
+    return {str(item[key_name]): outcome for item, outcome in zip(items, outcomes) if outcome}
+
+
+def batch_existing_keys(
+    dynamodb: DynamoDBServiceResource,
+    table_name: str,
+    key_name: str,
+    keys: list[str],
+    max_attempts: int = 5,
+    base_delay: float = 0.05,
+) -> tuple[set[str], list[str]]:
+    # Look up `keys` in BatchGetItem chunks of 100 and return the ones already in the table,
+    # along with the keys still unprocessed after the last attempt, which are neither known to
+    # exist nor to be missing. Only the key attribute is projected, so each lookup costs the
+    # minimum read capacity.
+    existing: set[str] = set()
+    unprocessed: list[str] = []
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request: dict[str, Any] = {
+            "Keys": [{key_name: key} for key in keys[start : start + BATCH_GET_SIZE]],
+            **projection(key_name),
+        }
+        for attempt in range(max_attempts):
+            response = dynamodb.batch_get_item(RequestItems={table_name: request})
+            existing.update(str(item[key_name]) for item in response["Responses"][table_name])
+            request = response.get("UnprocessedKeys", {}).get(table_name, {})
+            if not request:
+                break
+            if attempt + 1 < max_attempts:
+                time.sleep(random.uniform(0, min(base_delay * 2**attempt, 1.0)))
+        unprocessed.extend(str(key[key_name]) for key in request.get("Keys", []))
+    return existing, unprocessed
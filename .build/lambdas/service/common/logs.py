@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+import logging
+import random
+import sys
+from os import environ
+from typing import Any, Callable, Optional
+
+# Attributes of every LogRecord, anything else on a record came in through `extra` and is
+# written as a field of its own
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line. The message is only formatted here, so records dropped by the
+    # level or by sampling never pay for building it.
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "timestamp": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (name, value) for name, value in vars(record).items() if name not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class StdoutHandler(logging.StreamHandler):
+    # Writes to whatever sys.stdout is when the record is emitted, like emit_emf, so the log
+    # lines and the metric lines share one stream
+    @property  # type: ignore[override]
+    def stream(self) -> Any:
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value: Any) -> None:
+        pass
+
+
+class SamplingFilter(logging.Filter):
+    # Keeps `rate` of the records below WARNING, warnings and errors are always kept
+    def __init__(self, rate: float, sample: Callable[[], float] = random.random) -> None:
+        super().__init__()
+        self.rate = rate
+        self.sample = sample
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1 or self.sample() < self.rate
+
+
+def get_log_level() -> int:
+    return logging.getLevelName(environ.get("LOG_LEVEL", "INFO").upper())  # type: ignore
+
+
+def get_sample_rate(name: str, default: Optional[float] = None) -> float:
+    # LOG_SAMPLE_RATES maps logger names to rates, e.g. {"service.handlers.urls_get": 0.1}.
+    # Loggers it does not name use `default`, or LOG_SAMPLE_RATE when they have none.
+    rates: dict[str, float] = json.loads(environ.get("LOG_SAMPLE_RATES") or "{}")
+    if name in rates:
+        return float(rates[name])
+    if default is not None:
+        return default
+    return float(environ.get("LOG_SAMPLE_RATE", 1))
+
+
+_handler = StdoutHandler()
+_handler.setFormatter(JsonFormatter())
+
+
+def get_logger(name: str, sample_rate: Optional[float] = None) -> logging.Logger:
+    # Structured, sampled logger writing JSON lines to stdout. Pass arguments rather than
+    # f-strings, logger.info("Stored %s results", count), so skipped records cost no formatting.
+    logger = logging.getLogger(name)
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+        logger.addFilter(SamplingFilter(get_sample_rate(name, sample_rate)))
+        # The Lambda runtime's handler on the root logger would print every record again as text
+        logger.propagate = False
+    logger.setLevel(get_log_level())
+    return logger
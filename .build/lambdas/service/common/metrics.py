@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+import math
+import sys
+import time
+from typing import Iterable, Optional
+
+# Quantiles reported for every latency sketch
+QUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+class QuantileSketch:
+    # Streaming quantile sketch with logarithmic buckets (DDSketch). Every estimate is within
+    # `relative_accuracy` of the true value, memory grows with the logarithm of the value range
+    # rather than the number of samples, and sketches of different runs can be merged.
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3) -> None:
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: QuantileSketch) -> None:
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket in relative terms
+                return 2 * self.gamma**index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+def emf_record(
+    namespace: str,
+    dimensions: dict[str, str],
+    values: dict[str, float],
+    units: dict[str, str],
+) -> dict:
+    # CloudWatch Embedded Metric Format, the log line itself becomes the metric data points so
+    # no PutMetricData calls are needed
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [{"Name": name, "Unit": units.get(name, "None")} for name in values],
+                }
+            ],
+        },
+        **dimensions,
+        **values,
+    }
+
+
+def emit_emf(records: Iterable[dict]) -> None:
+    # EMF lines must reach the log stream as bare JSON, the logging module would prefix them
+    for record in records:
+        sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
@@ -0,0 +1,43 @@
+import base64
+import json
+from decimal import Decimal
+from typing import Any, Optional
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def _to_json(value: Any) -> Any:
+    return int(value) if isinstance(value, Decimal) else str(value)
+
+
+def encode_next_token(cursor: Optional[dict[str, Any]]) -> Optional[str]:
+    # Opaque token handed to the client, built from the LastEvaluatedKey of the page
+    if not cursor:
+        return None
+    payload = json.dumps(cursor, default=_to_json, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_next_token(next_token: Optional[str]) -> Optional[dict[str, Any]]:
+    if not next_token:
+        return None
+    try:
+        start_key = json.loads(base64.urlsafe_b64decode(next_token.encode()))
+    except ValueError as err:
+        raise InvalidPageRequest("next_token is not valid") from err
+    if not isinstance(start_key, dict):
+        raise InvalidPageRequest("next_token is not valid")
+    return start_key  # type: ignore
+
+
+def parse_limit(limit: Optional[str]) -> int:
+    if not limit:
+        return DEFAULT_PAGE_LIMIT
+    if not limit.isdigit() or not 0 < int(limit) <= MAX_PAGE_LIMIT:
+        raise InvalidPageRequest(f"limit must be a number between 1 and {MAX_PAGE_LIMIT}")
+    return int(limit)
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+# Check intervals in seconds. The minimum matches the checker schedule, an endpoint can not be
+# checked more often than the coordinator runs.
+MIN_CHECK_INTERVAL = 60
+MAX_CHECK_INTERVAL = 24 * 60 * 60
+DEFAULT_CHECK_INTERVAL = 5 * 60
+
+# Healthy endpoints double their interval after every successful check, up to this multiple of
+# the configured interval. Failing endpoints are checked this many times more often.
+HEALTHY_BACKOFF_LIMIT = 4
+FAILING_SPEEDUP = 4
+
+
+def next_interval(check_interval: int, current_interval: int, is_online: bool) -> int:
+    if not is_online:
+        return max(check_interval // FAILING_SPEEDUP, MIN_CHECK_INTERVAL)
+    # A recovered endpoint starts again from the configured interval
+    backed_off = max(current_interval, check_interval // 2) * 2
+    return min(backed_off, check_interval * HEALTHY_BACKOFF_LIMIT, MAX_CHECK_INTERVAL)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import bisect
+import json
+import zlib
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Optional
+
+from service.common.dynamodb import ACTIVE_INDEX_SHARDS
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table
+
+# Compact copy of the active endpoints, kept up to date from the endpoint table's stream by the
+# snapshot handler. Every active index shard is one item holding its endpoints as zlib packed
+# JSON, and the version item holds the version of every shard so readers only fetch shards that
+# changed since their last read. The version item is only created once every shard is written.
+SNAPSHOT_KEY = "shard"
+VERSION_SHARD = -1
+
+# DynamoDB items are limited to 400KB, a shard that outgrows this disables the snapshot
+MAX_SHARD_BYTES = 380_000
+
+# target_url and created_at per endpoint id
+SnapshotEntry = tuple[str, int]
+
+
+def version_attribute(shard: int) -> str:
+    return f"v{shard}"
+
+
+def pack_entries(entries: dict[str, SnapshotEntry]) -> bytes:
+    rows = sorted([id, target_url, created_at] for id, (target_url, created_at) in entries.items())
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), 9)
+
+
+def unpack_entries(packed: bytes) -> dict[str, SnapshotEntry]:
+    rows = json.loads(zlib.decompress(packed))
+    return {id: (target_url, int(created_at)) for id, target_url, created_at in rows}
+
+
+class SnapshotReader:
+    # Kept at module level by the handlers, a warm invocation costs one GetItem on the version
+    # item and only re-reads the shards whose version moved
+    def __init__(self) -> None:
+        self.versions: dict[int, int] = {}
+        self.shards: dict[int, dict[str, SnapshotEntry]] = {}
+        self.ids: list[str] = []
+        self.entries: dict[str, SnapshotEntry] = {}
+        self._lock = Lock()
+
+    def refresh(self, table: Table) -> bool:
+        # Returns False while no snapshot has been written or once a shard outgrew its item,
+        # callers then read the table instead
+        item = table.get_item(Key={SNAPSHOT_KEY: VERSION_SHARD}).get("Item")
+        if not item or item.get("disabled"):
+            return False
+
+        with self._lock:
+            changed = False
+            for shard in range(ACTIVE_INDEX_SHARDS):
+                version = int(item.get(version_attribute(shard), 0))  # type: ignore
+                if self.versions.get(shard) == version:
+                    continue
+                shard_item = table.get_item(Key={SNAPSHOT_KEY: shard}).get("Item")
+                packed = bytes(shard_item["endpoints"]) if shard_item else b""  # type: ignore
+                self.shards[shard] = unpack_entries(packed) if packed else {}
+                self.versions[shard] = version
+                changed = True
+
+            if changed:
+                self.entries = {
+                    id: entry for entries in self.shards.values() for id, entry in entries.items()
+                }
+                self.ids = sorted(self.entries)
+        return True
+
+    def page(
+        self, limit: int, cursor: Optional[dict[str, Any]]
+    ) -> tuple[list[tuple[str, str, int]], Optional[dict[str, Any]]]:
+        # Endpoints in id order, the cursor holds the last id returned so pages stay stable while
+        # the snapshot changes between requests
+        with self._lock:
+            start = bisect.bisect_right(self.ids, cursor["after"]) if cursor else 0
+            ids = self.ids[start : start + limit]
+            rows = [(id, *self.entries[id]) for id in ids]
+            more = start + limit < len(self.ids)
+        return rows, {"after": ids[-1]} if more and ids else None
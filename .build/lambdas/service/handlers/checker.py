@@ -0,0 +1,707 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import json
+import ssl
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from decimal import Decimal
+from os import environ
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Mapping, NamedTuple, Optional
+
+from botocore.exceptions import ClientError
+
+from service.common.alerts import Transition, publish_transitions, status_transition
+from service.common.clients import get_sqs, get_table
+from service.common.dynamodb import DUE_INDEX_KEY, projection, query_due_pages
+from service.common.logs import get_logger
+from service.common.metrics import QUANTILES, QuantileSketch, emf_record, emit_emf
+from service.common.regions import (
+    DEFAULT_PROBE_REPLICAS,
+    assigned_regions,
+    quorum_status,
+)
+from service.common.scheduling import DEFAULT_CHECK_INTERVAL, next_interval
+from service.prober.batch import CheckTarget, EndpointBatch
+from service.prober.breaker import CircuitBreaker, HostSuppressed
+from service.prober.connections import ConnectionPool, ParsedUrl, ProbeTimings, parse_url
+from service.prober.probes import (
+    DEFAULT_PROBE,
+    Probe,
+    UnexpectedResponse,
+    check_response,
+    probe_from_item,
+)
+from service.prober.resolver import DNSFailure
+
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import EventBridgeEvent, SQSEvent
+    from mypy_boto3_dynamodb.service_resource import Table
+    from mypy_boto3_sqs import SQSClient
+
+
+logger = get_logger(__name__)
+# One record per run, kept whatever the sampling of the checker's other log lines
+summary_logger = get_logger(f"{__name__}.summary", sample_rate=1)
+
+# Reused across warm invocations, see ConnectionPool and CircuitBreaker
+pool = ConnectionPool()
+breaker = CircuitBreaker()
+
+# A trial probe of a host whose breaker was open only gets a short timeout
+TRIAL_PROBE_TIMEOUT = 1
+
+# SendMessageBatch accepts at most 10 messages per call
+SQS_BATCH_SIZE = 10
+
+# Time kept in reserve to store results, schedule the next checks and return before Lambda
+# kills the invocation
+DEADLINE_SAFETY_MARGIN_MS = 1000
+
+# Probes get the full timeout while the budget allows, closer to the deadline they get what is
+# left, and below the minimum they are not started at all
+PROBE_TIMEOUT = 3
+MIN_PROBE_TIMEOUT = 0.25
+DEADLINE_ERROR = "deadline exceeded before the check completed"
+
+# Verdicts of the probe regions are only needed until the quorum is reached
+VERDICT_RETENTION = 24 * 60 * 60
+
+# Probe latency percentiles and check counts are published per run under this namespace
+METRICS_NAMESPACE = "EndpointChecker"
+
+# The run summary names at most this many endpoints per list, its counts cover all of them
+SUMMARY_SAMPLE_SIZE = 20
+
+
+class CheckResult(NamedTuple):
+    id: str
+    url: str
+    result: bool
+    error: str
+    suppressed: bool = False
+    timings: Optional[ProbeTimings] = None
+    checked: bool = True
+    # What failed: dns, timeout, connect, tls, protocol or response
+    failure: str = ""
+    # Status reported by every probe region, for results agreed on by a quorum of regions
+    regions: Optional[dict[str, str]] = None
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def get_db_table_name() -> str:
+    table_name = str(environ.get("TABLE_NAME"))
+    logger.debug("Loaded dynamodb table: %s", table_name)
+    return table_name
+
+
+def get_results_table_name() -> str:
+    table_name = str(environ.get("RESULTS_TABLE_NAME"))
+    logger.debug("Loaded dynamodb results table: %s", table_name)
+    return table_name
+
+
+def get_results_retention() -> int:
+    retention_days = int(environ.get("RESULTS_RETENTION_DAYS", 30))
+    logger.debug("Loaded results retention: %s days", retention_days)
+    return retention_days * 24 * 60 * 60
+
+
+def get_max_concurrency() -> int:
+    max_concurrency = int(environ.get("CHECK_CONCURRENCY", 32))
+    logger.debug("Loaded check concurrency: %s", max_concurrency)
+    return max_concurrency
+
+
+def get_check_queue_url() -> str:
+    queue_url = environ.get("CHECK_QUEUE_URL", "")
+    logger.debug("Loaded check queue: %s", queue_url or "none, checking in process")
+    return queue_url
+
+
+def get_shard_size() -> int:
+    shard_size = int(environ.get("CHECK_SHARD_SIZE", 100))
+    logger.debug("Loaded check shard size: %s", shard_size)
+    return shard_size
+
+
+def get_alert_topic_arn() -> str:
+    topic_arn = environ.get("ALERT_TOPIC_ARN", "")
+    logger.debug("Loaded alert topic: %s", topic_arn or "none, logging transitions only")
+    return topic_arn
+
+
+def get_probe_regions() -> list[str]:
+    regions = [region for region in environ.get("PROBE_REGIONS", "").split(",") if region]
+    logger.debug("Loaded probe regions: %s", ", ".join(regions) or "none, probing from this region")
+    return regions
+
+
+def get_probe_replicas() -> int:
+    replicas = int(environ.get("PROBE_REPLICAS", DEFAULT_PROBE_REPLICAS))
+    logger.debug("Loaded probe replicas: %s", replicas)
+    return replicas
+
+
+def get_check_queue_urls() -> dict[str, str]:
+    # Check queue per probe region
+    queue_urls: dict[str, str] = json.loads(environ.get("CHECK_QUEUE_URLS", "{}"))
+    logger.debug("Loaded check queues: %s", ", ".join(queue_urls))
+    return queue_urls
+
+
+def get_probe_region() -> str:
+    region = environ.get("PROBE_REGION") or environ.get("AWS_REGION", "local")
+    logger.debug("Loaded probe region: %s", region)
+    return region
+
+
+def get_verdict_table_name() -> str:
+    table_name = str(environ.get("VERDICT_TABLE_NAME"))
+    logger.debug("Loaded dynamodb verdict table: %s", table_name)
+    return table_name
+
+
+def get_deadline(context: Context) -> float:
+    remaining_ms = context.get_remaining_time_in_millis() - DEADLINE_SAFETY_MARGIN_MS
+    return time.monotonic() + max(remaining_ms, 0) / 1000
+
+
+def scan_table(table_name: str, now: int) -> Iterator[CheckTarget]:
+    table: Table = get_table(table_name)
+    pages = query_due_pages(
+        table, now, **projection("id", "target_url", "check_interval", "current_interval", "probe")
+    )
+    for items in pages:
+        for item in items:
+            check_interval = int(item.get("check_interval", DEFAULT_CHECK_INTERVAL))
+            current_interval = int(item.get("current_interval", check_interval))
+            yield CheckTarget(
+                item["id"],
+                item["target_url"],
+                check_interval,
+                current_interval,
+                probe_from_item(item.get("probe")),
+            )
+
+
+def probe_timeout(timeout: float, deadline: Optional[float]) -> float:
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining < MIN_PROBE_TIMEOUT:
+        raise DeadlineExceeded(DEADLINE_ERROR)
+    return min(timeout, remaining)
+
+
+def probe_endpoint(
+    url: str,
+    probe: Probe = DEFAULT_PROBE,
+    timeout: float = PROBE_TIMEOUT,
+    deadline: Optional[float] = None,
+    parsed: Optional[ParsedUrl] = None,
+) -> ProbeTimings:
+    # `parsed` skips parsing `url` again when the caller has done so already
+    error = Exception("unknown error")
+    targets, path = parsed or parse_url(url)
+    path = probe.path or path
+    body_match = probe.body_match.encode() if probe.body_match else b""
+    host = targets[0].host
+    # Raises HostSuppressed while the host keeps failing, that costs no network round trip
+    trial = breaker.acquire(host)
+    if trial:
+        timeout = min(timeout, TRIAL_PROBE_TIMEOUT)
+    truncated = False
+    try:
+        for target in targets:
+            attempt_timeout = probe_timeout(timeout, deadline)
+            truncated = attempt_timeout < timeout
+            try:
+                status, timings, matched = pool.request_timed(
+                    target, probe.method, path, attempt_timeout, body_match
+                )
+                check_response(probe, status, matched)
+                breaker.record_success(host)
+                return timings
+            except DNSFailure as err:
+                # Every target has the same host, the other scheme would fail the same way
+                error = err
+                break
+            except Exception as err:
+                error = err
+        # A probe cut short by the deadline says little about the host
+        if not truncated:
+            breaker.record_failure(host)
+        raise error
+    finally:
+        # A trial that ended without a verdict, out of budget or truncated, must not keep the
+        # host suppressed for good
+        if trial:
+            breaker.release(host)
+
+
+def failure_kind(error: Exception) -> str:
+    if isinstance(error, DNSFailure):
+        return "dns"
+    if isinstance(error, UnexpectedResponse):
+        return "response"
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if isinstance(error, ssl.SSLError):
+        return "tls"
+    if isinstance(error, OSError):
+        return "connect"
+    return "protocol"
+
+
+def check_endpoint(
+    target: CheckTarget, deadline: Optional[float] = None, parsed: Optional[ParsedUrl] = None
+) -> CheckResult:
+    try:
+        timings = probe_endpoint(target.url, probe=target.probe, deadline=deadline, parsed=parsed)
+        return CheckResult(target.id, target.url, True, "", timings=timings)
+    except DeadlineExceeded as err:
+        return CheckResult(target.id, target.url, False, str(err), checked=False)
+    except HostSuppressed as err:
+        return CheckResult(target.id, target.url, False, str(err), suppressed=True)
+    except Exception as err:
+        return CheckResult(target.id, target.url, False, str(err), failure=failure_kind(err))
+
+
+def prefetch_host(host: str) -> None:
+    # Lookups run on the resolver's threads while earlier probes are still in flight, so most
+    # probes find their address cached
+    if host:
+        pool.resolver.prefetch(host)
+
+
+# Probes start while `targets` is still being consumed, so a lazy scan feeds the pool page by
+# page. The targets are collected into `batch`, pass one to look them up by id afterwards. Results
+# keep the order of `targets` with every id checked once, probes not done at the deadline are
+# reported as unchecked.
+def concurrent_check(
+    targets: Iterable[CheckTarget],
+    max_concurrency: int,
+    deadline: float,
+    batch: Optional[EndpointBatch] = None,
+) -> list[CheckResult]:
+    batch = EndpointBatch() if batch is None else batch
+    executor = ThreadPoolExecutor(max_workers=max(max_concurrency, 1))
+    rows = array("I")
+    futures: list[Future[CheckResult]] = []
+    # Endpoints probed the same way share one probe and each get their own result
+    probes: dict[tuple[object, ...], Future[CheckResult]] = {}
+    for target in targets:
+        if time.monotonic() >= deadline:
+            break
+        if target.id in batch:
+            continue
+        row = batch.add(target)
+        key = batch.probe_key(row)
+        if key not in probes:
+            prefetch_host(batch.hosts[row])
+            probes[key] = executor.submit(check_endpoint, target, deadline, batch.parsed(row))
+        rows.append(row)
+        futures.append(probes[key])
+    wait(probes.values(), timeout=max(deadline - time.monotonic(), 0))
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results: list[CheckResult] = []
+    for row, future in zip(rows, futures):
+        id, url = batch.ids[row], batch.urls[row]
+        if future.done() and not future.cancelled():
+            check = future.result()._replace(id=id, url=url)
+        else:
+            check = CheckResult(id, url, False, DEADLINE_ERROR, checked=False)
+        results.append(check)
+    return results
+
+
+def checkpoint_unchecked(results: list[CheckResult]) -> list[CheckResult]:
+    # Unchecked endpoints keep their next_check_at, so they stay in the due index sorted ahead of
+    # everything that became due since and the next run resumes with them. Endpoints the scan did
+    # not reach before the deadline stay due the same way.
+    unchecked = sum(1 for check in results if not check.checked)
+    if unchecked:
+        logger.warning("Deadline reached, %s endpoints carried over to the next run", unchecked)
+    return [check for check in results if check.checked]
+
+
+def shard_targets(targets: Iterable[CheckTarget], shard_size: int) -> Iterator[list[CheckTarget]]:
+    shard: list[CheckTarget] = []
+    for target in targets:
+        shard.append(target)
+        if len(shard) >= shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def target_from_message(endpoint: list[Any]) -> CheckTarget:
+    # CheckTarget serialised as a list, the probe is a nested list and left out by older messages
+    probe = probe_from_item(endpoint[4] if len(endpoint) > 4 else None)
+    return CheckTarget(*endpoint[:4], probe=probe)
+
+
+def send_message_batch(sqs: SQSClient, queue_url: str, entries: list[dict[str, str]]) -> int:
+    response = sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)  # type: ignore
+    for failed in response.get("Failed", []):
+        logger.error("Failed to dispatch shard %s: %s", failed["Id"], failed.get("Message"))
+    return len(response.get("Successful", []))
+
+
+def dispatch_shards(
+    queue_url: str,
+    shards: Iterable[list[CheckTarget]],
+    probe_round: Optional[dict[str, Any]] = None,
+    region_name: Optional[str] = None,
+) -> int:
+    # `probe_round` is added to every message when the shards go out to several probe regions
+    sqs = get_sqs(region_name)
+    dispatched = 0
+    entries: list[dict[str, str]] = []
+    for index, shard in enumerate(shards):
+        body = json.dumps({"endpoints": shard, **(probe_round or {})})
+        entries.append({"Id": str(index), "MessageBody": body})
+        if len(entries) == SQS_BATCH_SIZE:
+            dispatched += send_message_batch(sqs, queue_url, entries)
+            entries = []
+    if entries:
+        dispatched += send_message_batch(sqs, queue_url, entries)
+
+    logger.info("Dispatched %s shards to the check queue %s", dispatched, queue_url)
+    return dispatched
+
+
+def dispatch_regions(
+    queue_urls: dict[str, str],
+    regions: list[str],
+    replicas: int,
+    targets: Iterable[CheckTarget],
+    shard_size: int,
+    now: int,
+) -> int:
+    # Every region only gets the endpoints assigned to it. The round tells the workers which
+    # verdicts belong together and how many regions share each endpoint.
+    assigned: dict[str, list[CheckTarget]] = {region: [] for region in regions}
+    for target in targets:
+        for region in assigned_regions(target.id, regions, replicas):
+            assigned[region].append(target)
+    probe_round = {"round": now, "regions": regions, "replicas": replicas}
+    return sum(
+        dispatch_shards(
+            queue_urls[region], shard_targets(assigned[region], shard_size), probe_round, region
+        )
+        for region in regions
+    )
+
+
+def check_status(check: CheckResult) -> str:
+    if not check.checked:
+        return "unchecked"
+    if check.suppressed:
+        return "suppressed"
+    return "online" if check.result else "offline"
+
+
+def latency_item(timings: ProbeTimings) -> dict[str, Decimal]:
+    # DynamoDB rejects floats, phases a pooled connection skipped are left out
+    return {
+        phase: Decimal(str(round(value, 3)))
+        for phase, value in timings._asdict().items()
+        if value is not None
+    }
+
+
+def store_check_results(table_name: str, results: list[CheckResult]) -> None:
+    table: Table = get_table(table_name)
+    checked_at = int(time.time())
+    expires_at = checked_at + get_results_retention()
+    # batch_writer buffers the puts into BatchWriteItem calls of 25 and resends unprocessed items
+    with table.batch_writer() as batch:
+        for check in results:
+            item = {
+                "endpoint_id": check.id,
+                "checked_at": checked_at,
+                "target_url": check.url,
+                "is_online": check.result,
+                "status": check_status(check),
+                "expires_at": expires_at,
+            }
+            if check.error:
+                item["error"] = check.error
+            if check.timings:
+                item["latency_ms"] = latency_item(check.timings)
+            if check.failure:
+                item["failure"] = check.failure
+            if check.regions:
+                item["regions"] = check.regions
+            batch.put_item(Item=item)
+    logger.debug("Stored %s check results", len(results))
+
+
+def timings_from_item(item: dict[str, Any]) -> ProbeTimings:
+    return ProbeTimings(
+        *(float(item[phase]) if phase in item else None for phase in ProbeTimings._fields)
+    )
+
+
+def aggregate_verdicts(
+    check: CheckResult, status: str, verdicts: dict[str, dict[str, Any]]
+) -> CheckResult:
+    # The regions that agree with the quorum provide the error and the timings, the median of
+    # their total latency stands for the endpoint
+    agreeing = sorted(
+        (region for region, verdict in verdicts.items() if verdict["status"] == status),
+        key=lambda region: float(verdicts[region].get("latency_ms", {}).get("total", 0)),
+    )
+    latency = verdicts[agreeing[len(agreeing) // 2]].get("latency_ms") if agreeing else None
+    error = "; ".join(
+        f"{region}: {verdicts[region]['error']}"
+        for region in sorted(agreeing)
+        if verdicts[region].get("error")
+    )
+    return CheckResult(
+        check.id,
+        check.url,
+        status == "online",
+        error,
+        suppressed=status == "suppressed",
+        timings=timings_from_item(latency) if latency else None,
+        checked=status != "unchecked",
+        regions={region: str(verdict["status"]) for region, verdict in verdicts.items()},
+    )
+
+
+def record_verdicts(
+    table_name: str, region: str, probe_round: dict[str, Any], results: list[CheckResult]
+) -> list[CheckResult]:
+    # Every probe region adds its verdict to the round. The region whose verdict completes the
+    # quorum claims the round and returns the agreed result, every other region returns nothing
+    # for that endpoint.
+    table: Table = get_table(table_name)
+    regions, replicas = list(probe_round["regions"]), int(probe_round["replicas"])
+    expires_at = int(probe_round["round"]) + VERDICT_RETENTION
+
+    def record(check: CheckResult) -> Optional[CheckResult]:
+        verdict: dict[str, Any] = {"status": check_status(check), "error": check.error}
+        if check.timings:
+            verdict["latency_ms"] = latency_item(check.timings)
+        key = {"id": check.id, "round": int(probe_round["round"])}
+        try:
+            response = table.update_item(
+                Key=key,
+                UpdateExpression="SET #region = :verdict, expires_at = :expires",
+                ExpressionAttributeNames={"#region": region},
+                ExpressionAttributeValues={":verdict": verdict, ":expires": expires_at},
+                ReturnValues="ALL_NEW",
+            )
+            item: dict[str, Any] = response["Attributes"]
+            expected = assigned_regions(check.id, regions, replicas)
+            verdicts = {name: item[name] for name in expected if name in item}
+            statuses = {name: str(verdict["status"]) for name, verdict in verdicts.items()}
+            status = quorum_status(statuses, len(expected))
+            if status is None or "decided" in item:
+                return None
+            table.update_item(
+                Key=key,
+                UpdateExpression="SET decided = :region",
+                ConditionExpression="attribute_not_exists(decided)",
+                ExpressionAttributeValues={":region": region},
+            )
+        except ClientError as err:
+            if err.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                logger.error("Failed to record the verdict on %s: %s", check.id, err)
+            return None
+        return aggregate_verdicts(check, status, verdicts)
+
+    with ThreadPoolExecutor(max_workers=max(get_max_concurrency(), 1)) as executor:
+        decided = [check for check in executor.map(record, results) if check]
+    logger.info(
+        "Recorded %s verdicts from %s, %s reached a quorum", len(results), region, len(decided)
+    )
+    return decided
+
+
+def schedule_next_checks(
+    table_name: str, targets: Mapping[str, CheckTarget], results: list[CheckResult], now: int
+) -> list[Transition]:
+    # Returns the endpoints whose status changed since their previous check, the previous status
+    # comes back from the same update that stores the new one
+    table: Table = get_table(table_name)
+
+    def schedule(check: CheckResult) -> Optional[Transition]:
+        target = targets[check.id]
+        status = check_status(check)
+        update = "SET current_interval = :interval, #next_check_at = :next"
+        values: dict[str, Any] = {}
+        # A suppressed check says nothing new about the endpoint, it keeps its interval and status
+        if check.suppressed:
+            interval = target.current_interval
+        else:
+            interval = next_interval(target.check_interval, target.current_interval, check.result)
+            update += ", last_status = :status"
+            values[":status"] = status
+        values.update({":interval": interval, ":next": now + interval})
+        try:
+            # The condition keeps an endpoint deleted meanwhile from being recreated
+            response = table.update_item(
+                Key={"id": check.id},
+                UpdateExpression=update,
+                ConditionExpression="attribute_exists(id)",
+                ExpressionAttributeNames={"#next_check_at": DUE_INDEX_KEY},
+                ExpressionAttributeValues=values,
+                ReturnValues="UPDATED_OLD",
+            )
+        except ClientError as err:
+            if err.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                logger.error("Failed to schedule the next check of %s: %s", check.id, err)
+            return None
+        previous = response.get("Attributes", {}).get("last_status")
+        return status_transition(
+            check.id, check.url, str(previous) if previous else None, status, check.error, now
+        )
+
+    with ThreadPoolExecutor(max_workers=max(get_max_concurrency(), 1)) as executor:
+        scheduled = list(executor.map(schedule, results))
+    logger.debug("Scheduled the next check of %s endpoints", len(results))
+    return [transition for transition in scheduled if transition]
+
+
+def report_run_metrics(results: list[CheckResult], started: float) -> None:
+    sketches = {phase: QuantileSketch() for phase in ProbeTimings._fields}
+    for check in results:
+        if check.timings:
+            for phase, value in check.timings._asdict().items():
+                if value is not None:
+                    sketches[phase].add(value)
+
+    values: dict[str, float] = {}
+    units: dict[str, str] = {}
+    for phase, sketch in sketches.items():
+        for name, q in QUANTILES.items():
+            estimate = sketch.quantile(q)
+            if estimate is not None:
+                values[f"{phase}_{name}"] = round(estimate, 3)
+                units[f"{phase}_{name}"] = "Milliseconds"
+    for status in ("online", "offline", "suppressed", "unchecked"):
+        values[status] = sum(1 for check in results if check_status(check) == status)
+        units[status] = "Count"
+    values["run_duration"] = round((time.monotonic() - started) * 1000, 3)
+    units["run_duration"] = "Milliseconds"
+
+    function_name = environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+    emit_emf([emf_record(METRICS_NAMESPACE, {"Function": function_name}, values, units)])
+
+
+def log_run_summary(
+    results: list[CheckResult], transitions: list[Transition], started: float
+) -> None:
+    # Replaces a log line per endpoint, the endpoints carried over and the status changes are
+    # named up to SUMMARY_SAMPLE_SIZE
+    summary_logger.info(
+        "Checker run summary",
+        extra={
+            "endpoints": len(results),
+            "statuses": dict(Counter(check_status(check) for check in results)),
+            "failures": dict(Counter(check.failure for check in results if check.failure)),
+            "carried_over": [check.id for check in results if not check.checked][
+                :SUMMARY_SAMPLE_SIZE
+            ],
+            "transitions": len(transitions),
+            "changed": [
+                {"id": t.id, "url": t.url, "from": t.previous, "to": t.status, "error": t.error}
+                for t in transitions[:SUMMARY_SAMPLE_SIZE]
+            ],
+            "duration_ms": round((time.monotonic() - started) * 1000, 3),
+        },
+    )
+
+
+# Coordinator: with a check queue configured the endpoints that are due are split into shards
+# for the worker, otherwise they are probed in this invocation
+def main(event: EventBridgeEvent, context: Context):
+    try:
+        started = time.monotonic()
+        table_name = get_db_table_name()
+        now = int(time.time())
+        targets = scan_table(table_name, now)
+        regions = get_probe_regions()
+        queue_url = get_check_queue_url()
+        if regions:
+            dispatch_regions(
+                get_check_queue_urls(),
+                regions,
+                get_probe_replicas(),
+                targets,
+                get_shard_size(),
+                now,
+            )
+        elif queue_url:
+            dispatch_shards(queue_url, shard_targets(targets, get_shard_size()))
+        else:
+            due = EndpointBatch()
+            results = concurrent_check(
+                targets, get_max_concurrency(), get_deadline(context), batch=due
+            )
+            checked = checkpoint_unchecked(results)
+            store_check_results(get_results_table_name(), checked)
+            transitions = schedule_next_checks(table_name, due, checked, now)
+            publish_transitions(get_alert_topic_arn(), transitions)
+            report_run_metrics(results, started)
+            log_run_summary(results, transitions, started)
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Success"}),
+        }
+    except ClientError as err:
+        logger.error("Error: %s", err)
+        return {
+            "statusCode": 418,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Whoops! something went wrong"}),
+        }
+
+
+# Worker: probes the shards dispatched by main, the queue delivers one shard per invocation. With
+# several probe regions the worker runs in each of them and only the quorum result is stored.
+def worker(event: SQSEvent, context: Context):
+    started = time.monotonic()
+    deadline = get_deadline(context)
+    max_concurrency = get_max_concurrency()
+    table_name = get_db_table_name()
+    results: list[CheckResult] = []
+    transitions: list[Transition] = []
+    for record in event["Records"]:
+        message = json.loads(record["body"])
+        endpoints: list[list[Any]] = message["endpoints"]
+        targets = EndpointBatch()
+        now = int(time.time())
+        checks = concurrent_check(
+            map(target_from_message, endpoints), max_concurrency, deadline, batch=targets
+        )
+        if "round" in message:
+            decided = record_verdicts(get_verdict_table_name(), get_probe_region(), message, checks)
+            checked = checkpoint_unchecked(decided)
+        else:
+            checked = checkpoint_unchecked(checks)
+        store_check_results(get_results_table_name(), checked)
+        transitions.extend(schedule_next_checks(table_name, targets, checked, now))
+        results.extend(checks)
+    publish_transitions(get_alert_topic_arn(), transitions)
+    report_run_metrics(results, started)
+    log_run_summary(results, transitions, started)
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps({"message": "Success"}),
+    }
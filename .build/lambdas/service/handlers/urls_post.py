@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from os import environ
+from typing import TYPE_CHECKING, Any, Optional
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from pydantic import ValidationError
+
+from service.common.clients import get_table
+from service.common.logs import get_logger
+from service.common.models import Endpoint, endpoint_item
+from service.common.scheduling import DEFAULT_CHECK_INTERVAL
+
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import APIGatewayProxyEventV1
+    from mypy_boto3_dynamodb.service_resource import Table
+
+logger = get_logger(__name__)
+
+
+def get_db_table_name() -> str:
+    table_name = str(environ.get("TABLE_NAME"))
+    logger.debug("Loaded dynamodb table: %s", table_name)
+    return table_name
+
+
+def get_unix_time() -> int:
+    timestamp = int(datetime.utcnow().timestamp())
+    logger.debug("New timestamp generated: %s", timestamp)
+    return timestamp
+
+
+class DuplicateEndpoint(Exception):
+    pass
+
+
+def add_item(
+    table_name: str,
+    target_url: str,
+    check_interval: int,
+    probe: Optional[dict[str, Any]] = None,
+) -> bool:
+    try:
+        entry = Endpoint(
+            target_url=target_url,
+            check_interval=check_interval,
+            probe=probe or {},
+            is_active=True,
+            created_at=get_unix_time(),
+        )
+        table: Table = get_table(table_name)
+        logger.info("Add item to dynamodb table with id: %s", entry.id)
+        # The id is derived from the canonical url, so an existing id means a duplicate
+        table.put_item(Item=endpoint_item(entry), ConditionExpression=Attr("id").not_exists())
+        return True
+    except ClientError as err:
+        if err.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            raise DuplicateEndpoint(entry.target_url) from err
+        logger.error("Error: %s", err)
+        return False
+    except ValidationError as err:
+        logger.error("Error: %s", err)
+        return False
+
+
+def main(event: APIGatewayProxyEventV1, context: Context):
+    if not event["body"]:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Body is missing from request"}),
+        }
+
+    data = json.loads(event["body"])
+    table_name = get_db_table_name()
+
+    try:
+        check_interval = data.get("check_interval", DEFAULT_CHECK_INTERVAL)
+        added = add_item(table_name, data["target_url"], check_interval, data.get("probe"))
+    except DuplicateEndpoint as err:
+        return {
+            "statusCode": 409,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": f"Endpoint '{err}' is already registered"}),
+        }
+
+    if added:
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Successful"}),
+        }
+
+    else:
+        return {
+            "statusCode": 418,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Whoops! something went wrong"}),
+        }
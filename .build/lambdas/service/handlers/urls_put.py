@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import json
+import time
+from os import environ
+from typing import TYPE_CHECKING
+
+from botocore.exceptions import ClientError
+
+from service.common.clients import get_table
+from service.common.dynamodb import ACTIVE_INDEX_KEY, DUE_INDEX_KEY, active_shard
+from service.common.logs import get_logger
+
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import APIGatewayProxyEventV1
+    from mypy_boto3_dynamodb.service_resource import Table
+
+logger = get_logger(__name__)
+
+
+def get_db_table_name() -> str:
+    table_name = str(environ.get("TABLE_NAME"))
+    logger.debug("Loaded dynamodb table: %s", table_name)
+    return table_name
+
+
+def update_item(table_name: str, id: str, is_active: bool) -> bool:
+    try:
+        table: Table = get_table(table_name)
+        logger.info("Update item in dynamodb table with id: %s", id)
+        # Only active endpoints carry the sparse index key, a reactivated endpoint is due at once
+        if is_active:
+            table.update_item(
+                Key={"id": id},
+                UpdateExpression="""SET
+                    is_active = :is_active,
+                    #active_shard = :active_shard,
+                    #next_check_at = :next_check_at""",
+                ExpressionAttributeNames={
+                    "#active_shard": ACTIVE_INDEX_KEY,
+                    "#next_check_at": DUE_INDEX_KEY,
+                },
+                ExpressionAttributeValues={
+                    ":is_active": is_active,
+                    ":active_shard": active_shard(id),
+                    ":next_check_at": int(time.time()),
+                },
+            )
+        else:
+            table.update_item(
+                Key={"id": id},
+                UpdateExpression="""SET
+                    is_active = :is_active
+                REMOVE
+                    #active_shard""",
+                ExpressionAttributeNames={"#active_shard": ACTIVE_INDEX_KEY},
+                ExpressionAttributeValues={":is_active": is_active},
+            )
+        return True
+    except ClientError as err:
+        logger.error("Error: %s", err)
+        return False
+
+
+def main(event: APIGatewayProxyEventV1, context: Context):
+    if not event["pathParameters"]:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Id is missing from request"}),
+        }
+
+    if not event["body"]:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Body is missing from request"}),
+        }
+
+    id = event["pathParameters"]["id"]
+    data = json.loads(event["body"])
+    table_name = get_db_table_name()
+
+    if update_item(table_name, id, data["is_active"]):
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Successful"}),
+        }
+
+    else:
+        return {
+            "statusCode": 418,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Whoops! something went wrong"}),
+        }
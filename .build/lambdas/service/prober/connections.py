@@ -0,0 +1,216 @@
+import socket
+import ssl
+import time
+from http.client import HTTPConnection, HTTPException, HTTPResponse, HTTPSConnection
+from threading import Lock
+from typing import NamedTuple, Optional, Union
+from urllib.parse import urlsplit
+
+from service.prober.probes import BODY_CHUNK_SIZE, BODY_READ_LIMIT, url_path
+from service.prober.resolver import Resolver
+
+
+class Target(NamedTuple):
+    scheme: str
+    host: str
+    port: int
+
+
+class ParsedUrl(NamedTuple):
+    # Everything a probe needs from an endpoint url, see EndpointBatch for urls parsed in bulk
+    targets: list[Target]
+    path: str
+
+
+class ProbeTimings(NamedTuple):
+    # Milliseconds per phase, None for phases a pooled connection or cached address skipped
+    dns: Optional[float]
+    connect: Optional[float]
+    tls: Optional[float]
+    ttfb: float
+    total: float
+
+
+def elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def parse_targets(url: str) -> list[Target]:
+    # Urls registered without a scheme are tried on plain http first and https second
+    parts = urlsplit(url if "://" in url else f"//{url}")
+    host = parts.hostname or ""
+    if parts.scheme == "https":
+        return [Target("https", host, parts.port or 443)]
+    if parts.scheme == "http":
+        return [Target("http", host, parts.port or 80)]
+    if parts.port:
+        return [Target("https" if parts.port == 443 else "http", host, parts.port)]
+    return [Target("http", host, 80), Target("https", host, 443)]
+
+
+def parse_url(url: str) -> ParsedUrl:
+    return ParsedUrl(parse_targets(url), url_path(url))
+
+
+class PooledHTTPConnection(HTTPConnection):
+    def __init__(self, target: Target, address: tuple[str, int], timeout: float) -> None:
+        super().__init__(target.host, target.port, timeout=timeout)
+        self.address = address
+        self.connect_ms: Optional[float] = None
+        self.tls_ms: Optional[float] = None
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        self.sock = socket.create_connection(self.address, self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connect_ms = elapsed_ms(start)
+
+
+class PooledHTTPSConnection(HTTPSConnection):
+    def __init__(
+        self,
+        target: Target,
+        address: tuple[str, int],
+        timeout: float,
+        ssl_context: ssl.SSLContext,
+        session: Optional[ssl.SSLSession],
+    ) -> None:
+        super().__init__(target.host, target.port, timeout=timeout, context=ssl_context)
+        self.address = address
+        self.ssl_context = ssl_context
+        self.session = session
+        self.connect_ms: Optional[float] = None
+        self.tls_ms: Optional[float] = None
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        sock = socket.create_connection(self.address, self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connect_ms = elapsed_ms(start)
+        # Resuming a previous session to the same host skips the full TLS handshake
+        start = time.perf_counter()
+        self.sock = self.ssl_context.wrap_socket(
+            sock, server_hostname=self.host, session=self.session
+        )
+        self.tls_ms = elapsed_ms(start)
+
+
+Connection = Union[PooledHTTPConnection, PooledHTTPSConnection]
+
+
+def scan_body(response: HTTPResponse, body_match: bytes) -> bool:
+    # Streams at most BODY_READ_LIMIT bytes, keeping only the tail a match could start in, so a
+    # large page never sits in memory. Returns whether `body_match` was found, an empty
+    # `body_match` always matches.
+    matched = not body_match
+    overlap = max(len(body_match) - 1, 0)
+    tail = b""
+    remaining = BODY_READ_LIMIT
+    while remaining > 0:
+        chunk = response.read(min(BODY_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        if not matched:
+            window = tail + chunk
+            matched = body_match in window
+            tail = window[len(window) - overlap :] if overlap else b""
+    return matched
+
+
+class ConnectionPool:
+    # Thread-safe keep-alive pool shared by all probes, kept at module level by the checker so
+    # warm invocations reuse resolved addresses, open connections and TLS sessions
+    def __init__(self, max_idle_per_host: int = 4, resolver: Optional[Resolver] = None) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.resolver = resolver or Resolver()
+        self.ssl_context = ssl.create_default_context()
+        self._idle: dict[Target, list[Connection]] = {}
+        self._sessions: dict[Target, ssl.SSLSession] = {}
+        self._lock = Lock()
+
+    def acquire(self, target: Target, timeout: float) -> tuple[Connection, bool]:
+        connection, reused, _ = self.acquire_timed(target, timeout)
+        return connection, reused
+
+    def acquire_timed(
+        self, target: Target, timeout: float
+    ) -> tuple[Connection, bool, Optional[float]]:
+        with self._lock:
+            idle = self._idle.get(target)
+            connection = idle.pop() if idle else None
+        if connection is not None and connection.sock is not None:
+            try:
+                connection.sock.settimeout(timeout)
+                return connection, True, None
+            except OSError:
+                connection.close()
+
+        address, dns_ms = self.resolver.resolve(target.host, target.port, timeout)
+        if target.scheme == "https":
+            with self._lock:
+                session = self._sessions.get(target)
+            return (
+                PooledHTTPSConnection(target, address, timeout, self.ssl_context, session),
+                False,
+                dns_ms,
+            )
+        return PooledHTTPConnection(target, address, timeout), False, dns_ms
+
+    def release(self, target: Target, connection: Connection) -> None:
+        with self._lock:
+            if isinstance(connection.sock, ssl.SSLSocket) and connection.sock.session:
+                self._sessions[target] = connection.sock.session
+            idle = self._idle.setdefault(target, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, target: Target, method: str, path: str, timeout: float) -> int:
+        return self.request_timed(target, method, path, timeout)[0]
+
+    def request_timed(
+        self, target: Target, method: str, path: str, timeout: float, body_match: bytes = b""
+    ) -> tuple[int, ProbeTimings, bool]:
+        # Returns the status, the phase timings and whether the body contained `body_match`
+        start = time.perf_counter()
+        while True:
+            connection, reused, dns_ms = self.acquire_timed(target, timeout)
+            try:
+                sent = time.perf_counter()
+                connection.request(method, path)
+                response = connection.getresponse()
+                # Time to first byte counts from the request, not from opening the connection
+                handshake_ms = (
+                    0 if reused else (connection.connect_ms or 0) + (connection.tls_ms or 0)
+                )
+                ttfb_ms = max(elapsed_ms(sent) - handshake_ms, 0)
+                matched = scan_body(response, body_match)
+            except (OSError, HTTPException):
+                connection.close()
+                # The server may have dropped an idle keep-alive connection, retry on a new one
+                if reused:
+                    continue
+                raise
+
+            timings = ProbeTimings(
+                dns_ms,
+                None if reused else connection.connect_ms,
+                None if reused else connection.tls_ms,
+                ttfb_ms,
+                elapsed_ms(start),
+            )
+            # A body left unread past the limit would be taken for the next response
+            if response.will_close or not response.isclosed():
+                connection.close()
+            else:
+                self.release(target, connection)
+            return response.status, timings, matched
+
+    def close(self) -> None:
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
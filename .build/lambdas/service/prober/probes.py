@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import Any, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+PROBE_METHODS = ("HEAD", "GET")
+DEFAULT_PROBE_METHOD = "HEAD"
+# Redirects count as healthy, the checker does not follow them
+DEFAULT_EXPECTED_STATUS = ((200, 399),)
+
+# Only this much of a response body is searched for `body_match`, a match further down a large
+# page is not found rather than buffering the page
+BODY_READ_LIMIT = 64 * 1024
+BODY_CHUNK_SIZE = 8 * 1024
+MAX_BODY_MATCH_LENGTH = 256
+
+
+class Probe(NamedTuple):
+    # How an endpoint is checked. `path` None probes the path of the registered url.
+    method: str = DEFAULT_PROBE_METHOD
+    path: Optional[str] = None
+    expected_status: tuple[tuple[int, int], ...] = DEFAULT_EXPECTED_STATUS
+    body_match: Optional[str] = None
+
+
+DEFAULT_PROBE = Probe()
+
+
+class UnexpectedResponse(Exception):
+    pass
+
+
+def probe_from_item(item: Any) -> Probe:
+    # Stored as a map on the endpoint item and as a list in check queue messages, endpoints
+    # registered before probes were configurable have neither
+    if not item:
+        return DEFAULT_PROBE
+    if isinstance(item, dict):
+        item = [item.get(field) for field in Probe._fields]
+    method, path, expected_status, body_match = item
+    return Probe(
+        str(method or DEFAULT_PROBE_METHOD),
+        str(path) if path else None,
+        tuple((int(low), int(high)) for low, high in expected_status or DEFAULT_EXPECTED_STATUS),
+        str(body_match) if body_match else None,
+    )
+
+
+def request_path(url: str, probe: Probe) -> str:
+    return probe.path or url_path(url)
+
+
+def url_path(url: str) -> str:
+    parts = urlsplit(url if "://" in url else f"//{url}")
+    path = parts.path or "/"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+def check_response(probe: Probe, status: int, body_matched: bool) -> None:
+    if not any(low <= status <= high for low, high in probe.expected_status):
+        raise UnexpectedResponse(f"unexpected status {status}")
+    if not body_matched:
+        raise UnexpectedResponse(
+            f"'{probe.body_match}' not found in the first {BODY_READ_LIMIT} bytes of the body"
+        )
@@ -3,7 +3,7 @@
 from aws_cdk import App, Environment
 
 from checker.settings import get_settings, get_stack_name
-from checker.stack import Checker
+from checker.stack import Checker, ProbeRegionStack
 
 settings = get_settings()
 
@@ -16,4 +16,13 @@ stack = Checker(
     env=Environment(account=settings.account, region=settings.region),
 )
 
+for region in settings.probe_regions:
+    if region != settings.region:
+        ProbeRegionStack(
+            app,
+            f"{get_stack_name()}-{region}",
+            description=f"Endpoint Checker probes in {region}",
+            env=Environment(account=settings.account, region=region),
+        )
+
 app.synth()
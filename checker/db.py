@@ -1,25 +1,123 @@
+from typing import Optional
+
 from aws_cdk import CfnOutput, RemovalPolicy
 from aws_cdk import aws_dynamodb as dynamodb
 from constructs import Construct
 from typing_extensions import Self
 
+from checker.settings import get_settings
+
+settings = get_settings()
+
+# Fixed names, the probe region stacks reach the tables by name
+TABLE_NAME = "endpoint-checker-table"
+RESULTS_TABLE_NAME = "endpoint-checker-results"
+VERDICT_TABLE_NAME = "endpoint-checker-verdicts"
+
+# Sparse index on active endpoints, the service reads it through service/common/dynamodb.py
+ACTIVE_INDEX_NAME = "active-index"
+ACTIVE_INDEX_KEY = "active_shard"
+DUE_INDEX_NAME = "due-index"
+DUE_INDEX_KEY = "next_check_at"
+
 
 class Database(Construct):
     def __init__(self: Self, scope: Construct, id: str) -> None:
         super().__init__(scope, id)
 
         self.table: dynamodb.Table = self._build_db_table()
+        self.results_table: dynamodb.Table = self._build_results_table()
+        self.snapshot_table: dynamodb.Table = self._build_snapshot_table()
+        self.verdict_table: Optional[dynamodb.Table] = (
+            self._build_verdict_table() if settings.probe_regions else None
+        )
 
     def _build_db_table(self: Self) -> dynamodb.Table:
         table = dynamodb.Table(
             self,
             "table",
-            table_name="endpoint-checker-table",
+            table_name=TABLE_NAME,
             partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             point_in_time_recovery=True,
             removal_policy=RemovalPolicy.DESTROY,
+            # Feeds the snapshot table, see service/handlers/snapshot.py
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
+        )
+        table.add_global_secondary_index(
+            index_name=ACTIVE_INDEX_NAME,
+            partition_key=dynamodb.Attribute(
+                name=ACTIVE_INDEX_KEY, type=dynamodb.AttributeType.NUMBER
+            ),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["target_url", "is_active", "created_at"],
+        )
+        # Same shards as the active index, sorted by the time the next check is due
+        table.add_global_secondary_index(
+            index_name=DUE_INDEX_NAME,
+            partition_key=dynamodb.Attribute(
+                name=ACTIVE_INDEX_KEY, type=dynamodb.AttributeType.NUMBER
+            ),
+            sort_key=dynamodb.Attribute(name=DUE_INDEX_KEY, type=dynamodb.AttributeType.NUMBER),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["target_url", "check_interval", "current_interval", "probe"],
         )
         CfnOutput(self, id="DbTableName", value=table.table_name).override_logical_id("DbTableName")
 
         return table
+
+    def _build_results_table(self: Self) -> dynamodb.Table:
+        table = dynamodb.Table(
+            self,
+            "results",
+            table_name=RESULTS_TABLE_NAME,
+            partition_key=dynamodb.Attribute(
+                name="endpoint_id", type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(name="checked_at", type=dynamodb.AttributeType.NUMBER),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            time_to_live_attribute="expires_at",
+            point_in_time_recovery=True,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+        CfnOutput(self, id="DbResultsTableName", value=table.table_name).override_logical_id(
+            "DbResultsTableName"
+        )
+
+        return table
+
+    def _build_snapshot_table(self: Self) -> dynamodb.Table:
+        # One item per active index shard plus the version item, see service/common/snapshot.py
+        table = dynamodb.Table(
+            self,
+            "snapshots",
+            table_name="endpoint-checker-snapshots",
+            partition_key=dynamodb.Attribute(name="shard", type=dynamodb.AttributeType.NUMBER),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            point_in_time_recovery=True,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+        CfnOutput(self, id="DbSnapshotTableName", value=table.table_name).override_logical_id(
+            "DbSnapshotTableName"
+        )
+
+        return table
+
+    def _build_verdict_table(self: Self) -> dynamodb.Table:
+        # Verdicts of the probe regions per endpoint and round until a quorum agrees
+        table = dynamodb.Table(
+            self,
+            "verdicts",
+            table_name=VERDICT_TABLE_NAME,
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="round", type=dynamodb.AttributeType.NUMBER),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            time_to_live_attribute="expires_at",
+            point_in_time_recovery=True,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+        CfnOutput(self, id="DbVerdictTableName", value=table.table_name).override_logical_id(
+            "DbVerdictTableName"
+        )
+
+        return table
@@ -10,7 +10,7 @@ from aws_cdk.aws_logs import RetentionDays
 from constructs import Construct
 from typing_extensions import Self
 
-from checker.settings import get_resource_name, get_settings
+from checker.settings import get_logging_environment, get_resource_name, get_settings
 
 settings = get_settings()
 
@@ -22,18 +22,25 @@ class UrlsMethods(Construct):
         id: str,
         api_root: apigtw.Resource,
         db: dynamodb.Table,
+        results_db: dynamodb.Table,
+        snapshot_db: dynamodb.Table,
         layer: PythonLayerVersion,
     ) -> None:
         super().__init__(scope, id)
 
         self.api_root = api_root
         self.db = db
+        self.results_db = results_db
+        self.snapshot_db = snapshot_db
         self.layer = layer
         self.role = self._build_lambda_role()
         self.endpoint = self._build_api_endpoint()
+        self.item_endpoint = self._build_api_item_endpoint()
         self.post_method = self._build_post_lambda_integration()
+        self.batch_post_method = self._build_batch_post_lambda_integration()
         self.get_method = self._build_get_lambda_integration()
         self.put_method = self._build_put_lambda_integration()
+        self.results_method = self._build_results_lambda_integration()
 
     def _build_lambda_role(self: Self) -> iam.Role:
         role: iam.Role = iam.Role(
@@ -48,10 +55,29 @@ class UrlsMethods(Construct):
                             actions=[
                                 "dynamodb:PutItem",
                                 "dynamodb:GetItem",
+                                "dynamodb:BatchGetItem",
                                 "dynamodb:UpdateItem",
-                                "dynamodb:Scan",
+                                "dynamodb:Query",
                             ],
-                            resources=[self.db.table_arn],
+                            resources=[self.db.table_arn, f"{self.db.table_arn}/index/*"],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "dynamodb_results": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=["dynamodb:Query"],
+                            resources=[self.results_db.table_arn],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "dynamodb_snapshots": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=["dynamodb:GetItem"],
+                            resources=[self.snapshot_db.table_arn],
                             effect=iam.Effect.ALLOW,
                         )
                     ]
@@ -77,6 +103,10 @@ class UrlsMethods(Construct):
     def _build_api_endpoint(self: Self) -> apigtw.Resource:
         return self.api_root.add_resource("urls")
 
+    def _build_api_item_endpoint(self: Self) -> apigtw.Resource:
+        # Resource /api/urls/{id}
+        return self.endpoint.add_resource("{id}")
+
     def _build_post_lambda_integration(self: Self) -> None:
         function: _lambda.Function = _lambda.Function(
             self,
@@ -88,6 +118,7 @@ class UrlsMethods(Construct):
             handler="service.handlers.urls_post.main",
             layers=[self.layer],
             environment={
+                **get_logging_environment(),
                 "TABLE_NAME": self.db.table_name,
             },
             tracing=_lambda.Tracing.ACTIVE,
@@ -104,6 +135,34 @@ class UrlsMethods(Construct):
             integration=apigtw.LambdaIntegration(handler=cast(_lambda.IFunction, function)),
         )
 
+    def _build_batch_post_lambda_integration(self: Self) -> None:
+        function: _lambda.Function = _lambda.Function(
+            self,
+            "batch-post",
+            function_name=get_resource_name("lambda", "-urls-batch-post"),
+            runtime=_lambda.Runtime.PYTHON_3_10,
+            architecture=_lambda.Architecture.X86_64,
+            code=_lambda.Code.from_asset(".build/lambdas"),
+            handler="service.handlers.urls_batch_post.main",
+            layers=[self.layer],
+            environment={
+                **get_logging_environment(),
+                "TABLE_NAME": self.db.table_name,
+            },
+            tracing=_lambda.Tracing.ACTIVE,
+            retry_attempts=0,
+            timeout=Duration.seconds(10),
+            memory_size=128,
+            role=cast(iam.IRole, self.role),
+            log_retention=RetentionDays.ONE_DAY,
+        )
+
+        # POST /api/urls/batch
+        self.endpoint.add_resource("batch").add_method(
+            http_method="POST",
+            integration=apigtw.LambdaIntegration(handler=cast(_lambda.IFunction, function)),
+        )
+
     def _build_get_lambda_integration(self: Self) -> None:
         function: _lambda.Function = _lambda.Function(
             self,
@@ -115,7 +174,11 @@ class UrlsMethods(Construct):
             handler="service.handlers.urls_get.main",
             layers=[self.layer],
             environment={
+                **get_logging_environment(),
                 "TABLE_NAME": self.db.table_name,
+                "LISTING_CACHE_TTL": str(settings.listing_cache_ttl),
+                "SNAPSHOT_TABLE_NAME": self.snapshot_db.table_name,
+                "DYNAMODB_CLIENT_READS": str(settings.dynamodb_client_reads).lower(),
             },
             tracing=_lambda.Tracing.ACTIVE,
             retry_attempts=0,
@@ -142,6 +205,7 @@ class UrlsMethods(Construct):
             handler="service.handlers.urls_put.main",
             layers=[self.layer],
             environment={
+                **get_logging_environment(),
                 "TABLE_NAME": self.db.table_name,
             },
             tracing=_lambda.Tracing.ACTIVE,
@@ -152,11 +216,36 @@ class UrlsMethods(Construct):
             log_retention=RetentionDays.ONE_DAY,
         )
 
-        # Resource /api/urls/{id}
-        urls_put = self.endpoint.add_resource("{id}")
-
         # PUT /api/urls/{id}
-        urls_put.add_method(
+        self.item_endpoint.add_method(
             http_method="PUT",
             integration=apigtw.LambdaIntegration(handler=cast(_lambda.IFunction, function)),
         )
+
+    def _build_results_lambda_integration(self: Self) -> None:
+        function: _lambda.Function = _lambda.Function(
+            self,
+            "results",
+            function_name=get_resource_name("lambda", "-urls-results"),
+            runtime=_lambda.Runtime.PYTHON_3_10,
+            architecture=_lambda.Architecture.X86_64,
+            code=_lambda.Code.from_asset(".build/lambdas"),
+            handler="service.handlers.results_get.main",
+            layers=[self.layer],
+            environment={
+                **get_logging_environment(),
+                "RESULTS_TABLE_NAME": self.results_db.table_name,
+            },
+            tracing=_lambda.Tracing.ACTIVE,
+            retry_attempts=0,
+            timeout=Duration.seconds(10),
+            memory_size=128,
+            role=cast(iam.IRole, self.role),
+            log_retention=RetentionDays.ONE_DAY,
+        )
+
+        # GET /api/urls/{id}/results
+        self.item_endpoint.add_resource("results").add_method(
+            http_method="GET",
+            integration=apigtw.LambdaIntegration(handler=cast(_lambda.IFunction, function)),
+        )
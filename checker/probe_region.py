@@ -0,0 +1,177 @@
+from typing import cast
+
+from aws_cdk import Duration, RemovalPolicy, Stack
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_lambda as _lambda
+from aws_cdk import aws_lambda_event_sources as sources
+from aws_cdk import aws_sqs as sqs
+from aws_cdk.aws_lambda_python_alpha import BundlingOptions, PythonLayerVersion
+from aws_cdk.aws_logs import RetentionDays
+from constructs import Construct
+from typing_extensions import Self
+
+from checker.db import RESULTS_TABLE_NAME, TABLE_NAME, VERDICT_TABLE_NAME
+from checker.rest_api import CompileBytecode
+from checker.settings import get_logging_environment, get_resource_name, get_settings
+
+settings = get_settings()
+
+
+class ProbeRegion(Construct):
+    # Check queue and worker in a probe region other than the home region. The worker reads
+    # and writes the tables and the alert topic of the home region.
+    def __init__(self: Self, scope: Construct, id: str) -> None:
+        super().__init__(scope, id)
+
+        self.region = Stack.of(self).region
+        self.layer = self._build_common_layer()
+        self.check_queue = self._build_check_queue()
+        self.role = self._build_lambda_role()
+        self.worker = self._build_worker_lambda()
+
+    def _home_arn(self: Self, service: str, resource: str) -> str:
+        return f"arn:aws:{service}:{settings.region}:{settings.account}:{resource}"
+
+    def _build_common_layer(self: Self) -> PythonLayerVersion:
+        common: PythonLayerVersion = PythonLayerVersion(
+            self,
+            "common",
+            entry=".build/common_layer",
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_10],
+            compatible_architectures=[_lambda.Architecture.X86_64],
+            description="Enpoint checker library",
+            layer_version_name=get_resource_name("lambda", "layer"),
+            removal_policy=RemovalPolicy.DESTROY,
+            bundling=BundlingOptions(command_hooks=CompileBytecode()),
+        )
+
+        return common
+
+    def _build_check_queue(self: Self) -> sqs.Queue:
+        dead_letter_queue: sqs.Queue = sqs.Queue(
+            self,
+            "check-dlq",
+            queue_name=get_resource_name("sqs", "-checks-dlq"),
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            retention_period=Duration.days(1),
+        )
+        queue: sqs.Queue = sqs.Queue(
+            self,
+            "check-queue",
+            queue_name=get_resource_name("sqs", "-checks"),
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            retention_period=Duration.minutes(settings.check_rate_minutes),
+            visibility_timeout=Duration.seconds(60),
+            dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=2, queue=dead_letter_queue),
+        )
+
+        return queue
+
+    def _build_lambda_role(self: Self) -> iam.Role:
+        # Role names are global, so every region gets its own
+        table_arn = self._home_arn("dynamodb", f"table/{TABLE_NAME}")
+        role: iam.Role = iam.Role(
+            self,
+            "role",
+            role_name=get_resource_name("role", f"-probe-{self.region}"),
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            inline_policies={
+                "dynamodb_db": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=["dynamodb:UpdateItem"],
+                            resources=[table_arn],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "dynamodb_results": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=["dynamodb:PutItem", "dynamodb:BatchWriteItem"],
+                            resources=[self._home_arn("dynamodb", f"table/{RESULTS_TABLE_NAME}")],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "dynamodb_verdicts": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=["dynamodb:UpdateItem"],
+                            resources=[self._home_arn("dynamodb", f"table/{VERDICT_TABLE_NAME}")],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "sqs_checks": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=[
+                                "sqs:ReceiveMessage",
+                                "sqs:DeleteMessage",
+                                "sqs:GetQueueAttributes",
+                            ],
+                            resources=[self.check_queue.queue_arn],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "sns_alerts": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=["sns:Publish"],
+                            resources=[self._home_arn("sns", get_resource_name("sns", "-alerts"))],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "cloudwatch_logs": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=[
+                                "logs:CreateLogGroup",
+                                "logs:CreateLogStream",
+                                "logs:PutLogEvents",
+                            ],
+                            resources=["*"],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+            },
+        )
+
+        return role
+
+    def _build_worker_lambda(self: Self) -> _lambda.Function:
+        function: _lambda.Function = _lambda.Function(
+            self,
+            "service-worker",
+            function_name=get_resource_name("lambda", "-service-worker"),
+            runtime=_lambda.Runtime.PYTHON_3_10,
+            architecture=_lambda.Architecture.X86_64,
+            code=_lambda.Code.from_asset(".build/lambdas"),
+            handler="service.handlers.checker.worker",
+            layers=[self.layer],
+            environment={
+                **get_logging_environment(),
+                "HOME_REGION": settings.region,
+                "TABLE_NAME": TABLE_NAME,
+                "RESULTS_TABLE_NAME": RESULTS_TABLE_NAME,
+                "VERDICT_TABLE_NAME": VERDICT_TABLE_NAME,
+                "RESULTS_RETENTION_DAYS": str(settings.results_retention_days),
+                "CHECK_CONCURRENCY": str(settings.check_concurrency),
+                "ALERT_TOPIC_ARN": self._home_arn("sns", get_resource_name("sns", "-alerts")),
+            },
+            tracing=_lambda.Tracing.ACTIVE,
+            retry_attempts=0,
+            timeout=Duration.seconds(10),
+            memory_size=128,
+            role=cast(iam.IRole, self.role),
+            log_retention=RetentionDays.ONE_DAY,
+        )
+        function.add_event_source(sources.SqsEventSource(self.check_queue, batch_size=1))
+
+        return function
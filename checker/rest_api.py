@@ -1,23 +1,49 @@
+import json
 from typing import cast
 
+import jsii
 from aws_cdk import CfnOutput, Duration, RemovalPolicy
 from aws_cdk import aws_apigateway as apigtw
 from aws_cdk import aws_events as events
 from aws_cdk import aws_events_targets as targets
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda as _lambda
-from aws_cdk.aws_lambda_python_alpha import PythonLayerVersion
+from aws_cdk import aws_lambda_event_sources as sources
+from aws_cdk import aws_sns as sns
+from aws_cdk import aws_sqs as sqs
+from aws_cdk.aws_lambda_python_alpha import BundlingOptions, ICommandHooks, PythonLayerVersion
 from aws_cdk.aws_logs import RetentionDays
 from constructs import Construct
 from typing_extensions import Self
 
 from checker.db import Database
 from checker.methods import UrlsMethods
-from checker.settings import get_resource_name, get_settings
+from checker.settings import get_logging_environment, get_resource_name, get_settings
 
 settings = get_settings()
 
 
+def check_queue_url(region: str) -> str:
+    # Check queues have the same name in every probe region, see checker/probe_region.py
+    name = get_resource_name("sqs", "-checks")
+    return f"https://sqs.{region}.amazonaws.com/{settings.account}/{name}"
+
+
+def check_queue_arn(region: str) -> str:
+    return f"arn:aws:sqs:{region}:{settings.account}:{get_resource_name('sqs', '-checks')}"
+
+
+@jsii.implements(ICommandHooks)
+class CompileBytecode:
+    # The lambda file system is read-only, so anything not compiled at build time is compiled
+    # again on every cold start. Unchecked hashes skip the source mtime check on import.
+    def before_bundling(self: Self, input_dir: str, output_dir: str) -> list[str]:
+        return []
+
+    def after_bundling(self: Self, input_dir: str, output_dir: str) -> list[str]:
+        return [f"python -m compileall -q -j 0 --invalidation-mode unchecked-hash {output_dir}"]
+
+
 class RestApi(Construct):
     def __init__(self: Self, scope: Construct, id: str) -> None:
         super().__init__(scope, id)
@@ -27,11 +53,22 @@ class RestApi(Construct):
         self.rest_api = self._build_api_gtw()
         self.api_root = self._build_api_root()
         self.urls = UrlsMethods(
-            self, id="logic", api_root=self.api_root, db=self.api_db.table, layer=self.layer
+            self,
+            id="logic",
+            api_root=self.api_root,
+            db=self.api_db.table,
+            results_db=self.api_db.results_table,
+            snapshot_db=self.api_db.snapshot_table,
+            layer=self.layer,
         )
+        self.check_queue = self._build_check_queue()
+        self.alert_topic = self._build_alert_topic()
         self.checker_role = self._build_lambda_role_for_checker()
         self.checker = self._build_checker_lambda()
+        self.checker_worker = self._build_checker_worker_lambda()
         self.rule = self._build_eventbridge_rule()
+        self.snapshot_role = self._build_lambda_role_for_snapshot()
+        self.snapshot = self._build_snapshot_lambda()
 
     def _build_common_layer(self: Self) -> PythonLayerVersion:
         common: PythonLayerVersion = PythonLayerVersion(
@@ -43,6 +80,7 @@ class RestApi(Construct):
             description="Enpoint checker library",
             layer_version_name=get_resource_name("lambda", "layer"),
             removal_policy=RemovalPolicy.DESTROY,
+            bundling=BundlingOptions(command_hooks=CompileBytecode()),
         )
 
         return common
@@ -65,6 +103,53 @@ class RestApi(Construct):
     def _build_api_root(self: Self) -> apigtw.Resource:
         return self.rest_api.root.add_resource("api").add_resource("v1")
 
+    def _build_check_queue(self: Self) -> sqs.Queue:
+        dead_letter_queue: sqs.Queue = sqs.Queue(
+            self,
+            "check-dlq",
+            queue_name=get_resource_name("sqs", "-checks-dlq"),
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            retention_period=Duration.days(1),
+        )
+        queue: sqs.Queue = sqs.Queue(
+            self,
+            "check-queue",
+            queue_name=get_resource_name("sqs", "-checks"),
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            # Endpoints in a shard that expires unchecked stay due and go out with the next run
+            retention_period=Duration.minutes(settings.check_rate_minutes),
+            # AWS recommends six times the function timeout for SQS event sources
+            visibility_timeout=Duration.seconds(60),
+            dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=2, queue=dead_letter_queue),
+        )
+
+        return queue
+
+    def _build_alert_topic(self: Self) -> sns.Topic:
+        # Receives one message per checker run listing the endpoints that went up or down
+        topic: sns.Topic = sns.Topic(
+            self,
+            "alert-topic",
+            topic_name=get_resource_name("sns", "-alerts"),
+        )
+        # Same as enforce_ssl on the queues, which this CDK version does not offer for topics
+        topic.add_to_resource_policy(
+            iam.PolicyStatement(
+                actions=["sns:Publish"],
+                resources=[topic.topic_arn],
+                principals=[iam.AnyPrincipal()],
+                conditions={"Bool": {"aws:SecureTransport": "false"}},
+                effect=iam.Effect.DENY,
+            )
+        )
+        CfnOutput(self, id="AlertTopicArn", value=topic.topic_arn).override_logical_id(
+            "AlertTopicArn"
+        )
+
+        return topic
+
     def _build_lambda_role_for_checker(self: Self) -> iam.Role:
         role: iam.Role = iam.Role(
             self,
@@ -77,9 +162,49 @@ class RestApi(Construct):
                         iam.PolicyStatement(
                             actions=[
                                 "dynamodb:GetItem",
-                                "dynamodb:Scan",
+                                "dynamodb:UpdateItem",
+                                "dynamodb:Query",
+                            ],
+                            resources=[
+                                self.api_db.table.table_arn,
+                                f"{self.api_db.table.table_arn}/index/*",
                             ],
-                            resources=[self.api_db.table.table_arn],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "dynamodb_results": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=[
+                                "dynamodb:PutItem",
+                                "dynamodb:BatchWriteItem",
+                            ],
+                            resources=[self.api_db.results_table.table_arn],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "sqs_checks": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=[
+                                "sqs:SendMessage",
+                                "sqs:ReceiveMessage",
+                                "sqs:DeleteMessage",
+                                "sqs:GetQueueAttributes",
+                            ],
+                            resources=[self.check_queue.queue_arn],
+                            effect=iam.Effect.ALLOW,
+                        ),
+                        *self._probe_region_statements(),
+                    ]
+                ),
+                "sns_alerts": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=["sns:Publish"],
+                            resources=[self.alert_topic.topic_arn],
                             effect=iam.Effect.ALLOW,
                         )
                     ]
@@ -102,6 +227,36 @@ class RestApi(Construct):
 
         return role
 
+    def _probe_region_statements(self: Self) -> list[iam.PolicyStatement]:
+        # With several probe regions the coordinator dispatches to their queues and the worker
+        # of the home region records verdicts like every other region
+        if not self.api_db.verdict_table:
+            return []
+        return [
+            iam.PolicyStatement(
+                actions=["sqs:SendMessage"],
+                resources=[check_queue_arn(region) for region in settings.probe_regions],
+                effect=iam.Effect.ALLOW,
+            ),
+            iam.PolicyStatement(
+                actions=["dynamodb:UpdateItem"],
+                resources=[self.api_db.verdict_table.table_arn],
+                effect=iam.Effect.ALLOW,
+            ),
+        ]
+
+    def _probe_region_environment(self: Self) -> dict[str, str]:
+        if not self.api_db.verdict_table:
+            return {}
+        return {
+            "PROBE_REGIONS": ",".join(settings.probe_regions),
+            "PROBE_REPLICAS": str(settings.probe_replicas),
+            "CHECK_QUEUE_URLS": json.dumps(
+                {region: check_queue_url(region) for region in settings.probe_regions}
+            ),
+            "VERDICT_TABLE_NAME": self.api_db.verdict_table.table_name,
+        }
+
     def _build_checker_lambda(self: Self) -> _lambda.Function:
         function: _lambda.Function = _lambda.Function(
             self,
@@ -113,7 +268,44 @@ class RestApi(Construct):
             handler="service.handlers.checker.main",
             layers=[self.layer],
             environment={
+                **get_logging_environment(),
+                "TABLE_NAME": self.api_db.table.table_name,
+                "RESULTS_TABLE_NAME": self.api_db.results_table.table_name,
+                "RESULTS_RETENTION_DAYS": str(settings.results_retention_days),
+                "CHECK_CONCURRENCY": str(settings.check_concurrency),
+                "ALERT_TOPIC_ARN": self.alert_topic.topic_arn,
+                "CHECK_QUEUE_URL": self.check_queue.queue_url,
+                "CHECK_SHARD_SIZE": str(settings.check_shard_size),
+                **self._probe_region_environment(),
+            },
+            tracing=_lambda.Tracing.ACTIVE,
+            retry_attempts=0,
+            timeout=Duration.seconds(10),
+            memory_size=128,
+            role=cast(iam.IRole, self.checker_role),
+            log_retention=RetentionDays.ONE_DAY,
+        )
+
+        return function
+
+    def _build_checker_worker_lambda(self: Self) -> _lambda.Function:
+        function: _lambda.Function = _lambda.Function(
+            self,
+            "service-worker",
+            function_name=get_resource_name("lambda", "-service-worker"),
+            runtime=_lambda.Runtime.PYTHON_3_10,
+            architecture=_lambda.Architecture.X86_64,
+            code=_lambda.Code.from_asset(".build/lambdas"),
+            handler="service.handlers.checker.worker",
+            layers=[self.layer],
+            environment={
+                **get_logging_environment(),
                 "TABLE_NAME": self.api_db.table.table_name,
+                "RESULTS_TABLE_NAME": self.api_db.results_table.table_name,
+                "RESULTS_RETENTION_DAYS": str(settings.results_retention_days),
+                "CHECK_CONCURRENCY": str(settings.check_concurrency),
+                "ALERT_TOPIC_ARN": self.alert_topic.topic_arn,
+                **self._probe_region_environment(),
             },
             tracing=_lambda.Tracing.ACTIVE,
             retry_attempts=0,
@@ -122,6 +314,8 @@ class RestApi(Construct):
             role=cast(iam.IRole, self.checker_role),
             log_retention=RetentionDays.ONE_DAY,
         )
+        # One shard per invocation, so every shard gets the full function timeout
+        function.add_event_source(sources.SqsEventSource(self.check_queue, batch_size=1))
 
         return function
 
@@ -132,8 +326,113 @@ class RestApi(Construct):
             enabled=True,
             rule_name=get_resource_name("events", "-trigger"),
             description="Rule to trigger checker lambda",
-            schedule=events.Schedule.rate(Duration.minutes(5)),
+            # Each run only checks the endpoints that are due, see service/common/scheduling.py
+            schedule=events.Schedule.rate(Duration.minutes(settings.check_rate_minutes)),
         )
         rule.add_target(targets.LambdaFunction(cast(_lambda.IFunction, self.checker)))
 
         return rule
+
+    def _build_lambda_role_for_snapshot(self: Self) -> iam.Role:
+        role: iam.Role = iam.Role(
+            self,
+            "snapshot-role",
+            role_name=get_resource_name("role", "-snapshot"),
+            assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
+            inline_policies={
+                "dynamodb_db": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=["dynamodb:Query"],
+                            resources=[f"{self.api_db.table.table_arn}/index/*"],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "dynamodb_snapshots": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=[
+                                "dynamodb:GetItem",
+                                "dynamodb:PutItem",
+                                "dynamodb:UpdateItem",
+                                "dynamodb:DeleteItem",
+                            ],
+                            resources=[self.api_db.snapshot_table.table_arn],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+                "cloudwatch_logs": iam.PolicyDocument(
+                    statements=[
+                        iam.PolicyStatement(
+                            actions=[
+                                "logs:CreateLogGroup",
+                                "logs:CreateLogStream",
+                                "logs:PutLogEvents",
+                            ],
+                            resources=["*"],
+                            effect=iam.Effect.ALLOW,
+                        )
+                    ]
+                ),
+            },
+        )
+
+        return role
+
+    def _build_snapshot_lambda(self: Self) -> _lambda.Function:
+        function: _lambda.Function = _lambda.Function(
+            self,
+            "snapshot",
+            function_name=get_resource_name("lambda", "-snapshot"),
+            runtime=_lambda.Runtime.PYTHON_3_10,
+            architecture=_lambda.Architecture.X86_64,
+            code=_lambda.Code.from_asset(".build/lambdas"),
+            handler="service.handlers.snapshot.main",
+            layers=[self.layer],
+            environment={
+                **get_logging_environment(),
+                "TABLE_NAME": self.api_db.table.table_name,
+                "SNAPSHOT_TABLE_NAME": self.api_db.snapshot_table.table_name,
+            },
+            tracing=_lambda.Tracing.ACTIVE,
+            retry_attempts=0,
+            timeout=Duration.seconds(30),
+            memory_size=128,
+            role=cast(iam.IRole, self.snapshot_role),
+            log_retention=RetentionDays.ONE_DAY,
+        )
+        # Batching the stream collapses bursts of registrations into one write per shard. Only
+        # registrations, deletions and is_active flips reach the function, the checker's schedule
+        # updates are most of the stream and are dropped by the event source mapping.
+        active_changes = [
+            _lambda.FilterCriteria.filter(
+                {
+                    "eventName": _lambda.FilterRule.is_equal("MODIFY"),
+                    "dynamodb": {
+                        "NewImage": {"is_active": {"BOOL": [active]}},
+                        "OldImage": {"is_active": {"BOOL": [not active]}},
+                    },
+                }
+            )
+            for active in (True, False)
+        ]
+        function.add_event_source(
+            sources.DynamoEventSource(
+                self.api_db.table,
+                starting_position=_lambda.StartingPosition.LATEST,
+                batch_size=100,
+                max_batching_window=Duration.seconds(5),
+                retry_attempts=3,
+                bisect_batch_on_error=True,
+                filters=[
+                    _lambda.FilterCriteria.filter(
+                        {"eventName": _lambda.FilterRule.or_("INSERT", "REMOVE")}
+                    ),
+                    *active_changes,
+                ],
+            )
+        )
+
+        return function
@@ -1,3 +1,5 @@
+import json
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,6 +10,21 @@ class Settings(BaseSettings):
     component: str = Field("endpoint-checker", alias="COMPONENT")
     account: str = Field(alias="AWS_ACCOUNT")
     region: str = Field("eu-west-1", alias="AWS_REGION")
+    check_rate_minutes: int = Field(1, alias="CHECK_RATE_MINUTES")
+    check_concurrency: int = Field(32, alias="CHECK_CONCURRENCY")
+    check_shard_size: int = Field(100, alias="CHECK_SHARD_SIZE")
+    results_retention_days: int = Field(30, alias="RESULTS_RETENTION_DAYS")
+    listing_cache_ttl: int = Field(30, alias="LISTING_CACHE_TTL")
+    # Listing reads through the low-level DynamoDB client, skipping the resource layer types
+    dynamodb_client_reads: bool = Field(False, alias="DYNAMODB_CLIENT_READS")
+    # JSON list such as ["eu-west-1", "us-east-1"], empty probes from `region` only
+    probe_regions: list[str] = Field([], alias="PROBE_REGIONS")
+    probe_replicas: int = Field(3, alias="PROBE_REPLICAS")
+    log_level: str = Field("INFO", alias="LOG_LEVEL")
+    # Share of the INFO records kept, per logger in LOG_SAMPLE_RATES as a JSON map such as
+    # {"service.handlers.urls_get": 0.1}, warnings and errors are always kept
+    log_sample_rate: float = Field(1.0, alias="LOG_SAMPLE_RATE")
+    log_sample_rates: dict[str, float] = Field({}, alias="LOG_SAMPLE_RATES")
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -17,6 +34,15 @@ def get_settings() -> Settings:
     return settings
 
 
+def get_logging_environment() -> dict[str, str]:
+    settings = get_settings()
+    return {
+        "LOG_LEVEL": settings.log_level,
+        "LOG_SAMPLE_RATE": str(settings.log_sample_rate),
+        "LOG_SAMPLE_RATES": json.dumps(settings.log_sample_rates),
+    }
+
+
 def get_stack_name() -> str:
     settings = get_settings()
     prefix = f"{settings.enivronment[0]}-{settings.owner}"
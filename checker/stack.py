@@ -2,6 +2,7 @@ from aws_cdk import Environment, Stack, Tags
 from constructs import Construct
 from typing_extensions import Self, TypedDict, Unpack
 
+from checker.probe_region import ProbeRegion
 from checker.rest_api import RestApi
 from checker.settings import get_settings
 
@@ -20,3 +21,13 @@ class Checker(Stack):
         self.api = RestApi(self, id="restapi")
 
         Tags.of(self).add("createdBy", settings.owner)
+
+
+class ProbeRegionStack(Stack):
+    # Deployed to every probe region other than the home region
+    def __init__(self: Self, scope: Construct, id: str, **kwargs: Unpack[Kwargs]) -> None:
+        super().__init__(scope, id, **kwargs)
+
+        self.probe_region = ProbeRegion(self, id="probe")
+
+        Tags.of(self).add("createdBy", settings.owner)
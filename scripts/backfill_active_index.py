@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+#
+# Adds the sparse active and due index keys to endpoints registered before the indexes existed,
+# those endpoints become due at once.
+# Run with: python -m scripts.backfill_active_index <table-name> [segments]
+
+import sys
+import time
+
+from boto3.dynamodb.conditions import Attr
+from mypy_boto3_dynamodb.service_resource import Table
+
+from service.common.clients import get_table
+from service.common.dynamodb import (
+    ACTIVE_INDEX_KEY,
+    DUE_INDEX_KEY,
+    active_shard,
+    parallel_scan_pages,
+    projection,
+)
+
+
+def backfill(table_name: str, segments: int) -> int:
+    table: Table = get_table(table_name)
+    pages = parallel_scan_pages(
+        table,
+        segments,
+        FilterExpression=Attr("is_active").eq(True)
+        & (Attr(ACTIVE_INDEX_KEY).not_exists() | Attr(DUE_INDEX_KEY).not_exists()),
+        **projection("id"),
+    )
+
+    now = int(time.time())
+    updated = 0
+    for items in pages:
+        for item in items:
+            id = str(item["id"])
+            try:
+                table.update_item(
+                    Key={"id": id},
+                    UpdateExpression="""SET
+                        #active_shard = :active_shard,
+                        #next_check_at = if_not_exists(#next_check_at, :now)""",
+                    ConditionExpression=Attr("is_active").eq(True),
+                    ExpressionAttributeNames={
+                        "#active_shard": ACTIVE_INDEX_KEY,
+                        "#next_check_at": DUE_INDEX_KEY,
+                    },
+                    ExpressionAttributeValues={":active_shard": active_shard(id), ":now": now},
+                )
+                updated += 1
+            except table.meta.client.exceptions.ConditionalCheckFailedException:
+                # Deactivated since it was scanned
+                continue
+    return updated
+
+
+if __name__ == "__main__":
+    segments = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"Backfilled {backfill(sys.argv[1], segments)} endpoints")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+#
+# Moves endpoints registered with a random uuid4 id to the id derived from their canonical url, so
+# registrations recognise them as duplicates. Clients holding a legacy id have to look the endpoint
+# up again, and its check results stay under the legacy id.
+# Run with: python -m scripts.migrate_endpoint_ids <table-name> [segments]
+
+import sys
+from collections import Counter
+from typing import Any
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+from mypy_boto3_dynamodb import DynamoDBClient
+from mypy_boto3_dynamodb.service_resource import Table
+
+from service.common.clients import get_table
+from service.common.dynamodb import ACTIVE_INDEX_KEY, active_shard, parallel_scan_pages
+from service.common.urls import canonical_url, endpoint_id
+
+serializer = TypeSerializer()
+
+
+def migrate_item(client: DynamoDBClient, table_name: str, item: dict[str, Any]) -> str:
+    # Returns what happened to the endpoint: "current", "migrated", "skipped" or "invalid"
+    try:
+        target_url = canonical_url(str(item["target_url"]))
+    except ValueError:
+        return "invalid"
+    id = endpoint_id(target_url)
+    if item["id"] == id:
+        return "current"
+
+    moved = {**item, "id": id, "target_url": target_url}
+    if ACTIVE_INDEX_KEY in item:
+        moved[ACTIVE_INDEX_KEY] = active_shard(id)
+    try:
+        # The legacy item only goes away if it was not (de)activated since the scan
+        client.transact_write_items(
+            TransactItems=[
+                {
+                    "Put": {
+                        "TableName": table_name,
+                        "Item": {
+                            name: serializer.serialize(value) for name, value in moved.items()
+                        },
+                        "ConditionExpression": "attribute_not_exists(id)",
+                    }
+                },
+                {
+                    "Delete": {
+                        "TableName": table_name,
+                        "Key": {"id": serializer.serialize(item["id"])},
+                        "ConditionExpression": "is_active = :is_active",
+                        "ExpressionAttributeValues": {
+                            ":is_active": serializer.serialize(item.get("is_active", False))
+                        },
+                    }
+                },
+            ]
+        )
+    except ClientError as err:
+        if err.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+            raise
+        # The url was registered again under its own id, or the legacy item changed since the
+        # scan. Either way it is left for a later run or for its owner to delete.
+        return "skipped"
+    return "migrated"
+
+
+def migrate(table_name: str, segments: int) -> Counter[str]:
+    table: Table = get_table(table_name)
+    outcomes: Counter[str] = Counter()
+    for items in parallel_scan_pages(table, segments):
+        for item in items:
+            outcomes[migrate_item(table.meta.client, table_name, item)] += 1
+    return outcomes
+
+
+if __name__ == "__main__":
+    segments = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    outcomes = migrate(sys.argv[1], segments)
+    print(", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())))
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import math
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Union
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+# EMF accepts at most 100 distinct values per metric in one record
+EMF_MAX_VALUES = 100
+
+# A single data point, or a distribution as EMF {"Values": [...], "Counts": [...]} arrays
+MetricValue = Union[float, dict[str, list[float]]]
+
+
+class QuantileSketch:
+    # Streaming quantile sketch with logarithmic buckets (DDSketch). Every estimate is within
+    # `relative_accuracy` of the true value, memory grows with the logarithm of the value range
+    # rather than the number of samples, and sketches of different runs can be merged.
+    def __init__(self: Self, relative_accuracy: float = 0.01, min_value: float = 1e-3) -> None:
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self: Self, value: float) -> None:
+        self.count += 1
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self: Self, other: QuantileSketch) -> None:
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self: Self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.buckets))
+
+    def bucket_value(self: Self, index: int) -> float:
+        # Midpoint of the bucket in relative terms
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def distributions(self: Self, max_values: int = EMF_MAX_VALUES) -> list[dict[str, list[float]]]:
+        # The sketch as EMF Values/Counts arrays, every bucket midpoint standing in for the
+        # samples of its bucket. CloudWatch computes percentiles over the arrays of every record,
+        # so the percentiles of a run span all of its workers. Split in chunks of `max_values`.
+        pairs = [(0.0, self.zero_count)] if self.zero_count else []
+        pairs += [
+            (round(self.bucket_value(index), 3), count)
+            for index, count in sorted(self.buckets.items())
+        ]
+        return [
+            {
+                "Values": [value for value, _ in pairs[start : start + max_values]],
+                "Counts": [count for _, count in pairs[start : start + max_values]],
+            }
+            for start in range(0, len(pairs), max_values)
+        ]
+
+
+def emf_record(
+    namespace: str,
+    dimensions: dict[str, str],
+    values: dict[str, MetricValue],
+    units: dict[str, str],
+) -> dict[str, Any]:
+    # CloudWatch Embedded Metric Format, the log line itself becomes the metric data points so
+    # no PutMetricData calls are needed
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [list(dimensions)],
+                    "Metrics": [{"Name": name, "Unit": units.get(name, "None")} for name in values],
+                }
+            ],
+        },
+        **dimensions,
+        **values,
+    }
+
+
+def emit_emf(records: Iterable[dict[str, Any]]) -> None:
+    # EMF lines must reach the log stream as bare JSON, the logging module would prefix them
+    for record in records:
+        sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
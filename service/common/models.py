@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Literal, Optional, cast
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from service.common.dynamodb import ACTIVE_INDEX_KEY, active_shard
+from service.common.scheduling import (
+    DEFAULT_CHECK_INTERVAL,
+    MAX_CHECK_INTERVAL,
+    MIN_CHECK_INTERVAL,
+)
+from service.common.urls import canonical_url, endpoint_id
+from service.prober.probes import (
+    DEFAULT_EXPECTED_STATUS,
+    DEFAULT_PROBE_METHOD,
+    MAX_BODY_MATCH_LENGTH,
+)
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+
+class ProbeSpec(BaseModel):
+    # How the checker probes an endpoint, see service/prober/probes.py. Without a path the path
+    # of the target url is requested.
+    method: Literal["HEAD", "GET"] = DEFAULT_PROBE_METHOD
+    path: Optional[str] = Field(default=None, pattern=r"^/", max_length=2048)
+    expected_status: list[list[int]] = Field(
+        default_factory=lambda: [list(status) for status in DEFAULT_EXPECTED_STATUS],
+        min_length=1,
+        max_length=10,
+    )
+    body_match: Optional[str] = Field(default=None, min_length=1, max_length=MAX_BODY_MATCH_LENGTH)
+
+    @field_validator("expected_status", mode="before")
+    @classmethod
+    def expand_single_statuses(cls: type[Self], expected_status: object) -> object:
+        # 200 is short for the range [200, 200]
+        if isinstance(expected_status, list):
+            statuses = cast("list[object]", expected_status)
+            return [[status, status] if isinstance(status, int) else status for status in statuses]
+        return expected_status
+
+    @field_validator("expected_status")
+    @classmethod
+    def check_status_ranges(cls: type[Self], expected_status: list[list[int]]) -> list[list[int]]:
+        for status in expected_status:
+            if len(status) != 2 or not 100 <= status[0] <= status[1] <= 599:
+                raise ValueError("expected_status ranges must be [low, high] within 100 to 599")
+        return expected_status
+
+    @model_validator(mode="after")
+    def check_body_match_method(self: Self) -> ProbeSpec:
+        if self.body_match and self.method != "GET":
+            raise ValueError("body_match needs the GET method")
+        return self
+
+
+class Endpoint(BaseModel):
+    id: str = ""
+    target_url: str
+    is_active: bool
+    created_at: int
+    check_interval: int = Field(
+        default=DEFAULT_CHECK_INTERVAL, ge=MIN_CHECK_INTERVAL, le=MAX_CHECK_INTERVAL
+    )
+    # Interval after backoff, next_check_at is the due-index sort key. New endpoints are due
+    # immediately.
+    current_interval: int = 0
+    next_check_at: int = 0
+    probe: ProbeSpec = Field(default_factory=lambda: ProbeSpec())
+
+    @field_validator("target_url")
+    @classmethod
+    def canonicalise_target_url(cls: type[Self], target_url: str) -> str:
+        return canonical_url(target_url)
+
+    @model_validator(mode="after")
+    def derive_id(self: Self) -> Endpoint:
+        if not self.id:
+            self.id = endpoint_id(self.target_url)
+        return self
+
+    @model_validator(mode="after")
+    def derive_schedule(self: Self) -> Endpoint:
+        if not self.current_interval:
+            self.current_interval = self.check_interval
+        if not self.next_check_at:
+            self.next_check_at = self.created_at
+        return self
+
+
+def endpoint_item(entry: Endpoint) -> dict[str, Any]:
+    # Only active endpoints carry the sparse index key
+    item = entry.model_dump()
+    if entry.is_active:
+        item[ACTIVE_INDEX_KEY] = active_shard(entry.id)
+    return item
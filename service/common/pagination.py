@@ -0,0 +1,64 @@
+import base64
+import json
+from decimal import Decimal
+from typing import Any, Optional, Union, cast
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+# Shape of a cursor: the type of each value by name, a nested shape for a nested value and a
+# tuple of shapes for alternatives
+CursorShape = dict[str, Any]
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def _to_json(value: object) -> Union[int, str]:
+    return int(value) if isinstance(value, Decimal) else str(value)
+
+
+def encode_next_token(cursor: Optional[dict[str, Any]]) -> Optional[str]:
+    # Opaque token handed to the client, built from the LastEvaluatedKey of the page
+    if not cursor:
+        return None
+    payload = json.dumps(cursor, default=_to_json, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _matches(value: object, shape: Union[type, tuple[Any, ...], CursorShape]) -> bool:
+    if isinstance(shape, tuple):
+        return any(_matches(value, alternative) for alternative in shape)
+    if isinstance(shape, dict):
+        if not isinstance(value, dict):
+            return False
+        fields = cast("dict[str, object]", value)
+        return fields.keys() == shape.keys() and all(
+            _matches(fields[name], shape[name]) for name in shape
+        )
+    # JSON booleans are ints to isinstance, no cursor holds one
+    return isinstance(value, shape) and not isinstance(value, bool)
+
+
+def decode_next_token(next_token: Optional[str], *shapes: CursorShape) -> Optional[dict[str, Any]]:
+    # The token must decode to one of the cursor `shapes` the caller issues, anything else is the
+    # client's error rather than a KeyError further down
+    if not next_token:
+        return None
+    try:
+        start_key = json.loads(base64.urlsafe_b64decode(next_token.encode()))
+    except ValueError as err:
+        raise InvalidPageRequest("next_token is not valid") from err
+    if not any(_matches(start_key, shape) for shape in shapes):
+        raise InvalidPageRequest("next_token is not valid")
+    return start_key  # type: ignore
+
+
+def parse_limit(limit: Optional[str]) -> int:
+    if not limit:
+        return DEFAULT_PAGE_LIMIT
+    if not limit.isdigit() or not 0 < int(limit) <= MAX_PAGE_LIMIT:
+        raise InvalidPageRequest(f"limit must be a number between 1 and {MAX_PAGE_LIMIT}")
+    return int(limit)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from typing import Optional
+
+# With several probe regions every endpoint is probed from `replicas` of them and its status is
+# whatever a quorum of those regions agrees on, so one slow network path does not take an
+# endpoint offline for everyone.
+DEFAULT_PROBE_REPLICAS = 3
+
+# Verdicts that count as a vote, suppressed and unchecked probes say nothing about the endpoint
+VOTING_STATUSES = ("online", "offline")
+
+
+def assigned_regions(id: str, regions: list[str], replicas: int) -> list[str]:
+    # Rendezvous hashing: every endpoint gets a stable set of regions, adding or removing a
+    # region only moves the endpoints that region gains or loses
+    ranked = sorted(
+        regions, key=lambda region: hashlib.sha1(f"{region}/{id}".encode()).digest(), reverse=True
+    )
+    return ranked[: max(min(replicas, len(regions)), 1)]
+
+
+def quorum_size(replicas: int) -> int:
+    return replicas // 2 + 1
+
+
+def quorum_status(statuses: dict[str, str], expected: int) -> Optional[str]:
+    # `statuses` holds the verdict of every region that reported so far out of the `expected`
+    # ones. Returns the agreed status, None while the quorum is still open.
+    votes = Counter(status for status in statuses.values() if status in VOTING_STATUSES)
+    quorum = quorum_size(expected)
+    for status in VOTING_STATUSES:
+        if votes[status] >= quorum:
+            return status
+    if len(statuses) < expected:
+        return None
+    # Every region reported without a quorum, the majority of the votes cast decides and a tie
+    # counts as offline
+    if votes:
+        return "offline" if votes["offline"] >= votes["online"] else "online"
+    return "suppressed" if "suppressed" in statuses.values() else "unchecked"
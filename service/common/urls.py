@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import uuid
+from urllib.parse import urlsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    # Lowercase scheme and host, drop default ports, fragments and trailing slashes so every
+    # spelling of an endpoint maps to the same string. Urls without a scheme stay scheme-less,
+    # the prober tries those on both http and https.
+    parts = urlsplit(url.strip() if "://" in url else f"//{url.strip()}")
+    scheme = parts.scheme.lower()
+    if scheme and scheme not in DEFAULT_PORTS:
+        raise ValueError(f"unsupported scheme '{scheme}'")
+    try:
+        host, port = parts.hostname, parts.port
+    except ValueError as err:
+        raise ValueError("port is not valid") from err
+    if not host:
+        raise ValueError("host is missing")
+
+    netloc = host.rstrip(".")
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    path = parts.path.rstrip("/") or "/"
+    query = f"?{parts.query}" if parts.query else ""
+
+    return f"{scheme}://{netloc}{path}{query}" if scheme else f"{netloc}{path}{query}"
+
+
+def endpoint_id(target_url: str) -> str:
+    # Deterministic id for a canonical url, a conditional put on it rejects duplicates
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, target_url))
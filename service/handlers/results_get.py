@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import json
+from os import environ
+from typing import TYPE_CHECKING, Any, Optional
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from service.common.clients import get_table
+from service.common.logs import get_logger
+from service.common.pagination import (
+    InvalidPageRequest,
+    decode_next_token,
+    encode_next_token,
+    parse_limit,
+)
+
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import APIGatewayProxyEventV1
+    from mypy_boto3_dynamodb.service_resource import Table
+
+logger = get_logger(__name__)
+
+# next_token cursor, the LastEvaluatedKey of the results query
+RESULTS_CURSOR = {"endpoint_id": str, "checked_at": int}
+
+
+def get_db_table_name() -> str:
+    table_name = str(environ.get("RESULTS_TABLE_NAME"))
+    logger.debug("Loaded dynamodb results table: %s", table_name)
+    return table_name
+
+
+def query_results(
+    table_name: str, id: str, limit: int, start_key: Optional[dict[str, Any]]
+) -> tuple[list[dict[str, Any]], Optional[str]]:
+    table: Table = get_table(table_name)
+    # Newest first, one page per request so the response size is bounded by the limit
+    query: dict[str, Any] = {
+        "KeyConditionExpression": Key("endpoint_id").eq(id),
+        "ScanIndexForward": False,
+        "Limit": limit,
+    }
+    if start_key:
+        query["ExclusiveStartKey"] = start_key
+    response = table.query(**query)
+
+    records: list[dict[str, Any]] = []
+    for item in response.get("Items", []):
+        records.append(
+            {
+                "checked_at": int(item["checked_at"]),  # type: ignore
+                "target_url": item["target_url"],
+                "is_online": item["is_online"],
+                "status": item.get("status", "online" if item["is_online"] else "offline"),
+                "error": item.get("error", ""),
+                "latency_ms": {
+                    phase: float(value)  # type: ignore
+                    for phase, value in item.get("latency_ms", {}).items()  # type: ignore
+                },
+            }
+        )
+
+    return records, encode_next_token(response.get("LastEvaluatedKey"))
+
+
+def main(event: APIGatewayProxyEventV1, context: Context):
+    if not event["pathParameters"]:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Id is missing from request"}),
+        }
+
+    id = event["pathParameters"]["id"]
+    parameters = event["queryStringParameters"] or {}
+    try:
+        limit = parse_limit(parameters.get("limit"))
+        start_key = decode_next_token(parameters.get("next_token"), RESULTS_CURSOR)
+        if start_key and start_key["endpoint_id"] != id:
+            raise InvalidPageRequest("next_token belongs to another endpoint")
+    except InvalidPageRequest as err:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": str(err)}),
+        }
+
+    try:
+        records, next_token = query_results(get_db_table_name(), id, limit, start_key)
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": records, "next_token": next_token}),
+        }
+    except ClientError as err:
+        logger.error("Error: %s", err)
+        return {
+            "statusCode": 418,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Whoops! something went wrong"}),
+        }
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import json
+from os import environ
+from typing import TYPE_CHECKING, Any, Optional
+
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from service.common.clients import get_dynamodb, get_table
+from service.common.dynamodb import (
+    ACTIVE_INDEX_KEY,
+    ACTIVE_INDEX_NAME,
+    ACTIVE_INDEX_SHARDS,
+    active_shard,
+    projection,
+    query_pages,
+)
+from service.common.logs import get_logger
+from service.common.snapshot import (
+    MAX_SHARD_BYTES,
+    SNAPSHOT_KEY,
+    VERSION_SHARD,
+    SnapshotEntry,
+    pack_entries,
+    unpack_entries,
+    version_attribute,
+)
+
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import DynamoDBStreamEvent
+    from mypy_boto3_dynamodb.service_resource import Table
+
+logger = get_logger(__name__)
+
+deserializer = TypeDeserializer()
+serializer = TypeSerializer()
+
+# Concurrent stream shards can update the same snapshot shard, a lost race is retried from a
+# fresh read
+MAX_ATTEMPTS = 5
+
+
+def get_db_table_name() -> str:
+    table_name = str(environ.get("TABLE_NAME"))
+    logger.debug("Loaded dynamodb table: %s", table_name)
+    return table_name
+
+
+def get_snapshot_table_name() -> str:
+    table_name = str(environ.get("SNAPSHOT_TABLE_NAME"))
+    logger.debug("Loaded dynamodb snapshot table: %s", table_name)
+    return table_name
+
+
+def snapshot_entry(image: Optional[dict[str, Any]]) -> Optional[SnapshotEntry]:
+    if not image or not image.get("is_active"):
+        return None
+    return str(image["target_url"]), int(image["created_at"])
+
+
+def endpoint_changes(
+    records: list[dict[str, Any]],
+) -> dict[int, dict[str, Optional[SnapshotEntry]]]:
+    # Latest entry per endpoint grouped by snapshot shard, None removes the endpoint. Most records
+    # are the checker scheduling the next check, those leave the entry alone and are skipped.
+    changes: dict[int, dict[str, Optional[SnapshotEntry]]] = {}
+    for record in records:
+        images = {
+            name: {key: deserializer.deserialize(value) for key, value in image.items()}
+            for name, image in record["dynamodb"].items()
+            if name in ("Keys", "NewImage", "OldImage")
+        }
+        entry = snapshot_entry(images.get("NewImage"))
+        if record["eventName"] == "MODIFY" and entry == snapshot_entry(images.get("OldImage")):
+            continue
+        id = str(images["Keys"]["id"])
+        changes.setdefault(active_shard(id), {})[id] = entry
+    return changes
+
+
+def rebuild_shard(table_name: str, shard: int) -> dict[str, SnapshotEntry]:
+    # A shard without a snapshot item yet starts from the active index, records that follow in
+    # the stream are applied on top
+    table: Table = get_table(table_name)
+    pages = query_pages(
+        table,
+        IndexName=ACTIVE_INDEX_NAME,
+        KeyConditionExpression=Key(ACTIVE_INDEX_KEY).eq(shard),
+        **projection("id", "target_url", "created_at"),
+    )
+    entries: dict[str, SnapshotEntry] = {}
+    for items in pages:
+        for item in items:
+            created_at = int(item["created_at"])  # type: ignore
+            entries[str(item["id"])] = (str(item["target_url"]), created_at)
+    logger.info("Rebuilt snapshot shard %s with %s endpoints", shard, len(entries))
+    return entries
+
+
+def write_shard(
+    snapshot_table_name: str, shard: int, packed: bytes, version: Optional[int]
+) -> None:
+    # The shard item and its version in the version item change together, the condition on the
+    # shard version makes a concurrent writer fail instead of losing its update
+    client = get_dynamodb().meta.client
+    put: dict[str, Any] = {
+        "TableName": snapshot_table_name,
+        "Item": {
+            SNAPSHOT_KEY: serializer.serialize(shard),
+            "version": serializer.serialize((version or 0) + 1),
+            "endpoints": serializer.serialize(packed),
+        },
+    }
+    if version is None:
+        put["ConditionExpression"] = f"attribute_not_exists({SNAPSHOT_KEY})"
+    else:
+        put["ConditionExpression"] = "version = :version"
+        put["ExpressionAttributeValues"] = {":version": serializer.serialize(version)}
+    # Never recreates a version item that was deleted, or revives a disabled snapshot
+    update = {
+        "TableName": snapshot_table_name,
+        "Key": {SNAPSHOT_KEY: serializer.serialize(VERSION_SHARD)},
+        "UpdateExpression": "SET #version = :version",
+        "ConditionExpression": "attribute_exists(#key) AND attribute_not_exists(#disabled)",
+        "ExpressionAttributeNames": {
+            "#version": version_attribute(shard),
+            "#key": SNAPSHOT_KEY,
+            "#disabled": "disabled",
+        },
+        "ExpressionAttributeValues": {":version": serializer.serialize((version or 0) + 1)},
+    }
+    client.transact_write_items(TransactItems=[{"Put": put}, {"Update": update}])  # type: ignore
+
+
+def merge_changes(
+    entries: dict[str, SnapshotEntry], changes: dict[str, Optional[SnapshotEntry]]
+) -> bytes:
+    for id, entry in changes.items():
+        if entry:
+            entries[id] = entry
+        else:
+            entries.pop(id, None)
+    return pack_entries(entries)
+
+
+def disable_snapshot(snapshot_table: Table, shard: int, size: int) -> None:
+    # Readers seeing the flag go back to querying the active index and writers stop updating the
+    # shards. Deleting the version item re-enables the snapshot, the next write rebuilds it.
+    logger.error("Snapshot shard %s is %s bytes, disabling the snapshot", shard, size)
+    snapshot_table.update_item(
+        Key={SNAPSHOT_KEY: VERSION_SHARD},
+        UpdateExpression="SET #disabled = :disabled",
+        ExpressionAttributeNames={"#disabled": "disabled"},
+        ExpressionAttributeValues={":disabled": True},
+    )
+
+
+def publish_snapshot(
+    table_name: str,
+    snapshot_table_name: str,
+    changes: dict[int, dict[str, Optional[SnapshotEntry]]],
+) -> None:
+    # First write to a snapshot without a version item: every shard is rebuilt from the active
+    # index before the version item is created, readers never see a snapshot missing shards
+    snapshot_table: Table = get_table(snapshot_table_name)
+    versions: dict[str, int] = {}
+    for shard in range(ACTIVE_INDEX_SHARDS):
+        item = snapshot_table.get_item(Key={SNAPSHOT_KEY: shard}, ConsistentRead=True).get("Item")
+        version = int(item["version"]) + 1 if item else 1  # type: ignore
+        packed = merge_changes(rebuild_shard(table_name, shard), changes.get(shard, {}))
+        if len(packed) > MAX_SHARD_BYTES:
+            disable_snapshot(snapshot_table, shard, len(packed))
+            return
+        # Unread until the version item exists, a concurrent rebuild writes the same endpoints
+        snapshot_table.put_item(Item={SNAPSHOT_KEY: shard, "version": version, "endpoints": packed})
+        versions[version_attribute(shard)] = version
+
+    try:
+        snapshot_table.put_item(
+            Item={SNAPSHOT_KEY: VERSION_SHARD, **versions},
+            ConditionExpression=Attr(SNAPSHOT_KEY).not_exists(),
+        )
+        logger.info("Published the snapshot with %s shards", len(versions))
+    except ClientError as err:
+        if err.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        logger.info("Snapshot was published concurrently")
+
+
+def apply_changes(
+    table_name: str,
+    snapshot_table_name: str,
+    shard: int,
+    changes: dict[str, Optional[SnapshotEntry]],
+) -> None:
+    snapshot_table: Table = get_table(snapshot_table_name)
+    for _ in range(MAX_ATTEMPTS):
+        item = snapshot_table.get_item(Key={SNAPSHOT_KEY: shard}, ConsistentRead=True).get("Item")
+        if item:
+            entries = unpack_entries(bytes(item["endpoints"]))  # type: ignore
+            version: Optional[int] = int(item["version"])  # type: ignore
+        else:
+            entries = rebuild_shard(table_name, shard)
+            version = None
+
+        packed = merge_changes(entries, changes)
+        if len(packed) > MAX_SHARD_BYTES:
+            disable_snapshot(snapshot_table, shard, len(packed))
+            return
+
+        try:
+            write_shard(snapshot_table_name, shard, packed, version)
+            logger.info("Snapshot shard %s holds %s endpoints", shard, len(entries))
+            return
+        except ClientError as err:
+            if err.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                raise
+            logger.info("Snapshot shard %s changed concurrently, retrying", shard)
+    raise RuntimeError(f"Snapshot shard {shard} kept changing, giving up after {MAX_ATTEMPTS}")
+
+
+def update_snapshot(
+    table_name: str,
+    snapshot_table_name: str,
+    changes: dict[int, dict[str, Optional[SnapshotEntry]]],
+) -> None:
+    snapshot_table: Table = get_table(snapshot_table_name)
+    versions = snapshot_table.get_item(Key={SNAPSHOT_KEY: VERSION_SHARD}, ConsistentRead=True).get(
+        "Item"
+    )
+    if not versions:
+        publish_snapshot(table_name, snapshot_table_name, changes)
+    elif versions.get("disabled"):
+        logger.warning("Snapshot is disabled, skipping changes to %s shards", len(changes))
+    else:
+        for shard, shard_changes in changes.items():
+            apply_changes(table_name, snapshot_table_name, shard, shard_changes)
+
+
+# Stream consumer: keeps the snapshot in step with registrations, a failed batch is retried by
+# the event source mapping
+def main(event: DynamoDBStreamEvent, context: Context):
+    changes = endpoint_changes(event["Records"])  # type: ignore
+    if changes:
+        update_snapshot(get_db_table_name(), get_snapshot_table_name(), changes)
+    logger.info("Applied changes to %s snapshot shards", len(changes))
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps({"message": "Success"}),
+    }
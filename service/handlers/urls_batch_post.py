@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+from __future__ import annotations
+
+import json
+import time
+from os import environ
+from typing import TYPE_CHECKING, Any, cast
+
+from botocore.exceptions import ClientError
+from pydantic import ValidationError
+
+from service.common.clients import get_dynamodb
+from service.common.dynamodb import batch_existing_keys, put_new_items
+from service.common.logs import get_logger
+from service.common.models import Endpoint, endpoint_item
+from service.common.scheduling import DEFAULT_CHECK_INTERVAL
+
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import APIGatewayProxyEventV1
+
+logger = get_logger(__name__)
+
+# Keeps one request well inside the function timeout and the API Gateway payload limit
+MAX_BATCH_SIZE = 1000
+
+
+def get_db_table_name() -> str:
+    table_name = str(environ.get("TABLE_NAME"))
+    logger.debug("Loaded dynamodb table: %s", table_name)
+    return table_name
+
+
+def validate_endpoints(
+    endpoints: list[Any], created_at: int
+) -> tuple[list[tuple[int, Endpoint]], list[dict[str, Any]]]:
+    # One pass over the request, returns the valid entries and a result for every invalid one
+    entries: list[tuple[int, Endpoint]] = []
+    invalid: list[dict[str, Any]] = []
+    for index, endpoint in enumerate(endpoints):
+        fields = cast("dict[str, Any]", endpoint) if isinstance(endpoint, dict) else {}
+        try:
+            entry = Endpoint.model_validate(
+                {
+                    "target_url": fields.get("target_url"),
+                    "check_interval": fields.get("check_interval", DEFAULT_CHECK_INTERVAL),
+                    "probe": fields.get("probe") or {},
+                    "is_active": True,
+                    "created_at": created_at,
+                }
+            )
+            entries.append((index, entry))
+        except ValidationError as err:
+            error = "; ".join(detail["msg"] for detail in err.errors())
+            invalid.append({"index": index, "status": "invalid", "error": error})
+    return entries, invalid
+
+
+def deduplicate_endpoints(
+    table_name: str, entries: list[tuple[int, Endpoint]]
+) -> tuple[list[tuple[int, Endpoint]], list[dict[str, Any]]]:
+    # Ids are derived from the canonical url, so repeats within the request and urls that
+    # are already registered both show up as id collisions. Endpoints whose lookup stayed
+    # throttled are reported as failed rather than guessed to be new.
+    unique: dict[str, tuple[int, Endpoint]] = {}
+    skipped: list[dict[str, Any]] = []
+    for index, entry in entries:
+        if entry.id in unique:
+            skipped.append(
+                {
+                    "index": index,
+                    "target_url": entry.target_url,
+                    "status": "duplicate",
+                    "id": entry.id,
+                }
+            )
+        else:
+            unique[entry.id] = (index, entry)
+
+    existing, unprocessed = batch_existing_keys(get_dynamodb(), table_name, "id", list(unique))
+    for id in existing:
+        index, entry = unique.pop(id)
+        skipped.append(
+            {"index": index, "target_url": entry.target_url, "status": "duplicate", "id": id}
+        )
+    for id in unprocessed:
+        index, entry = unique.pop(id)
+        skipped.append(
+            {
+                "index": index,
+                "target_url": entry.target_url,
+                "status": "failed",
+                "error": "lookup was throttled",
+            }
+        )
+    logger.info(
+        "Skipping %s registered endpoints, %s lookups failed", len(existing), len(unprocessed)
+    )
+    return list(unique.values()), skipped
+
+
+def add_items(table_name: str, entries: list[tuple[int, Endpoint]]) -> list[dict[str, Any]]:
+    # A url registered since the lookup still comes back as a duplicate, the puts are conditional
+    failed = put_new_items(
+        get_dynamodb(), table_name, "id", [endpoint_item(entry) for _, entry in entries]
+    )
+    logger.info(
+        "Added %s items to dynamodb, %s not written", len(entries) - len(failed), len(failed)
+    )
+
+    results: list[dict[str, Any]] = []
+    for index, entry in entries:
+        result = {"index": index, "target_url": entry.target_url}
+        outcome = failed.get(entry.id)
+        if outcome == "duplicate":
+            results.append({**result, "status": "duplicate", "id": entry.id})
+        elif outcome:
+            results.append({**result, "status": "failed", "error": f"write failed: {outcome}"})
+        else:
+            results.append({**result, "status": "created", "id": entry.id})
+    return results
+
+
+def main(event: APIGatewayProxyEventV1, context: Context):
+    data = json.loads(event["body"]) if event["body"] else None
+    endpoints = cast("dict[str, Any]", data).get("endpoints") if isinstance(data, dict) else None
+    if not isinstance(endpoints, list) or not endpoints:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Body must contain a list of endpoints"}),
+        }
+
+    endpoints = cast("list[Any]", endpoints)
+    if len(endpoints) > MAX_BATCH_SIZE:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": f"At most {MAX_BATCH_SIZE} endpoints per request"}),
+        }
+
+    table_name = get_db_table_name()
+    entries, results = validate_endpoints(endpoints, int(time.time()))
+    try:
+        entries, skipped = deduplicate_endpoints(table_name, entries)
+        results.extend(skipped)
+        results.extend(add_items(table_name, entries))
+    except ClientError as err:
+        logger.error("Error: %s", err)
+        return {
+            "statusCode": 418,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": "Whoops! something went wrong"}),
+        }
+
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps({"message": sorted(results, key=lambda result: result["index"])}),
+    }
@@ -1,47 +1,97 @@
 #!/usr/bin/env python
 
+from __future__ import annotations
+
+import hashlib
 import json
-import logging
+import time
 from os import environ
-from typing import Any
+from typing import TYPE_CHECKING, Any, Optional
 
-from aws_lambda_typing.context import Context
-from aws_lambda_typing.events import APIGatewayProxyEventV1
-from boto3 import resource
-from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
-from mypy_boto3_dynamodb import DynamoDBServiceResource
-from mypy_boto3_dynamodb.service_resource import Table
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+from service.common.clients import get_dynamodb_client, get_table
+from service.common.dynamodb import (
+    ACTIVE_PAGE_CURSOR,
+    projection,
+    query_active_page,
+    query_active_page_plain,
+)
+from service.common.logs import get_logger
+from service.common.pagination import (
+    InvalidPageRequest,
+    decode_next_token,
+    encode_next_token,
+    parse_limit,
+)
+from service.common.snapshot import SNAPSHOT_CURSOR, SnapshotReader
+
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import APIGatewayProxyEventV1
+    from mypy_boto3_dynamodb.service_resource import Table
+
+logger = get_logger(__name__)
+
+# Stream-maintained copy of the active endpoints, see service/handlers/snapshot.py
+snapshot = SnapshotReader()
+
+# Listing pages kept per warm container, keyed on (limit, next_token). Registrations go through
+# other functions and cannot invalidate it, so the ttl bounds how stale a listing can be.
+LISTING_CACHE_MAX_ENTRIES = 64
+listing_cache: dict[tuple[int, str], tuple[float, str, str]] = {}
 
 
 def get_db_table_name() -> str:
     table_name = str(environ.get("TABLE_NAME"))
-    logger.info(f"Loaded dynamodb table: {table_name}")
+    logger.debug("Loaded dynamodb table: %s", table_name)
+    return table_name
+
+
+def get_snapshot_table_name() -> str:
+    table_name = environ.get("SNAPSHOT_TABLE_NAME", "")
+    logger.debug("Loaded dynamodb snapshot table: %s", table_name or "none, reading the index")
     return table_name
 
 
-def get_db_resource(table_name: str) -> Table:
-    logger.info(f"Opening connection to dynamodb table: {table_name}")
-    dynamodb: DynamoDBServiceResource = resource("dynamodb")
-    return dynamodb.Table(table_name)
+def get_client_reads() -> bool:
+    client_reads = environ.get("DYNAMODB_CLIENT_READS", "false").lower() == "true"
+    logger.debug("Loaded dynamodb client reads: %s", client_reads)
+    return client_reads
 
 
-def scan_table(table_name: str) -> list[dict[str, Any]]:
-    table: Table = get_db_resource(table_name)
-    response = table.scan(FilterExpression=Key("is_active").eq(True))
+def get_cache_ttl() -> int:
+    cache_ttl = int(environ.get("LISTING_CACHE_TTL", 30))
+    logger.debug("Loaded listing cache ttl: %s", cache_ttl)
+    return cache_ttl
 
-    while "LastEvaluatedKey" in response:
-        response = table.scan(
-            FilterExpression=Key("is_active").eq(True),
-            ExclusiveStartKey=response["LastEvaluatedKey"],
+
+def query_table(
+    table_name: str, limit: int, cursor: Optional[dict[str, Any]]
+) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+    attributes = projection("id", "target_url", "is_active", "created_at")
+    if get_client_reads():
+        # Items arrive as plain values already, the records only fix the attribute order
+        items, next_cursor = query_active_page_plain(
+            get_dynamodb_client(), table_name, limit, cursor, **attributes
         )
+        records = [
+            {
+                "id": item["id"],
+                "target_url": item["target_url"],
+                "is_active": item["is_active"],
+                "created_at": item["created_at"],
+            }
+            for item in items
+        ]
+        return records, next_cursor
+
+    table: Table = get_table(table_name)
+    items, next_cursor = query_active_page(table, limit, cursor, **attributes)
 
     records: list[dict[str, Any]] = []
-    for item in response.get("Items", []):  # type: ignore
-        created_at = int(item["created_at"])  # type: ignore
+    for item in items:
+        created_at = int(item["created_at"])
         records.append(
             {
                 "id": item["id"],
@@ -51,22 +101,96 @@ def scan_table(table_name: str) -> list[dict[str, Any]]:
             }
         )
 
-    return records
+    return records, next_cursor
+
+
+def query_snapshot(
+    snapshot_table_name: str, limit: int, cursor: Optional[dict[str, Any]]
+) -> Optional[tuple[list[dict[str, Any]], Optional[dict[str, Any]]]]:
+    # None while no snapshot is available, the listing then falls back to the active index
+    if not snapshot_table_name or not snapshot.refresh(get_table(snapshot_table_name)):
+        if cursor and "after" in cursor:
+            raise InvalidPageRequest("next_token has expired")
+        return None
+    if cursor and "after" not in cursor:
+        raise InvalidPageRequest("next_token has expired")
+
+    rows, next_cursor = snapshot.page(limit, cursor)
+    records = [
+        {"id": id, "target_url": target_url, "is_active": True, "created_at": created_at}
+        for id, target_url, created_at in rows
+    ]
+    return records, next_cursor
+
+
+def get_listing(table_name: str, limit: int, next_token: str, cache_ttl: int) -> tuple[str, str]:
+    # Returns the response body and its etag, reading the table only on a cache miss
+    key = (limit, next_token)
+    cached = listing_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1], cached[2]
+
+    cursor = decode_next_token(next_token, SNAPSHOT_CURSOR, ACTIVE_PAGE_CURSOR)
+    page = query_snapshot(get_snapshot_table_name(), limit, cursor)
+    records, next_cursor = page or query_table(table_name, limit, cursor)
+    body = json.dumps({"message": records, "next_token": encode_next_token(next_cursor)})
+    etag = f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+
+    if len(listing_cache) >= LISTING_CACHE_MAX_ENTRIES:
+        listing_cache.pop(next(iter(listing_cache)))
+    listing_cache[key] = (time.monotonic() + cache_ttl, body, etag)
+    return body, etag
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def get_header(event: APIGatewayProxyEventV1, name: str) -> Optional[str]:
+    for header, value in (event.get("headers") or {}).items():
+        if header.lower() == name:
+            return value
+    return None
 
 
 def main(event: APIGatewayProxyEventV1, context: Context):
+    parameters = event.get("queryStringParameters") or {}
+    try:
+        limit = parse_limit(parameters.get("limit"))
+        next_token = parameters.get("next_token") or ""
+        decode_next_token(next_token, SNAPSHOT_CURSOR, ACTIVE_PAGE_CURSOR)
+    except InvalidPageRequest as err:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": str(err)}),
+        }
+
     try:
-        table_name = get_db_table_name()
-        records = scan_table(table_name)
+        cache_ttl = get_cache_ttl()
+        body, etag = get_listing(get_db_table_name(), limit, next_token, cache_ttl)
+    except InvalidPageRequest as err:
         return {
-            "statusCode": 200,
+            "statusCode": 400,
             "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({"message": records}),
+            "body": json.dumps({"message": str(err)}),
         }
     except ClientError as err:
-        logger.error(f"Error: {err}")
+        logger.error("Error: %s", err)
         return {
             "statusCode": 418,
             "headers": {"Content-Type": "application/json"},
             "body": json.dumps({"message": "Whoops! something went wrong"}),
         }
+
+    cache_headers = {"ETag": etag, "Cache-Control": f"max-age={cache_ttl}"}
+    if etag_matches(etag, get_header(event, "if-none-match")):
+        return {"statusCode": 304, "headers": cache_headers, "body": ""}
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json", **cache_headers},
+        "body": body,
+    }
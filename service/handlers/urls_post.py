@@ -1,68 +1,73 @@
 #!/usr/bin/env python
 
+from __future__ import annotations
+
 import json
-import logging
-import uuid
 from datetime import datetime
 from os import environ
+from typing import TYPE_CHECKING, Any, Optional
 
-from aws_lambda_typing.context import Context
-from aws_lambda_typing.events import APIGatewayProxyEventV1
-from boto3 import resource
+from boto3.dynamodb.conditions import Attr
 from botocore.exceptions import ClientError
-from mypy_boto3_dynamodb import DynamoDBServiceResource
-from mypy_boto3_dynamodb.service_resource import Table
-from pydantic import BaseModel, ValidationError
+from pydantic import ValidationError
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+from service.common.clients import get_table
+from service.common.logs import get_logger
+from service.common.models import Endpoint, ProbeSpec, endpoint_item
+from service.common.scheduling import DEFAULT_CHECK_INTERVAL
 
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import APIGatewayProxyEventV1
+    from mypy_boto3_dynamodb.service_resource import Table
 
-class Endpoint(BaseModel):
-    id: str
-    target_url: str
-    is_active: bool
-    created_at: int
+logger = get_logger(__name__)
 
 
 def get_db_table_name() -> str:
     table_name = str(environ.get("TABLE_NAME"))
-    logger.info(f"Loaded dynamodb table: {table_name}")
+    logger.debug("Loaded dynamodb table: %s", table_name)
     return table_name
 
 
-def get_db_resource(table_name: str) -> Table:
-    logger.info(f"Opening connection to dynamodb table: {table_name}")
-    dynamodb: DynamoDBServiceResource = resource("dynamodb")
-    return dynamodb.Table(table_name)
+def get_unix_time() -> int:
+    timestamp = int(datetime.utcnow().timestamp())
+    logger.debug("New timestamp generated: %s", timestamp)
+    return timestamp
 
 
-def get_uuid() -> str:
-    identifier = str(uuid.uuid4())
-    logger.info(f"New identifier generated: {identifier}")
-    return identifier
+class DuplicateEndpoint(Exception):
+    pass
 
 
-def get_unix_time() -> int:
-    timestamp = int(datetime.utcnow().timestamp())
-    logger.info(f"New timestamp generated: {timestamp}")
-    return timestamp
+def validation_message(err: ValidationError) -> str:
+    return "; ".join(detail["msg"] for detail in err.errors())
 
 
-def add_item(table_name: str, target_url: str) -> bool:
+def add_item(
+    table_name: str,
+    target_url: str,
+    check_interval: int,
+    probe: Optional[dict[str, Any]] = None,
+) -> bool:
+    # Raises ValidationError for the caller to report, before anything is written
+    entry = Endpoint(
+        target_url=target_url,
+        check_interval=check_interval,
+        probe=ProbeSpec.model_validate(probe or {}),
+        is_active=True,
+        created_at=get_unix_time(),
+    )
     try:
-        entry = Endpoint(
-            target_url=target_url,
-            id=get_uuid(),
-            is_active=True,
-            created_at=get_unix_time(),
-        )
-        table: Table = get_db_resource(table_name)
-        logger.info(f"Add item to dynamodb table with id: {entry.id}")
-        table.put_item(Item=entry.model_dump())
+        table: Table = get_table(table_name)
+        logger.info("Add item to dynamodb table with id: %s", entry.id)
+        # The id is derived from the canonical url, so an existing id means a duplicate
+        table.put_item(Item=endpoint_item(entry), ConditionExpression=Attr("id").not_exists())
         return True
-    except (ClientError, ValidationError) as err:
-        logger.error(f"Error: {err}")
+    except ClientError as err:
+        if err.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            raise DuplicateEndpoint(entry.target_url) from err
+        logger.error("Error: %s", err)
         return False
 
 
@@ -77,7 +82,23 @@ def main(event: APIGatewayProxyEventV1, context: Context):
     data = json.loads(event["body"])
     table_name = get_db_table_name()
 
-    if add_item(table_name, data["target_url"]):
+    try:
+        check_interval = data.get("check_interval", DEFAULT_CHECK_INTERVAL)
+        added = add_item(table_name, data["target_url"], check_interval, data.get("probe"))
+    except DuplicateEndpoint as err:
+        return {
+            "statusCode": 409,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": f"Endpoint '{err}' is already registered"}),
+        }
+    except ValidationError as err:
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": validation_message(err)}),
+        }
+
+    if added:
         return {
             "statusCode": 200,
             "headers": {"Content-Type": "application/json"},
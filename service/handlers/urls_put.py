@@ -1,46 +1,75 @@
 #!/usr/bin/env python
 
+from __future__ import annotations
+
 import json
-import logging
+import time
 from os import environ
+from typing import TYPE_CHECKING
 
-from aws_lambda_typing.context import Context
-from aws_lambda_typing.events import APIGatewayProxyEventV1
-from boto3 import resource
 from botocore.exceptions import ClientError
-from mypy_boto3_dynamodb import DynamoDBServiceResource
-from mypy_boto3_dynamodb.service_resource import Table
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+from service.common.clients import get_table
+from service.common.dynamodb import ACTIVE_INDEX_KEY, DUE_INDEX_KEY, active_shard
+from service.common.logs import get_logger
+
+if TYPE_CHECKING:
+    from aws_lambda_typing.context import Context
+    from aws_lambda_typing.events import APIGatewayProxyEventV1
+    from mypy_boto3_dynamodb.service_resource import Table
+
+logger = get_logger(__name__)
 
 
 def get_db_table_name() -> str:
     table_name = str(environ.get("TABLE_NAME"))
-    logger.info(f"Loaded dynamodb table: {table_name}")
+    logger.debug("Loaded dynamodb table: %s", table_name)
     return table_name
 
 
-def get_db_resource(table_name: str) -> Table:
-    logger.info(f"Opening connection to dynamodb table: {table_name}")
-    dynamodb: DynamoDBServiceResource = resource("dynamodb")
-    return dynamodb.Table(table_name)
-
-
-def update_item(table_name: str, id: str, is_active: bool) -> bool:
+def update_item(table_name: str, id: str, is_active: bool) -> str:
+    # Returns "updated", "missing" when no endpoint has the id or "failed". An update never
+    # creates an item, one without a target_url would sit in the due index and break the checker
     try:
-        table: Table = get_db_resource(table_name)
-        logger.info(f"Update item in dynamodb table with id: {id}")
-        table.update_item(
-            Key={"id": id},
-            UpdateExpression="""SET
-                is_active = :is_active""",
-            ExpressionAttributeValues={":is_active": is_active},
-        )
-        return True
+        table: Table = get_table(table_name)
+        logger.info("Update item in dynamodb table with id: %s", id)
+        # Only active endpoints carry the sparse index key, a reactivated endpoint is due at once
+        if is_active:
+            table.update_item(
+                Key={"id": id},
+                ConditionExpression="attribute_exists(id)",
+                UpdateExpression="""SET
+                    is_active = :is_active,
+                    #active_shard = :active_shard,
+                    #next_check_at = :next_check_at""",
+                ExpressionAttributeNames={
+                    "#active_shard": ACTIVE_INDEX_KEY,
+                    "#next_check_at": DUE_INDEX_KEY,
+                },
+                ExpressionAttributeValues={
+                    ":is_active": is_active,
+                    ":active_shard": active_shard(id),
+                    ":next_check_at": int(time.time()),
+                },
+            )
+        else:
+            table.update_item(
+                Key={"id": id},
+                ConditionExpression="attribute_exists(id)",
+                UpdateExpression="""SET
+                    is_active = :is_active
+                REMOVE
+                    #active_shard""",
+                ExpressionAttributeNames={"#active_shard": ACTIVE_INDEX_KEY},
+                ExpressionAttributeValues={":is_active": is_active},
+            )
+        return "updated"
     except ClientError as err:
-        logger.error(f"Error: {err}")
-        return False
+        if err.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            logger.info("No endpoint with id: %s", id)
+            return "missing"
+        logger.error("Error: %s", err)
+        return "failed"
 
 
 def main(event: APIGatewayProxyEventV1, context: Context):
@@ -62,13 +91,19 @@ def main(event: APIGatewayProxyEventV1, context: Context):
     data = json.loads(event["body"])
     table_name = get_db_table_name()
 
-    if update_item(table_name, id, data["is_active"]):
+    outcome = update_item(table_name, id, data["is_active"])
+    if outcome == "updated":
         return {
             "statusCode": 200,
             "headers": {"Content-Type": "application/json"},
             "body": json.dumps({"message": "Successful"}),
         }
-
+    elif outcome == "missing":
+        return {
+            "statusCode": 404,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"message": f"No endpoint with id {id}"}),
+        }
     else:
         return {
             "statusCode": 418,
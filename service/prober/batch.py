@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Iterator, NamedTuple, Optional
+
+from service.common.scheduling import DEFAULT_CHECK_INTERVAL
+from service.prober.connections import ParsedUrl, Target, parse_targets
+from service.prober.probes import DEFAULT_PROBE, Probe, url_path
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+# Scheme codes stored per endpoint. A url without a scheme is tried on http and https and stores
+# no port, a url that does not parse is probed from its raw text to report the error.
+SCHEMES = ("", "http", "https")
+UNPARSED = 255
+
+
+class CheckTarget(NamedTuple):
+    id: str
+    url: str
+    check_interval: int = DEFAULT_CHECK_INTERVAL
+    current_interval: int = DEFAULT_CHECK_INTERVAL
+    probe: Probe = DEFAULT_PROBE
+
+
+class EndpointBatch(Mapping[str, CheckTarget]):
+    # The endpoints of one checker run, held column by column so a large scan costs a few bytes
+    # per endpoint on top of its id and url. Urls are parsed once when they are added, hosts,
+    # paths and probes are shared between the endpoints using them. Looked up by id it returns
+    # a CheckTarget built on demand.
+    __slots__ = (
+        "ids",
+        "urls",
+        "hosts",
+        "paths",
+        "ports",
+        "schemes",
+        "check_intervals",
+        "current_intervals",
+        "probes",
+        "_rows",
+        "_shared_probes",
+    )
+
+    def __init__(self: Self) -> None:
+        self.ids: list[str] = []
+        self.urls: list[str] = []
+        self.hosts: list[str] = []
+        self.paths: list[str] = []
+        self.ports = array("H")
+        self.schemes = array("B")
+        self.check_intervals = array("I")
+        self.current_intervals = array("I")
+        self.probes: list[Probe] = []
+        self._rows: dict[str, int] = {}
+        self._shared_probes: dict[Probe, Probe] = {DEFAULT_PROBE: DEFAULT_PROBE}
+
+    def add(self: Self, target: CheckTarget) -> int:
+        # Returns the row of the endpoint, an id added before keeps its first row
+        row = self._rows.get(target.id)
+        if row is not None:
+            return row
+        scheme, host, port, path = UNPARSED, "", 0, ""
+        try:
+            targets, path = parse_targets(target.url), url_path(target.url)
+            host = targets[0].host
+            if len(targets) == 1:
+                scheme, port = SCHEMES.index(targets[0].scheme), targets[0].port
+            else:
+                scheme = 0
+        except ValueError:
+            pass
+
+        row = self._rows[target.id] = len(self.ids)
+        self.ids.append(target.id)
+        self.urls.append(target.url)
+        self.hosts.append(sys.intern(host))
+        self.paths.append(sys.intern(path))
+        self.ports.append(port)
+        self.schemes.append(scheme)
+        self.check_intervals.append(target.check_interval)
+        self.current_intervals.append(target.current_interval)
+        self.probes.append(self._shared_probes.setdefault(target.probe, target.probe))
+        return row
+
+    def target(self: Self, row: int) -> CheckTarget:
+        return CheckTarget(
+            self.ids[row],
+            self.urls[row],
+            self.check_intervals[row],
+            self.current_intervals[row],
+            self.probes[row],
+        )
+
+    def parsed(self: Self, row: int) -> Optional[ParsedUrl]:
+        scheme, host = self.schemes[row], self.hosts[row]
+        if scheme == UNPARSED:
+            return None
+        if scheme == 0:
+            return ParsedUrl(
+                [Target("http", host, 80), Target("https", host, 443)], self.paths[row]
+            )
+        return ParsedUrl([Target(SCHEMES[scheme], host, self.ports[row])], self.paths[row])
+
+    def probe_key(self: Self, row: int) -> tuple[object, ...]:
+        # Rows registered before urls were canonicalised can still point at the same endpoint,
+        # equal keys are probed the same way. Trailing slashes do not tell endpoints apart.
+        if self.schemes[row] == UNPARSED:
+            return (UNPARSED, self.urls[row], self.probes[row])
+        path = self.paths[row].rstrip("/") or "/"
+        return (self.schemes[row], self.hosts[row], self.ports[row], path, self.probes[row])
+
+    def __getitem__(self: Self, id: str) -> CheckTarget:
+        return self.target(self._rows[id])
+
+    def __contains__(self: Self, id: object) -> bool:
+        return id in self._rows
+
+    def __iter__(self: Self) -> Iterator[str]:
+        return iter(self.ids)
+
+    def __len__(self: Self) -> int:
+        return len(self.ids)
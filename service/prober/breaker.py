@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+from threading import Lock
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+
+class HostSuppressed(Exception):
+    pass
+
+
+class HostState:
+    __slots__ = ("failures", "open_until", "probing")
+
+    def __init__(self: Self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+
+class CircuitBreaker:
+    # Per host failure memory, kept in memory across warm invocations. After `failure_threshold`
+    # consecutive failures the breaker opens and checks of the host are suppressed. Once the
+    # cooldown passes a single trial probe is let through, another failure doubles the cooldown
+    # up to `max_cooldown` and a success closes the breaker.
+    def __init__(
+        self: Self,
+        failure_threshold: int = 3,
+        base_cooldown: float = 60,
+        max_cooldown: float = 3600,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self._hosts: dict[str, HostState] = {}
+        self._lock = Lock()
+
+    def acquire(self: Self, host: str) -> bool:
+        # Returns True for a trial probe, raises HostSuppressed while the breaker is open
+        with self._lock:
+            state = self._hosts.get(host)
+            if not state or state.failures < self.failure_threshold:
+                return False
+            if state.probing or self.clock() < state.open_until:
+                raise HostSuppressed(
+                    f"suppressed after {state.failures} consecutive failures of '{host}'"
+                )
+            state.probing = True
+            return True
+
+    def release(self: Self, host: str) -> None:
+        # Ends a trial probe that recorded neither a success nor a failure, e.g. one cut short by
+        # the deadline, so the next check after the cooldown gets a trial again
+        with self._lock:
+            state = self._hosts.get(host)
+            if state:
+                state.probing = False
+
+    def record_success(self: Self, host: str) -> None:
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self: Self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.setdefault(host, HostState())
+            state.failures += 1
+            state.probing = False
+            if state.failures >= self.failure_threshold:
+                backoff = 2 ** min(state.failures - self.failure_threshold, 32)
+                cooldown = min(self.base_cooldown * backoff, self.max_cooldown)
+                state.open_until = self.clock() + cooldown
+
+    def is_open(self: Self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            return bool(state and state.failures >= self.failure_threshold)
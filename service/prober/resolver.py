@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import socket
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+# getaddrinfo does not expose record TTLs, so answers are kept for a fixed time that is short
+# enough to follow DNS changes between runs. Failed lookups are kept for less.
+DNS_CACHE_TTL = 300
+DNS_NEGATIVE_TTL = 60
+
+
+class DNSFailure(Exception):
+    pass
+
+
+# The lookup was still queued behind other hosts' lookups, the host itself was never asked
+class ResolverBusy(Exception):
+    pass
+
+
+class CachedAnswer(NamedTuple):
+    # Every address the host resolved to in getaddrinfo's order, none for a failed lookup
+    expires_at: float
+    addresses: tuple[str, ...]
+    error: str
+
+
+def elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+class Resolver:
+    # Caches host lookups for all probes of an execution environment. Concurrent lookups of the
+    # same host share one getaddrinfo call running on the resolver's own threads, so a probe
+    # stops waiting at its timeout and hosts can be resolved ahead of their probes.
+    def __init__(
+        self: Self,
+        ttl: float = DNS_CACHE_TTL,
+        negative_ttl: float = DNS_NEGATIVE_TTL,
+        max_workers: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._cache: dict[str, CachedAnswer] = {}
+        self._pending: dict[str, Future[CachedAnswer]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dns")
+        self._lock = Lock()
+
+    def cached(self: Self, host: str) -> Optional[CachedAnswer]:
+        with self._lock:
+            cached = self._cache.get(host)
+        if cached is None or cached.expires_at <= self.clock():
+            return None
+        return cached
+
+    def prefetch(self: Self, host: str) -> None:
+        if self.cached(host) is None:
+            self._submit(host)
+
+    def resolve(
+        self: Self, host: str, port: int, timeout: float
+    ) -> tuple[list[tuple[str, int]], Optional[float]]:
+        # Returns the addresses and the milliseconds spent waiting for them, None when cached
+        cached = self.cached(host)
+        dns_ms: Optional[float] = None
+        if cached is None:
+            start = time.perf_counter()
+            future = self._submit(host)
+            try:
+                cached = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                if not future.running() and not future.done():
+                    raise ResolverBusy(f"dns lookup of {host} waited for a resolver") from None
+                raise DNSFailure(f"dns lookup of {host} timed out") from None
+            dns_ms = elapsed_ms(start)
+        if not cached.addresses:
+            raise DNSFailure(cached.error)
+        return [(address, port) for address in cached.addresses], dns_ms
+
+    def _submit(self: Self, host: str) -> Future[CachedAnswer]:
+        with self._lock:
+            future = self._pending.get(host)
+            if future is None:
+                future = self._pending[host] = self._executor.submit(self._lookup, host)
+        return future
+
+    def _lookup(self: Self, host: str) -> CachedAnswer:
+        error = f"dns lookup of {host} failed"
+        answer = CachedAnswer(self.clock() + self.negative_ttl, (), error)
+        try:
+            infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            addresses = tuple(dict.fromkeys(str(info[4][0]) for info in infos))
+            answer = CachedAnswer(self.clock() + self.ttl, addresses, "")
+        except (OSError, UnicodeError) as err:
+            answer = answer._replace(error=f"{error}: {err}")
+        finally:
+            # Cached and no longer pending in one step, so no caller starts a second lookup
+            with self._lock:
+                self._cache[host] = answer
+                self._pending.pop(host, None)
+        return answer
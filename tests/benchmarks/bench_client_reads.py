@@ -0,0 +1,106 @@
+# tests/benchmarks/bench_client_reads.py
+#
+# Run with: python -m tests.benchmarks.bench_client_reads [page_items] [pages]
+
+import json
+import sys
+import time
+from typing import Callable, Iterator
+
+import boto3
+from botocore.awsrequest import AWSPreparedRequest, AWSResponse
+from botocore.compat import HTTPHeaders
+from botocore.hooks import BaseEventHooks
+from typing_extensions import Self
+
+from service.handlers import urls_get
+
+
+class RawBody:
+    def __init__(self: Self, body: bytes) -> None:
+        self.body = body
+
+    def stream(self: Self, **kwargs: object) -> Iterator[bytes]:
+        yield self.body
+
+
+def query_page(items: int) -> bytes:
+    # One Query response in DynamoDB's wire format, as the urls_get projection returns it
+    return json.dumps(
+        {
+            "Count": items,
+            "ScannedCount": items,
+            "Items": [
+                {
+                    "id": {"S": f"{index:08d}-0000-5000-8000-000000000000"},
+                    "target_url": {"S": f"https://host-{index % 97}.example.com/health"},
+                    "is_active": {"BOOL": True},
+                    "created_at": {"N": str(1700000000 + index)},
+                }
+                for index in range(items)
+            ],
+        }
+    ).encode()
+
+
+def serve(events: BaseEventHooks, body: bytes) -> None:
+    # Answer every request locally, botocore still parses the body and the resource layer still
+    # deserialises it
+    def send(request: AWSPreparedRequest, **kwargs: object) -> AWSResponse:
+        headers = HTTPHeaders.from_dict(
+            {"Content-Type": "application/x-amz-json-1.0", "x-amzn-RequestId": "local"}
+        )
+        return AWSResponse(request.url, 200, headers, RawBody(body))
+
+    # The stubs type handlers as returning None, botocore sends whatever before-send returns
+    events.register("before-send.dynamodb", send)  # type: ignore
+
+
+def measure(read: Callable[[], int], pages: int) -> float:
+    read()
+    start = time.perf_counter()
+    items = sum(read() for _ in range(pages))
+    return items / (time.perf_counter() - start)
+
+
+def run(page_items: int, pages: int) -> None:
+    session = boto3.Session(
+        aws_access_key_id="local", aws_secret_access_key="local", region_name="eu-west-1"
+    )
+    body = query_page(page_items)
+    resource = session.resource("dynamodb")
+    serve(resource.meta.client.meta.events, body)
+    client = session.client("dynamodb")
+    serve(client.meta.events, body)
+    urls_get.get_table = lambda table_name: resource.Table(table_name)  # type: ignore
+    urls_get.get_dynamodb_client = lambda: client  # type: ignore
+
+    def read_with(client_reads: bool) -> Callable[[], int]:
+        def read() -> int:
+            urls_get.get_client_reads = lambda: client_reads  # type: ignore
+            records, _ = urls_get.query_table("endpoints", page_items, None)
+            return len(records)
+
+        return read
+
+    def parse_only() -> int:
+        return len(client.query(TableName="endpoints")["Items"])
+
+    print(f"{pages} pages of {page_items} items through urls_get.query_table")
+    print(f"{'path':>28} {'items/s':>10} {'speedup':>8}")
+    baseline = 0.0
+    for name, read in (
+        ("resource layer", read_with(False)),
+        ("client, plain values", read_with(True)),
+        ("client parse only (floor)", parse_only),
+    ):
+        rate = measure(read, pages)
+        baseline = baseline or rate
+        print(f"{name:>28} {rate:>10.0f} {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    defaults = [10_000, 10]
+    page_items, pages = arguments + defaults[len(arguments) :]
+    run(page_items, pages)
@@ -0,0 +1,215 @@
+# tests/benchmarks/bench_handlers.py
+#
+# Run with: python -m tests.benchmarks.bench_handlers [endpoints] [servers] [latency_ms]
+#           [failure_rate] [invocations] [db_latency_ms]
+#
+# Invokes the handlers against an in-memory DynamoDB and a local fleet of HTTP servers. Every
+# handler runs in its own process so the peak RSS is its own. LOG_LEVEL, LOG_SAMPLE_RATE and
+# LOG_SAMPLE_RATES are passed through to the handlers.
+
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+from typing_extensions import Self
+
+from service.common import clients
+from service.common.models import Endpoint, endpoint_item
+from tests.benchmarks.fakes import (
+    ENDPOINT_INDEXES,
+    FakeDynamoDB,
+    FakeFleet,
+    FakeSNS,
+    FakeTable,
+    response_body,
+)
+
+SCENARIOS = ("checker", "urls_get", "urls_post", "urls_put")
+
+
+class LogSink:
+    # Stands in for the log stream and counts what a handler would ship to CloudWatch
+    def __init__(self: Self) -> None:
+        self.lines = 0
+        self.bytes = 0
+
+    def write(self: Self, text: str) -> int:
+        self.lines += text.count("\n")
+        self.bytes += len(text.encode())
+        return len(text)
+
+    def flush(self: Self) -> None:
+        pass
+
+
+class FakeContext:
+    def __init__(self: Self, timeout_ms: int = 10_000) -> None:
+        self.deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self: Self) -> int:
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+def setup(fleet: FakeFleet, endpoints: int, db_latency: float) -> FakeTable:
+    table = FakeTable(indexes=ENDPOINT_INDEXES, latency=db_latency)
+    urls = fleet.urls
+    for index in range(endpoints):
+        entry = Endpoint(
+            target_url=f"{urls[index % len(urls)]}health/{index}",
+            is_active=True,
+            created_at=1700000000,
+        )
+        table.items[(entry.id,)] = endpoint_item(entry)
+    results = FakeTable(key=("endpoint_id", "checked_at"), latency=db_latency)
+    # The handlers reach DynamoDB through service.common.clients only
+    clients._dynamodb = FakeDynamoDB({"endpoints": table, "results": results})  # type: ignore
+    clients._tables.clear()  # type: ignore
+    clients._sns = FakeSNS(latency=db_latency)  # type: ignore
+    os.environ.update(TABLE_NAME="endpoints", RESULTS_TABLE_NAME="results", LISTING_CACHE_TTL="0")
+    os.environ.update(ALERT_TOPIC_ARN="arn:aws:sns:eu-west-1:123456789012:alerts")
+    os.environ.pop("CHECK_QUEUE_URL", None)
+    return table
+
+
+def invocations_for(
+    scenario: str, table: FakeTable, fleet: FakeFleet, count: int
+) -> list[Callable[[], Any]]:
+    # The API handlers never look at their context
+    context: Any = None
+    if scenario == "checker":
+        from service.handlers import checker
+
+        def check() -> dict[str, Any]:
+            return checker.main({}, FakeContext())  # type: ignore
+
+        return [check] * count
+
+    if scenario == "urls_get":
+        from service.handlers import urls_get
+
+        state: dict[str, str] = {}
+
+        def list_page() -> dict[str, Any]:
+            parameters = {"limit": "100", **state}
+            response = urls_get.main({"queryStringParameters": parameters}, None)  # type: ignore
+            next_token = response_body(response)["next_token"]
+            state.clear()
+            if next_token:
+                state["next_token"] = next_token
+            return response
+
+        return [list_page] * count
+
+    if scenario == "urls_post":
+        from service.handlers import urls_post
+
+        urls = fleet.urls
+        events: list[Any] = [
+            {"body": json.dumps({"target_url": f"{urls[index % len(urls)]}new/{index}"})}
+            for index in range(count)
+        ]
+        return [lambda event=event: urls_post.main(event, context) for event in events]
+
+    from service.handlers import urls_put
+
+    ids = [key[0] for key in table.items]
+    events: list[Any] = [
+        {
+            "pathParameters": {"id": ids[index % len(ids)]},
+            "body": json.dumps({"is_active": index % 2 == 1}),
+        }
+        for index in range(count)
+    ]
+    return [lambda event=event: urls_put.main(event, context) for event in events]
+
+
+def reset_schedule(table: FakeTable) -> None:
+    # Makes every endpoint due again so each checker invocation probes the whole fleet
+    for item in table.items.values():
+        item["next_check_at"] = 0
+
+
+def run_scenario(scenario: str, arguments: list[float]) -> dict[str, Any]:
+    endpoints, servers, latency_ms, failure_rate, invocations, db_latency_ms = arguments
+    # Handler output is counted and discarded, log records and metric lines alike
+    sink = LogSink()
+    logging.basicConfig(stream=sink, level=logging.INFO, force=True)  # type: ignore
+
+    fleet = FakeFleet(int(servers), latency_ms / 1000, failure_rate)
+    try:
+        table = setup(fleet, int(endpoints), db_latency_ms / 1000)
+        latencies: list[float] = []
+        stdout, sys.stdout = sys.stdout, sink  # type: ignore
+        try:
+            for invoke in invocations_for(scenario, table, fleet, int(invocations)):
+                if scenario == "checker":
+                    reset_schedule(table)
+                start = time.perf_counter()
+                response = invoke()
+                latencies.append(time.perf_counter() - start)
+                assert response["statusCode"] in (200, 304), response
+        finally:
+            sys.stdout = stdout
+    finally:
+        fleet.close()
+
+    return {
+        "scenario": scenario,
+        "invocations": len(latencies),
+        "per_second": len(latencies) / sum(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": quantile(latencies, 0.99) * 1000,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "log_lines": sink.lines / len(latencies),
+        "log_kb": sink.bytes / len(latencies) / 1024,
+    }
+
+
+def quantile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run(arguments: list[float]) -> None:
+    endpoints, servers, latency_ms, failure_rate, _invocations, db_latency_ms = arguments
+    print(
+        f"{int(endpoints)} endpoints on {int(servers)} servers, {latency_ms}ms per probe, "
+        f"{failure_rate:.0%} failing, {db_latency_ms}ms per DynamoDB request"
+    )
+    print(
+        f"{'handler':>10} {'calls':>6} {'calls/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'rss MB':>8} "
+        f"{'lines/call':>10} {'log KB/call':>11}"
+    )
+    for scenario in SCENARIOS:
+        output = subprocess.run(
+            [sys.executable, "-m", "tests.benchmarks.bench_handlers", "--scenario", scenario]
+            + [str(argument) for argument in arguments],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        print(
+            f"{scenario:>10} {result['invocations']:>6} {result['per_second']:>9.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['peak_rss_mb']:>8.1f} "
+            f"{result['log_lines']:>10.1f} {result['log_kb']:>11.2f}"
+        )
+
+
+def parse_arguments(values: list[str]) -> list[float]:
+    arguments = [float(value) for value in values]
+    defaults = [500, 50, 10, 0.02, 20, 2]
+    return arguments + defaults[len(arguments) :]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--scenario"]:
+        print(json.dumps(run_scenario(sys.argv[2], parse_arguments(sys.argv[3:]))))
+    else:
+        run(parse_arguments(sys.argv[1:]))
@@ -0,0 +1,92 @@
+# tests/benchmarks/bench_memory.py
+#
+# Run with: python -m tests.benchmarks.bench_memory [endpoints] [hosts]
+
+import gc
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from typing import Any, Callable, Iterator, Optional
+
+from service.handlers.checker import CheckTarget
+from service.prober.batch import EndpointBatch
+from service.prober.connections import ParsedUrl, parse_url
+from service.prober.probes import probe_from_item
+
+
+# Items as the due index returns them, every endpoint registered with a probe map
+def due_items(count: int, hosts: int) -> Iterator[dict[str, Any]]:
+    for index in range(count):
+        yield {
+            "id": f"{index:08d}-0000-5000-8000-000000000000",
+            "target_url": f"https://host-{index % hosts}.example.com/health",
+            "check_interval": Decimal(300),
+            "current_interval": Decimal(300 if index % 3 else 75),
+            "probe": {"method": "HEAD", "expected_status": [[Decimal(200), Decimal(399)]]},
+        }
+
+
+def targets(count: int, hosts: int) -> Iterator[CheckTarget]:
+    # What scan_table yields, each item is dropped once its target is built
+    for item in due_items(count, hosts):
+        yield CheckTarget(
+            item["id"],
+            item["target_url"],
+            int(item["check_interval"]),
+            int(item["current_interval"]),
+            probe_from_item(item["probe"]),
+        )
+
+
+def target_dict(count: int, hosts: int) -> dict[str, CheckTarget]:
+    # The previous representation: a CheckTarget per endpoint, urls parsed for every probe
+    return {target.id: target for target in targets(count, hosts)}
+
+
+def target_dict_parsed(
+    count: int, hosts: int
+) -> dict[str, tuple[CheckTarget, Optional[ParsedUrl]]]:
+    # A CheckTarget per endpoint with its url parsed once up front
+    return {target.id: (target, parse_url(target.url)) for target in targets(count, hosts)}
+
+
+def endpoint_batch(count: int, hosts: int) -> EndpointBatch:
+    batch = EndpointBatch()
+    for target in targets(count, hosts):
+        batch.add(target)
+    return batch
+
+
+def measure(build: Callable[[int, int], object], count: int, hosts: int) -> tuple[float, float]:
+    # Timed without tracing, tracemalloc slows every allocation down
+    start = time.perf_counter()
+    build(count, hosts)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    built = build(count, hosts)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return retained / count, elapsed
+
+
+def run(count: int, hosts: int) -> None:
+    print(f"{count} endpoints on {hosts} hosts, ids and urls included")
+    print(f"{'representation':>22} {'bytes/endpoint':>15} {'seconds':>8}")
+    for name, build in (
+        ("dict of CheckTarget", target_dict),
+        ("dict, urls pre-parsed", target_dict_parsed),
+        ("EndpointBatch", endpoint_batch),
+    ):
+        per_endpoint, elapsed = measure(build, count, hosts)
+        print(f"{name:>22} {per_endpoint:>15.0f} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    defaults = [100_000, 1_000]
+    count, hosts = arguments + defaults[len(arguments) :]
+    run(count, hosts)
@@ -0,0 +1,36 @@
+# tests/benchmarks/bench_scan.py
+#
+# Run with: python -m tests.benchmarks.bench_scan [items] [page_size] [latency_ms]
+
+import sys
+import time
+
+from service.common.dynamodb import parallel_scan_pages
+from tests.benchmarks.stubs import StubTable, make_endpoint_items
+
+
+def run(items: int, page_size: int, latency_ms: float) -> None:
+    endpoints = make_endpoint_items(items)
+    print(f"{items} items, {page_size} items per page, {latency_ms}ms per request")
+    print(f"{'segments':>8} {'requests':>8} {'seconds':>8} {'items/s':>10} {'speedup':>8}")
+
+    baseline = 0.0
+    for segments in (1, 2, 4, 8, 16, 32):
+        table = StubTable(endpoints, page_size, latency_ms / 1000)
+        start = time.perf_counter()
+        scanned = sum(len(page) for page in parallel_scan_pages(table, segments))  # type: ignore
+        elapsed = time.perf_counter() - start
+        assert scanned == items
+
+        baseline = baseline or elapsed
+        print(
+            f"{segments:>8} {table.requests:>8} {elapsed:>8.3f} "
+            f"{scanned / elapsed:>10.0f} {baseline / elapsed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    arguments = [float(argument) for argument in sys.argv[1:]]
+    defaults = [100_000, 1_000, 20]
+    items, page_size, latency_ms = arguments + defaults[len(arguments) :]
+    run(int(items), int(page_size), latency_ms)
@@ -0,0 +1,63 @@
+# tests/benchmarks/bench_startup.py
+#
+# Run with: python -m tests.benchmarks.bench_startup [runs]
+#
+# Every import runs in a fresh interpreter, like a lambda cold start, and is measured with
+# -X importtime. Reported times are the median over all runs.
+
+import statistics
+import subprocess
+import sys
+
+HANDLERS = [
+    "checker",
+    "urls_get",
+    "urls_post",
+    "urls_put",
+    "urls_batch_post",
+    "results_get",
+    "snapshot",
+]
+
+
+def import_times(module: str) -> tuple[int, dict[str, int]]:
+    # Total import time of `module` and the cumulative time of every package it pulled in,
+    # both in microseconds. The outermost import of a package carries its largest cumulative.
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    total = 0
+    packages: dict[str, int] = {}
+    for line in output.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        cumulative, name = int(fields[1]), fields[2].strip()
+        if name == module:
+            total = cumulative
+        package = name.split(".")[0]
+        packages[package] = max(packages.get(package, 0), cumulative)
+    return total, packages
+
+
+def run(runs: int) -> None:
+    print(f"median import time over {runs} cold imports, top packages by cumulative time")
+    for handler in HANDLERS:
+        samples = [import_times(f"service.handlers.{handler}") for _ in range(runs)]
+        total = statistics.median(total for total, _ in samples) / 1000
+        packages = {name for _, sample in samples for name in sample} - {"service"}
+        medians = {
+            name: statistics.median(sample.get(name, 0) for _, sample in samples) / 1000
+            for name in packages
+        }
+        top = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:4]
+        details = ", ".join(f"{name} {ms:.1f}ms" for name, ms in top)
+        print(f"{handler:>15} {total:>7.1f}ms  ({details})")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,367 @@
+# tests/benchmarks/fakes.py
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from typing import Any, Callable, Optional, TypeVar, Union, cast
+
+from boto3.dynamodb.conditions import ConditionBase
+from botocore.exceptions import ClientError
+from typing_extensions import Self, Unpack
+
+from service.common.dynamodb import (
+    ACTIVE_INDEX_KEY,
+    ACTIVE_INDEX_NAME,
+    DUE_INDEX_KEY,
+    DUE_INDEX_NAME,
+    QueryKwargs,
+    ScanKwargs,
+)
+
+# Partition and sort key of every index the service queries
+ENDPOINT_INDEXES: dict[str, tuple[str, Optional[str]]] = {
+    ACTIVE_INDEX_NAME: (ACTIVE_INDEX_KEY, None),
+    DUE_INDEX_NAME: (ACTIVE_INDEX_KEY, DUE_INDEX_KEY),
+}
+
+T = TypeVar("T")
+
+COMPARISONS: dict[str, Callable[[Any, Any], bool]] = {
+    "=": lambda left, right: left == right,
+    "<>": lambda left, right: left != right,
+    "<": lambda left, right: left < right,
+    "<=": lambda left, right: left <= right,
+    ">": lambda left, right: left > right,
+    ">=": lambda left, right: left >= right,
+}
+
+
+def returning(value: T) -> Callable[..., T]:
+    # Stand-in for a client or table getter, whatever it is asked for it hands out `value`
+    def getter(*args: object, **kwargs: object) -> T:
+        return value
+
+    return getter
+
+
+def response_body(response: dict[str, Any]) -> Any:
+    # Decoded JSON body of a handler response
+    return json.loads(response["body"])
+
+
+def conditional_check_failed(operation: str) -> ClientError:
+    error = {"Code": "ConditionalCheckFailedException", "Message": "The conditional request failed"}
+    return ClientError({"Error": error}, operation)  # type: ignore
+
+
+def evaluate(
+    condition: Union[ConditionBase, str], item: dict[str, Any], names: dict[str, str]
+) -> bool:
+    # Understands the boto3 condition builders and the plain attribute_(not_)exists strings the
+    # service uses, which is all this fake needs
+    if isinstance(condition, str):
+        match = re.fullmatch(r"\s*(attribute_exists|attribute_not_exists)\((#?\w+)\)\s*", condition)
+        if not match:
+            raise NotImplementedError(condition)
+        exists = names.get(match[2], match[2]) in item
+        return exists if match[1] == "attribute_exists" else not exists
+
+    expression = condition.get_expression()
+    operator, values = expression["operator"], expression["values"]
+    if operator == "AND":
+        return all(evaluate(value, item, names) for value in values)
+    if operator == "OR":
+        return any(evaluate(value, item, names) for value in values)
+    if operator == "attribute_exists":
+        return values[0].name in item
+    if operator == "attribute_not_exists":
+        return values[0].name not in item
+    if operator in COMPARISONS:
+        name = values[0].name
+        return name in item and COMPARISONS[operator](item[name], values[1])
+    raise NotImplementedError(operator)
+
+
+def apply_update(
+    item: dict[str, Any], expression: str, names: dict[str, str], values: dict[str, Any]
+) -> list[str]:
+    # Returns the attributes the expression touched
+    updated: list[str] = []
+    expression = " ".join(expression.split())
+    for action, body in re.findall(r"(SET|REMOVE) (.*?)(?= SET | REMOVE |$)", expression):
+        if action == "REMOVE":
+            removed: list[str] = re.findall(r"#?\w+", body)
+            for name in removed:
+                updated.append(names.get(name, name))
+                item.pop(updated[-1], None)
+            continue
+        assignments: list[tuple[str, str, str, str]] = re.findall(
+            r"(#?\w+) = (if_not_exists\((#?\w+), (:\w+)\)|:\w+)", body
+        )
+        for name, value, default_name, default in assignments:
+            name = names.get(name, name)
+            updated.append(name)
+            if default:
+                existing = names.get(default_name, default_name)
+                item[name] = item[existing] if existing in item else values[default]
+            else:
+                item[name] = values[value]
+    return updated
+
+
+# Buffers puts into one request per 25 items like the boto3 batch_writer
+class FakeBatchWriter:
+    def __init__(self: Self, table: "FakeTable") -> None:
+        self.table = table
+        self.buffer: list[dict[str, Any]] = []
+
+    def __enter__(self: Self) -> "FakeBatchWriter":
+        return self
+
+    def __exit__(self: Self, *args: object) -> None:
+        self.flush()
+
+    def put_item(self: Self, Item: dict[str, Any]) -> None:
+        self.buffer.append(Item)
+        if len(self.buffer) == 25:
+            self.flush()
+
+    def flush(self: Self) -> None:
+        if self.buffer:
+            self.table.write_batch(self.buffer)
+            self.buffer = []
+
+
+# In-memory stand-in for a DynamoDB table with the request semantics the handlers rely on:
+# conditional writes, SET/REMOVE updates, sparse indexes and paginated queries. Every request
+# costs a fixed round-trip latency.
+class FakeTable:
+    def __init__(
+        self: Self,
+        key: tuple[str, ...] = ("id",),
+        indexes: Optional[dict[str, tuple[str, Optional[str]]]] = None,
+        page_size: int = 1000,
+        latency: float = 0,
+    ) -> None:
+        self.key = key
+        self.indexes = indexes or {}
+        self.page_size = page_size
+        self.latency = latency
+        self.items: dict[tuple[Any, ...], dict[str, Any]] = {}
+        self.requests = 0
+        self._lock = Lock()
+
+    def _request(self: Self) -> None:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _key(self: Self, item: dict[str, Any]) -> tuple[Any, ...]:
+        return tuple(item[name] for name in self.key)
+
+    def put_item(
+        self: Self,
+        Item: dict[str, Any],
+        ConditionExpression: Optional[Union[ConditionBase, str]] = None,
+        ExpressionAttributeNames: Optional[dict[str, str]] = None,
+    ) -> dict[str, Any]:
+        self._request()
+        with self._lock:
+            existing = self.items.get(self._key(Item), {})
+            names = ExpressionAttributeNames or {}
+            if ConditionExpression is not None and not evaluate(
+                ConditionExpression, existing, names
+            ):
+                raise conditional_check_failed("PutItem")
+            self.items[self._key(Item)] = dict(Item)
+        return {}
+
+    def write_batch(self: Self, items: list[dict[str, Any]]) -> None:
+        self._request()
+        with self._lock:
+            for item in items:
+                self.items[self._key(item)] = dict(item)
+
+    def get_items(self: Self, keys: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        # The items of one BatchGetItem request, keys without an item are left out
+        self._request()
+        with self._lock:
+            found = [self.items.get(self._key(key)) for key in keys]
+        return [dict(item) for item in found if item]
+
+    def get_item(self: Self, Key: dict[str, Any], **kwargs: object) -> dict[str, Any]:
+        self._request()
+        with self._lock:
+            item = self.items.get(self._key(Key))
+        return {"Item": dict(item)} if item else {}
+
+    def update_item(
+        self: Self,
+        Key: dict[str, Any],
+        UpdateExpression: str,
+        ConditionExpression: Optional[Union[ConditionBase, str]] = None,
+        ExpressionAttributeNames: Optional[dict[str, str]] = None,
+        ExpressionAttributeValues: Optional[dict[str, Any]] = None,
+        ReturnValues: str = "NONE",
+    ) -> dict[str, Any]:
+        self._request()
+        names = ExpressionAttributeNames or {}
+        with self._lock:
+            old = self.items.get(self._key(Key), {})
+            item = dict(old or Key)
+            if ConditionExpression is not None and not evaluate(ConditionExpression, old, names):
+                raise conditional_check_failed("UpdateItem")
+            updated = apply_update(item, UpdateExpression, names, ExpressionAttributeValues or {})
+            self.items[self._key(Key)] = item
+        if ReturnValues == "ALL_NEW":
+            return {"Attributes": dict(item)}
+        if ReturnValues == "UPDATED_OLD":
+            attributes = {name: old[name] for name in updated if name in old}
+            return {"Attributes": attributes} if attributes else {}
+        return {}
+
+    def query(
+        self: Self, KeyConditionExpression: ConditionBase, **kwargs: Unpack[QueryKwargs]
+    ) -> dict[str, Any]:
+        self._request()
+        index = kwargs.get("IndexName")
+        partition_key, sort_key = self.indexes[index] if index else (self.key + (None,))[:2]
+        with self._lock:
+            # Sparse indexes only hold items carrying every key attribute
+            items = [
+                item
+                for item in self.items.values()
+                if partition_key in item
+                and (sort_key is None or sort_key in item)
+                and evaluate(KeyConditionExpression, item, {})
+            ]
+        if sort_key:
+            items.sort(
+                key=lambda item: item[sort_key], reverse=not kwargs.get("ScanIndexForward", True)
+            )
+        return self._page(items, kwargs)
+
+    def scan(self: Self, **kwargs: Unpack[ScanKwargs]) -> dict[str, Any]:
+        self._request()
+        segment = int(kwargs.get("Segment", 0))
+        total_segments = int(kwargs.get("TotalSegments", 1))
+        with self._lock:
+            items = list(self.items.values())[segment::total_segments]
+        return self._page(items, kwargs)
+
+    def _page(
+        self: Self, items: list[dict[str, Any]], kwargs: Union[ScanKwargs, QueryKwargs]
+    ) -> dict[str, Any]:
+        start = int(kwargs.get("ExclusiveStartKey", {}).get("offset", 0))
+        end = start + min(self.page_size, int(kwargs.get("Limit", self.page_size)))
+        response: dict[str, Any] = {"Items": items[start:end], "Count": len(items[start:end])}
+        if end < len(items):
+            response["LastEvaluatedKey"] = {"offset": end}
+        return response
+
+    def batch_writer(self: Self) -> FakeBatchWriter:
+        return FakeBatchWriter(self)
+
+
+# Stand-in for the boto3 DynamoDB service resource, `tables` are looked up by name
+class FakeDynamoDB:
+    def __init__(self: Self, tables: dict[str, FakeTable]) -> None:
+        self.tables = tables
+
+    def Table(self: Self, name: str) -> FakeTable:
+        return self.tables[name]
+
+    def batch_write_item(self: Self, RequestItems: dict[str, list[Any]]) -> dict[str, Any]:
+        for name, requests in RequestItems.items():
+            self.tables[name].write_batch([request["PutRequest"]["Item"] for request in requests])
+        return {"UnprocessedItems": {}}
+
+    def batch_get_item(self: Self, RequestItems: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        responses: dict[str, list[dict[str, Any]]] = {}
+        for name, request in RequestItems.items():
+            responses[name] = self.tables[name].get_items(request["Keys"])
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+
+# Stand-in for the boto3 SQS client of one region, keeps every message body per queue
+class FakeSQS:
+    def __init__(self: Self) -> None:
+        self.messages: dict[str, list[str]] = {}
+
+    def send_message_batch(
+        self: Self, QueueUrl: str, Entries: list[dict[str, str]]
+    ) -> dict[str, Any]:
+        self.messages.setdefault(QueueUrl, []).extend(entry["MessageBody"] for entry in Entries)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+
+# Stand-in for the boto3 SNS client, keeps every published message
+class FakeSNS:
+    def __init__(self: Self, latency: float = 0) -> None:
+        self.latency = latency
+        self.messages: list[dict[str, Any]] = []
+
+    def publish(self: Self, **kwargs: object) -> dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        self.messages.append(kwargs)
+        return {"MessageId": str(len(self.messages))}
+
+
+class FakeEndpointHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self: Self) -> None:
+        server = cast("FakeEndpointServer", self.server)
+        time.sleep(server.latency)
+        if server.random.random() < server.failure_rate:
+            # Hanging up without a response makes the probe fail with RemoteDisconnected
+            self.close_connection = True
+            return
+        self.send_response(204)
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self: Self, format: str, *args: object) -> None:
+        pass
+
+
+class FakeEndpointServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self: Self, address: tuple[str, int], latency: float, failure_rate: float) -> None:
+        super().__init__(address, FakeEndpointHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(address[0])
+
+
+# Local fleet of keep-alive HTTP servers with a fixed response latency and a random failure rate.
+# Every server listens on its own loopback address so each one counts as a separate host.
+class FakeFleet:
+    def __init__(self: Self, size: int, latency: float, failure_rate: float) -> None:
+        self.servers = [
+            FakeEndpointServer(
+                (f"127.0.{index // 250}.{index % 250 + 2}", 0), latency, failure_rate
+            )
+            for index in range(size)
+        ]
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    @property
+    def urls(self: Self) -> list[str]:
+        return [
+            f"http://{host}:{port}/" for host, port in (s.server_address[:2] for s in self.servers)
+        ]
+
+    def close(self: Self) -> None:
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
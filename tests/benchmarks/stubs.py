@@ -0,0 +1,119 @@
+# tests/benchmarks/stubs.py
+
+import time
+from threading import Lock
+from typing import Any, Optional, Union
+
+from boto3.dynamodb.conditions import ConditionBase, Key
+from boto3.dynamodb.types import TypeSerializer
+from typing_extensions import Self, Unpack
+
+from service.common.dynamodb import (
+    ACTIVE_INDEX_KEY,
+    QueryKwargs,
+    ScanKwargs,
+    active_shard,
+    plain_item,
+    plain_value,
+)
+
+
+# In-memory stand-in for a boto3 Table with a fixed round-trip latency per request
+class StubTable:
+
+    def __init__(self: Self, items: list[dict[str, Any]], page_size: int, latency: float) -> None:
+        self.items = items
+        self.page_size = page_size
+        self.latency = latency
+        self.requests = 0
+        self._lock = Lock()
+
+    def scan(self: Self, **kwargs: Unpack[ScanKwargs]) -> dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+        segment = int(kwargs.get("Segment", 0))
+        total_segments = int(kwargs.get("TotalSegments", 1))
+        return self._page(self.items[segment::total_segments], kwargs)
+
+    def query(
+        self: Self, KeyConditionExpression: ConditionBase, **kwargs: Unpack[QueryKwargs]
+    ) -> dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+        # Only equality key conditions are supported, which is all the service uses
+        key, value = KeyConditionExpression.get_expression()["values"]
+        items = [item for item in self.items if item.get(key.name) == value]
+        return self._page(items, kwargs, {key.name: value})
+
+    def _page(
+        self: Self,
+        items: list[dict[str, Any]],
+        kwargs: Union[ScanKwargs, QueryKwargs],
+        index_key: Optional[dict[str, Any]] = None,
+    ) -> dict[str, Any]:
+        # Keys look like DynamoDB's: the id of the last item returned, plus the queried index key
+        start_key = kwargs.get("ExclusiveStartKey")
+        start = 0
+        if start_key:
+            start = next(i + 1 for i, item in enumerate(items) if item["id"] == start_key["id"])
+        end = start + min(self.page_size, int(kwargs.get("Limit", self.page_size)))
+        response: dict[str, Any] = {"Items": items[start:end]}
+        if end < len(items):
+            response["LastEvaluatedKey"] = {"id": items[end - 1]["id"], **(index_key or {})}
+        return response
+
+
+# Low-level client over a StubTable, items and keys go over the wire in DynamoDB's typed format.
+# Only the "#name = :value" key conditions of the service's client reads are supported.
+class StubClient:
+
+    def __init__(self: Self, table: StubTable) -> None:
+        self.table = table
+        self.serializer = TypeSerializer()
+
+    def query(
+        self: Self,
+        TableName: str,
+        IndexName: str,
+        KeyConditionExpression: str,
+        ExpressionAttributeNames: dict[str, str],
+        ExpressionAttributeValues: dict[str, Any],
+        Limit: Optional[int] = None,
+        ExclusiveStartKey: Optional[dict[str, Any]] = None,
+        ProjectionExpression: Optional[str] = None,
+    ) -> dict[str, Any]:
+        name, value = KeyConditionExpression.split(" = ")
+        key = ExpressionAttributeNames[name]
+        wire = ExpressionAttributeValues[value]
+        query: QueryKwargs = {}
+        if Limit is not None:
+            query["Limit"] = Limit
+        if ExclusiveStartKey is not None:
+            query["ExclusiveStartKey"] = plain_item(ExclusiveStartKey)
+        response = self.table.query(Key(key).eq(plain_value(wire)), **query)
+        serialized: dict[str, Any] = {"Items": [self.serialize(item) for item in response["Items"]]}
+        if "LastEvaluatedKey" in response:
+            serialized["LastEvaluatedKey"] = self.serialize(response["LastEvaluatedKey"])
+        return serialized
+
+    def serialize(self: Self, item: dict[str, Any]) -> dict[str, Any]:
+        return {name: self.serializer.serialize(value) for name, value in item.items()}
+
+
+def make_endpoint_items(count: int, inactive_every: int = 0) -> list[dict[str, Any]]:
+    items: list[dict[str, Any]] = []
+    for index in range(count):
+        item: dict[str, Any] = {
+            "id": f"{index:08d}",
+            "target_url": f"https://host-{index % 97}.example.com/health/{index}",
+            "is_active": not inactive_every or index % inactive_every != 0,
+            "created_at": 1700000000 + index,
+        }
+        if item["is_active"]:
+            item[ACTIVE_INDEX_KEY] = active_shard(item["id"])
+        items.append(item)
+    return items
@@ -19,7 +19,8 @@ def test_synthesizes_stack_properly() -> None:
         env=Environment(account=settings.account, region=settings.region),
     )
     template = Template.from_stack(stack)
-    template.resource_count_is("AWS::DynamoDB::Table", 1)
-    template.resource_count_is("AWS::IAM::Role", 2)
+    template.resource_count_is("AWS::DynamoDB::Table", 3)
+    template.resource_count_is("AWS::IAM::Role", 4)
     template.resource_count_is("AWS::ApiGateway::RestApi", 1)
-    template.resource_count_is("AWS::Lambda::Function", 2)
+    template.resource_count_is("AWS::Lambda::Function", 9)
+    template.resource_count_is("AWS::SQS::Queue", 2)
@@ -0,0 +1,56 @@
+# tests/service/test_alerts.py
+
+import json
+
+import pytest
+
+from service.common import alerts
+from service.common.alerts import Transition
+from tests.benchmarks.fakes import FakeSNS
+
+
+def transitions(count: int) -> list[Transition]:
+    return [
+        Transition(f"id-{index}", f"https://host-{index}.example.com/", "online", "offline", "", 1)
+        for index in range(count)
+    ]
+
+
+def test_status_transition_only_reports_changes() -> None:
+    assert alerts.status_transition("id", "url", "online", "offline", "timed out", 1) == Transition(
+        "id", "url", "online", "offline", "timed out", 1
+    )
+    assert alerts.status_transition("id", "url", "online", "online", "", 1) is None
+    assert alerts.status_transition("id", "url", None, "offline", "timed out", 1) is None
+    assert alerts.status_transition("id", "url", "offline", "suppressed", "", 1) is None
+
+
+def test_alert_messages_stay_under_the_sns_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(alerts, "MAX_MESSAGE_BYTES", 1000)
+
+    messages = list(alerts.alert_messages(transitions(30)))
+
+    assert len(messages) > 1
+    assert all(len(message) <= 1000 + len('{"transitions":[]}') for message in messages)
+    ids = [row["id"] for message in messages for row in json.loads(message)["transitions"]]
+    assert ids == [f"id-{index}" for index in range(30)]
+
+
+def test_publish_transitions_publishes_once_per_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    sns = FakeSNS()
+    monkeypatch.setattr(alerts, "get_sns", lambda: sns)
+
+    assert alerts.publish_transitions("arn:aws:sns:eu-west-1:1:alerts", transitions(3)) == 1
+    assert alerts.publish_transitions("arn:aws:sns:eu-west-1:1:alerts", []) == 0
+
+    assert len(sns.messages) == 1
+    assert len(json.loads(sns.messages[0]["Message"])["transitions"]) == 3
+
+
+def test_publish_transitions_without_a_topic_only_logs(monkeypatch: pytest.MonkeyPatch) -> None:
+    def unexpected_sns() -> None:
+        raise AssertionError("no topic is configured")
+
+    monkeypatch.setattr(alerts, "get_sns", unexpected_sns)
+
+    assert alerts.publish_transitions("", transitions(2)) == 1
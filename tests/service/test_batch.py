@@ -0,0 +1,97 @@
+# tests/service/test_batch.py
+
+import time
+from typing import Optional
+
+import pytest
+
+from service.handlers import checker
+from service.handlers.checker import CheckTarget
+from service.prober.batch import EndpointBatch
+from service.prober.connections import ParsedUrl, ProbeTimings, parse_url
+from service.prober.probes import Probe
+from tests.benchmarks.fakes import returning
+
+TIMINGS = ProbeTimings(dns=1.0, connect=2.0, tls=None, ttfb=3.0, total=6.0)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://example.com",
+        "http://example.com:8080/health?full=1",
+        "example.com/status",
+        "example.com:443",
+        "HTTPS://Example.COM/",
+    ],
+)
+def test_batch_parses_urls_once_like_the_prober(url: str) -> None:
+    batch = EndpointBatch()
+
+    row = batch.add(CheckTarget("id-0", url))
+
+    assert batch.parsed(row) == parse_url(url)
+
+
+def test_batch_keeps_unparsable_urls_for_the_probe_to_report() -> None:
+    batch = EndpointBatch()
+
+    row = batch.add(CheckTarget("id-0", "https://example.com:99999"))
+
+    assert batch.parsed(row) is None
+    assert batch["id-0"].url == "https://example.com:99999"
+
+
+def test_batch_looks_up_targets_by_id() -> None:
+    batch = EndpointBatch()
+    first = CheckTarget("id-0", "https://example.com", 300, 75, Probe("GET", "/health"))
+    second = CheckTarget("id-1", "https://example.org", 600, 600)
+
+    assert [batch.add(first), batch.add(second), batch.add(first._replace(url="x"))] == [0, 1, 0]
+    assert dict(batch) == {"id-0": first, "id-1": second}
+    assert "id-2" not in batch and len(batch) == 2
+
+
+def test_batch_shares_hosts_and_probes_between_endpoints() -> None:
+    batch = EndpointBatch()
+    for index in range(3):
+        url = "".join(["https://", "example.com", f"/{index}"])
+        batch.add(
+            CheckTarget(f"id-{index}", url, probe=Probe("GET", expected_status=((200, 299),)))
+        )
+
+    assert batch.hosts[0] is batch.hosts[1] is batch.hosts[2]
+    assert batch.probes[0] is batch.probes[1] is batch.probes[2]
+
+
+def test_batch_probe_key_ignores_spelling_but_not_the_probe() -> None:
+    batch = EndpointBatch()
+    urls = ["https://example.com/", "HTTPS://Example.com:443", "https://example.com/a"]
+    for index, url in enumerate(urls):
+        batch.add(CheckTarget(f"id-{index}", url))
+    batch.add(CheckTarget("id-3", "https://example.com", probe=Probe("GET")))
+
+    assert batch.probe_key(0) == batch.probe_key(1)
+    assert batch.probe_key(0) != batch.probe_key(2)
+    assert batch.probe_key(0) != batch.probe_key(3)
+
+
+def test_concurrent_check_hands_parsed_urls_to_the_probe(monkeypatch: pytest.MonkeyPatch) -> None:
+    received: list[Optional[ParsedUrl]] = []
+
+    def fake_probe_endpoint(
+        url: str, parsed: Optional[ParsedUrl] = None, **kwargs: object
+    ) -> ProbeTimings:
+        received.append(parsed)
+        return TIMINGS
+
+    monkeypatch.setattr(checker, "probe_endpoint", fake_probe_endpoint)
+    monkeypatch.setattr(checker, "prefetch_host", returning(None))
+    endpoints = [CheckTarget("id-0", "https://example.com/health"), CheckTarget("id-0", "x")]
+    batch = EndpointBatch()
+
+    results = checker.concurrent_check(endpoints, 2, time.monotonic() + 5, batch=batch)
+
+    assert [check.id for check in results] == ["id-0"]
+    assert received == [parse_url("https://example.com/health")]
+    assert batch["id-0"] == endpoints[0]
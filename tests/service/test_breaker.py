@@ -0,0 +1,61 @@
+# tests/service/test_breaker.py
+
+import pytest
+from typing_extensions import Self
+
+from service.prober.breaker import CircuitBreaker, HostSuppressed
+
+
+class Clock:
+    def __init__(self: Self) -> None:
+        self.now = 0.0
+
+    def __call__(self: Self) -> float:
+        return self.now
+
+
+def test_breaker_opens_after_consecutive_failures() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, base_cooldown=60, clock=Clock())
+
+    breaker.record_failure("down.example.com")
+    assert breaker.acquire("down.example.com") is False
+    breaker.record_failure("down.example.com")
+
+    with pytest.raises(HostSuppressed):
+        breaker.acquire("down.example.com")
+    assert breaker.acquire("up.example.com") is False
+
+
+def test_breaker_lets_one_trial_probe_through_after_the_cooldown() -> None:
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, base_cooldown=60, clock=clock)
+    breaker.record_failure("down.example.com")
+
+    clock.now = 61
+    assert breaker.acquire("down.example.com") is True
+    with pytest.raises(HostSuppressed):
+        breaker.acquire("down.example.com")
+
+    breaker.record_success("down.example.com")
+    assert breaker.acquire("down.example.com") is False
+    assert not breaker.is_open("down.example.com")
+
+
+def test_breaker_cooldown_doubles_up_to_the_maximum() -> None:
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, base_cooldown=60, max_cooldown=200, clock=clock)
+
+    cooldowns: list[float] = []
+    for _ in range(4):
+        breaker.record_failure("down.example.com")
+        start = clock.now
+        while True:
+            clock.now += 1
+            try:
+                breaker.acquire("down.example.com")
+                break
+            except HostSuppressed:
+                continue
+        cooldowns.append(clock.now - start)
+
+    assert cooldowns == [60, 120, 200, 200]
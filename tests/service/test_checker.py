@@ -0,0 +1,478 @@
+# tests/service/test_checker.py
+
+import json
+import socket
+import time
+from typing import Any, NoReturn
+
+import pytest
+from botocore.exceptions import ClientError
+from typing_extensions import Self
+
+from service.handlers import checker
+from service.handlers.checker import CheckResult, CheckTarget
+from service.prober.breaker import CircuitBreaker
+from service.prober.connections import ConnectionPool, ProbeTimings, Target
+from service.prober.probes import Probe
+from service.prober.resolver import ResolverBusy
+from tests.benchmarks.fakes import returning
+
+TIMINGS = ProbeTimings(dns=1.0, connect=2.0, tls=None, ttfb=3.0, total=6.0)
+
+
+def targets(*urls: str) -> list[CheckTarget]:
+    return [CheckTarget(f"id-{index}", url) for index, url in enumerate(urls)]
+
+
+@pytest.fixture(autouse=True)
+def no_dns_prefetch(monkeypatch: pytest.MonkeyPatch) -> None:
+    # The probes are faked, looking up their made up hosts would only hit the network
+    monkeypatch.setattr(checker, "prefetch_host", returning(None))
+
+
+def test_synchronous_check_matches_the_concurrent_results(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_probe_endpoint(url: str, **kwargs: object) -> ProbeTimings:
+        if "down" in url:
+            raise ConnectionRefusedError("connection refused")
+        return TIMINGS
+
+    monkeypatch.setattr(checker, "probe_endpoint", fake_probe_endpoint)
+    endpoints = targets("up.example.com", "down.example.com", "up.example.org")
+
+    results = checker.synchronous_check(endpoints)
+
+    assert results == checker.concurrent_check(endpoints, 2, deadline=time.monotonic() + 5)
+
+
+def test_concurrent_check_keeps_order_and_reports_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fake_probe_endpoint(url: str, **kwargs: object) -> ProbeTimings:
+        if "down" in url:
+            raise ConnectionRefusedError("connection refused")
+        return TIMINGS
+
+    monkeypatch.setattr(checker, "probe_endpoint", fake_probe_endpoint)
+    endpoints = targets("up.example.com", "down.example.com", "up.example.org")
+
+    results = checker.concurrent_check(endpoints, 2, deadline=time.monotonic() + 5)
+
+    assert [(check.id, check.url) for check in results] == [(t.id, t.url) for t in endpoints]
+    assert [check.result for check in results] == [True, False, True]
+    assert results[1].error == "connection refused"
+
+
+def test_concurrent_check_runs_probes_in_parallel(monkeypatch: pytest.MonkeyPatch) -> None:
+    def slow_probe_endpoint(url: str, **kwargs: object) -> ProbeTimings:
+        time.sleep(0.2)
+        return TIMINGS
+
+    monkeypatch.setattr(checker, "probe_endpoint", slow_probe_endpoint)
+    endpoints = targets(*(f"host-{i}.example.com" for i in range(10)))
+
+    start = time.monotonic()
+    results = checker.concurrent_check(endpoints, 10, deadline=time.monotonic() + 5)
+
+    assert all(check.result for check in results)
+    assert time.monotonic() - start < 1
+
+
+def test_concurrent_check_respects_deadline(monkeypatch: pytest.MonkeyPatch) -> None:
+    def hanging_probe_endpoint(url: str, **kwargs: object) -> ProbeTimings:
+        time.sleep(1)
+        return TIMINGS
+
+    monkeypatch.setattr(checker, "probe_endpoint", hanging_probe_endpoint)
+
+    start = time.monotonic()
+    results = checker.concurrent_check(targets("slow.example.com"), 1, time.monotonic() + 0.1)
+
+    assert time.monotonic() - start < 0.5
+    assert results[0].result is False
+    assert "deadline" in results[0].error
+    assert results[0].checked is False
+
+
+def test_probe_timeout_shrinks_towards_the_deadline() -> None:
+    assert checker.probe_timeout(3, None) == 3
+    assert checker.probe_timeout(3, time.monotonic() + 10) == 3
+    assert checker.probe_timeout(3, time.monotonic() + 1) <= 1
+
+    with pytest.raises(checker.DeadlineExceeded):
+        checker.probe_timeout(3, time.monotonic() + checker.MIN_PROBE_TIMEOUT / 2)
+
+
+def test_check_endpoint_skips_probes_without_budget(monkeypatch: pytest.MonkeyPatch) -> None:
+    def unexpected_request(*args: object) -> NoReturn:
+        raise AssertionError("no probe expected")
+
+    monkeypatch.setattr(checker.pool, "request_timed", unexpected_request)
+
+    check = checker.check_endpoint(CheckTarget("id-0", "up.example.com"), time.monotonic())
+
+    assert check.checked is False
+    assert checker.check_status(check) == "unchecked"
+
+
+def test_checkpoint_unchecked_leaves_carried_over_endpoints_out() -> None:
+    results = [
+        CheckResult("id-0", "up.example.com", True, ""),
+        CheckResult("id-1", "slow.example.com", False, checker.DEADLINE_ERROR, checked=False),
+    ]
+
+    assert checker.checkpoint_unchecked(results) == results[:1]
+
+
+def test_concurrent_check_probes_duplicate_urls_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    probed: list[str] = []
+
+    def fake_probe_endpoint(url: str, **kwargs: object) -> ProbeTimings:
+        probed.append(url)
+        return TIMINGS
+
+    monkeypatch.setattr(checker, "probe_endpoint", fake_probe_endpoint)
+    endpoints = targets("https://example.com/", "HTTPS://Example.com:443", "https://example.org")
+
+    results = checker.concurrent_check(endpoints, 4, deadline=time.monotonic() + 5)
+
+    assert [(check.id, check.url) for check in results] == [(t.id, t.url) for t in endpoints]
+    assert all(check.result for check in results)
+    assert sorted(probed) == ["https://example.com/", "https://example.org"]
+
+
+def test_shard_targets_splits_into_fixed_size_shards() -> None:
+    endpoints = targets(*(f"host-{i}.example.com" for i in range(7)))
+
+    shards = list(checker.shard_targets(iter(endpoints), shard_size=3))
+
+    assert [len(shard) for shard in shards] == [3, 3, 1]
+    assert shards[2] == [CheckTarget("id-6", "host-6.example.com")]
+
+
+class StubSQS:
+    # Raises for the calls numbered in `failing_calls`
+    def __init__(self: Self, failing_calls: tuple[int, ...] = ()) -> None:
+        self.failing_calls = failing_calls
+        self.batches: list[list[dict[str, str]]] = []
+
+    def send_message_batch(
+        self: Self, QueueUrl: str, Entries: list[dict[str, str]]
+    ) -> dict[str, Any]:
+        self.batches.append(Entries)
+        if len(self.batches) in self.failing_calls:
+            error = {"Code": "AWS.SimpleQueueService.BatchRequestTooLong", "Message": "too long"}
+            raise ClientError({"Error": error}, "SendMessageBatch")  # type: ignore
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+
+def test_dispatch_shards_sends_batches_of_ten(monkeypatch: pytest.MonkeyPatch) -> None:
+    sqs = StubSQS()
+    monkeypatch.setattr(checker, "get_sqs", returning(sqs))
+    endpoints = targets(*(f"host-{i}.example.com" for i in range(25)))
+    shards = checker.shard_targets(endpoints, shard_size=2)
+
+    dispatched = checker.dispatch_shards("https://sqs.example.com/queue", shards)
+
+    assert dispatched == 13
+    assert [len(batch) for batch in sqs.batches] == [10, 3]
+    assert json.loads(sqs.batches[0][0]["MessageBody"]) == {
+        "endpoints": [
+            ["id-0", "host-0.example.com", 300, 300, ["HEAD", None, [[200, 399]], None]],
+            ["id-1", "host-1.example.com", 300, 300, ["HEAD", None, [[200, 399]], None]],
+        ]
+    }
+
+
+def test_store_check_results_uses_batch_writer(monkeypatch: pytest.MonkeyPatch) -> None:
+    class StubBatch:
+        def __init__(self: Self) -> None:
+            self.items: list[dict[str, Any]] = []
+
+        def __enter__(self: Self) -> "StubBatch":
+            return self
+
+        def __exit__(self: Self, *args: object) -> None:
+            pass
+
+        def put_item(self: Self, Item: dict[str, Any]) -> None:
+            self.items.append(Item)
+
+    batch = StubBatch()
+
+    class StubTable:
+        def batch_writer(self: Self) -> StubBatch:
+            return batch
+
+    monkeypatch.setattr(checker, "get_table", returning(StubTable()))
+    monkeypatch.setenv("RESULTS_RETENTION_DAYS", "1")
+    results = [
+        CheckResult("id-0", "up.example.com", True, ""),
+        CheckResult("id-1", "down.example.com", False, "timed out"),
+    ]
+
+    checker.store_check_results("results", results)
+
+    assert [item["endpoint_id"] for item in batch.items] == ["id-0", "id-1"]
+    assert "error" not in batch.items[0]
+    assert batch.items[1]["error"] == "timed out"
+    assert batch.items[0]["expires_at"] - batch.items[0]["checked_at"] == 24 * 60 * 60
+
+
+def test_schedule_next_checks_backs_off_healthy_endpoints(monkeypatch: pytest.MonkeyPatch) -> None:
+    class StubTable:
+        def __init__(self: Self) -> None:
+            self.updates: dict[str, dict[str, Any]] = {}
+
+        def update_item(self: Self, Key: dict[str, str], **kwargs: Any) -> dict[str, Any]:
+            self.updates[Key["id"]] = kwargs["ExpressionAttributeValues"]
+            return {}
+
+    table = StubTable()
+    monkeypatch.setattr(checker, "get_table", returning(table))
+    due = {
+        "id-0": CheckTarget("id-0", "up.example.com", 300, 300),
+        "id-1": CheckTarget("id-1", "down.example.com", 300, 1200),
+    }
+    results = [
+        CheckResult("id-0", "up.example.com", True, ""),
+        CheckResult("id-1", "down.example.com", False, "timed out"),
+    ]
+
+    checker.schedule_next_checks("table", due, results, now=1000)
+
+    assert table.updates["id-0"] == {":interval": 600, ":next": 1600, ":status": "online"}
+    assert table.updates["id-1"] == {":interval": 75, ":next": 1075, ":status": "offline"}
+
+
+def test_schedule_next_checks_reports_status_transitions(monkeypatch: pytest.MonkeyPatch) -> None:
+    previous = {"id-0": "online", "id-1": "online", "id-2": "offline", "id-3": None}
+
+    class StubTable:
+        def update_item(self: Self, Key: dict[str, str], **kwargs: Any) -> dict[str, Any]:
+            status = previous[Key["id"]]
+            return {"Attributes": {"last_status": status}} if status else {}
+
+    monkeypatch.setattr(checker, "get_table", returning(StubTable()))
+    due = {
+        f"id-{index}": CheckTarget(f"id-{index}", f"host-{index}.example.com") for index in range(5)
+    }
+    results = [
+        CheckResult("id-0", "host-0.example.com", True, ""),
+        CheckResult("id-1", "host-1.example.com", False, "timed out"),
+        CheckResult("id-2", "host-2.example.com", True, ""),
+        CheckResult("id-3", "host-3.example.com", False, "timed out"),
+    ]
+
+    transitions = checker.schedule_next_checks("table", due, results, now=1000)
+
+    assert [(t.id, t.previous, t.status, t.error) for t in transitions] == [
+        ("id-1", "online", "offline", "timed out"),
+        ("id-2", "offline", "online", ""),
+    ]
+
+
+def test_check_endpoint_suppresses_hosts_with_an_open_breaker(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    requests: list[str] = []
+
+    def failing_request(
+        target: Target, method: str, path: str, timeout: float, *args: object
+    ) -> NoReturn:
+        requests.append(target.host)
+        raise TimeoutError("timed out")
+
+    monkeypatch.setattr(checker, "breaker", CircuitBreaker(failure_threshold=1))
+    monkeypatch.setattr(checker.pool, "request_timed", failing_request)
+    target = CheckTarget("id-0", "dead.example.com")
+
+    first = checker.check_endpoint(target)
+    second = checker.check_endpoint(target)
+
+    assert first == CheckResult("id-0", "dead.example.com", False, "timed out", failure="timeout")
+    assert second.suppressed and not second.result
+    assert checker.check_status(second) == "suppressed"
+    assert requests == ["dead.example.com", "dead.example.com"]
+
+
+@pytest.mark.parametrize("budget", [0, 0.5])
+def test_trial_probes_cut_short_by_the_deadline_release_the_host(
+    monkeypatch: pytest.MonkeyPatch, budget: float
+) -> None:
+    def failing_request(
+        target: Target, method: str, path: str, timeout: float, *args: object
+    ) -> NoReturn:
+        raise TimeoutError("timed out")
+
+    breaker = CircuitBreaker(failure_threshold=1, base_cooldown=0)
+    breaker.record_failure("dead.example.com")
+    monkeypatch.setattr(checker, "breaker", breaker)
+    monkeypatch.setattr(checker.pool, "request_timed", failing_request)
+    target = CheckTarget("id-0", "https://dead.example.com")
+
+    # No budget left at all, or only enough for a truncated trial
+    check = checker.check_endpoint(target, deadline=time.monotonic() + budget)
+
+    assert not check.suppressed
+    assert breaker.acquire("dead.example.com") is True
+
+
+def test_check_endpoint_uses_the_endpoint_probe(monkeypatch: pytest.MonkeyPatch) -> None:
+    requests: list[tuple[str, str, bytes]] = []
+
+    def server_error(
+        target: Target, method: str, path: str, timeout: float, body: bytes
+    ) -> tuple[int, ProbeTimings, bool]:
+        requests.append((method, path, body))
+        return 500, TIMINGS, True
+
+    monkeypatch.setattr(checker, "breaker", CircuitBreaker())
+    monkeypatch.setattr(checker.pool, "request_timed", server_error)
+    probe = Probe("GET", None, ((200, 299),), "ok")
+    target = CheckTarget("id-0", "https://broken.example.com/health", probe=probe)
+
+    check = checker.check_endpoint(target)
+
+    assert check == CheckResult(
+        "id-0", target.url, False, "unexpected status 500", failure="response"
+    )
+    assert requests == [("GET", "/health", b"ok")]
+
+
+def test_failing_paths_do_not_suppress_their_host(monkeypatch: pytest.MonkeyPatch) -> None:
+    requests: list[tuple[str, str]] = []
+
+    def path_status(
+        target: Target, method: str, path: str, timeout: float, body: bytes
+    ) -> tuple[int, ProbeTimings, bool]:
+        requests.append((target.scheme, path))
+        return (200 if path == "/ok" else 500), TIMINGS, True
+
+    monkeypatch.setattr(checker, "breaker", CircuitBreaker(failure_threshold=3))
+    monkeypatch.setattr(checker.pool, "request_timed", path_status)
+    broken = [CheckTarget(f"id-{index}", f"example.com/broken/{index}") for index in range(3)]
+
+    failures = [checker.check_endpoint(target) for target in broken]
+    healthy = checker.check_endpoint(CheckTarget("id-3", "example.com/ok"))
+
+    assert [check.failure for check in failures] == ["response"] * 3
+    assert healthy.result and not healthy.suppressed
+    # The host answered on the first scheme, the other one is not tried
+    assert requests == [("http", f"/broken/{index}") for index in range(3)] + [("http", "/ok")]
+
+
+def test_check_endpoint_fails_fast_on_dns_failures(monkeypatch: pytest.MonkeyPatch) -> None:
+    lookups: list[str] = []
+
+    def failing_lookup(host: str, *args: object, **kwargs: object) -> NoReturn:
+        lookups.append(host)
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+
+    monkeypatch.setattr(checker, "breaker", CircuitBreaker())
+    monkeypatch.setattr(checker, "pool", ConnectionPool())
+    monkeypatch.setattr(socket, "getaddrinfo", failing_lookup)
+    # Without a scheme the endpoint would be tried on http and https
+    target = CheckTarget("id-0", "gone.example.com")
+
+    first = checker.check_endpoint(target)
+    second = checker.check_endpoint(target)
+
+    assert first.failure == second.failure == "dns"
+    assert first.error.startswith("dns lookup of gone.example.com failed")
+    assert lookups == ["gone.example.com"]
+
+
+def test_a_busy_resolver_leaves_the_endpoint_unchecked(monkeypatch: pytest.MonkeyPatch) -> None:
+    def busy_request(
+        target: Target, method: str, path: str, timeout: float, *args: object
+    ) -> NoReturn:
+        raise ResolverBusy(f"dns lookup of {target.host} waited for a resolver")
+
+    breaker = CircuitBreaker(failure_threshold=1)
+    monkeypatch.setattr(checker, "breaker", breaker)
+    monkeypatch.setattr(checker.pool, "request_timed", busy_request)
+
+    check = checker.check_endpoint(CheckTarget("id-0", "https://busy.example.com"))
+
+    assert check.checked is False and not check.suppressed
+    assert checker.check_status(check) == "unchecked"
+    assert breaker.acquire("busy.example.com") is False
+
+
+def test_dispatch_shards_keeps_batches_under_the_size_limit(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    sqs = StubSQS(failing_calls=(1,))
+    monkeypatch.setattr(checker, "get_sqs", returning(sqs))
+    monkeypatch.setattr(checker, "SQS_BATCH_BYTES", 1000)
+    endpoints = targets(*(f"host-{i}.example.com" for i in range(40)))
+    shards = checker.shard_targets(endpoints, shard_size=4)
+
+    dispatched = checker.dispatch_shards("https://sqs.example.com/queue", shards)
+
+    sizes = [sum(len(entry["MessageBody"]) for entry in batch) for batch in sqs.batches]
+    assert max(sizes) <= 1000 and len(sqs.batches) > 1
+    # The first batch failed, the others still went out
+    assert dispatched == sum(len(batch) for batch in sqs.batches[1:])
+
+
+def test_dispatch_shards_splits_shards_too_large_for_one_message(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    sqs = StubSQS()
+    monkeypatch.setattr(checker, "get_sqs", returning(sqs))
+    monkeypatch.setattr(checker, "SQS_BATCH_BYTES", 300)
+    endpoints = list(targets(*(f"host-{i}.example.com" for i in range(8))))
+
+    checker.dispatch_shards("https://sqs.example.com/queue", [endpoints])
+
+    messages = [json.loads(entry["MessageBody"]) for batch in sqs.batches for entry in batch]
+    assert [id for message in messages for id, *_ in message["endpoints"]] == [
+        target.id for target in endpoints
+    ]
+    assert len(messages) > 1
+
+
+def test_report_run_metrics_emits_percentiles_and_counts(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "checker")
+    results = [
+        CheckResult("id-0", "up.example.com", True, "", timings=TIMINGS),
+        CheckResult("id-1", "down.example.com", False, "timed out"),
+        CheckResult("id-2", "dead.example.com", False, "suppressed", suppressed=True),
+    ]
+
+    checker.report_run_metrics(results, started=time.monotonic())
+
+    line = json.loads(capsys.readouterr().out)
+    names = [metric["Name"] for metric in line["_aws"]["CloudWatchMetrics"][0]["Metrics"]]
+    assert line["Function"] == "checker"
+    assert line["ttfb"]["Counts"] == [1]
+    assert line["ttfb"]["Values"][0] == pytest.approx(3.0, rel=0.01)
+    assert "tls" not in names
+    assert (line["online"], line["offline"], line["suppressed"]) == (1, 1, 1)
+
+
+def test_report_run_metrics_splits_distributions_over_records(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    # 150 distinct latencies, more buckets than one EMF record holds
+    results = [
+        CheckResult(
+            f"id-{index}", "up.example.com", True, "", timings=TIMINGS._replace(ttfb=1.05**index)
+        )
+        for index in range(150)
+    ]
+
+    checker.report_run_metrics(results, started=time.monotonic())
+
+    first, second = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(first["ttfb"]["Values"]) == 100 and first["online"] == 150
+    assert sum(first["ttfb"]["Counts"]) + sum(second["ttfb"]["Counts"]) == 150
+    assert "online" not in second and "dns" not in second
+
+
+def test_latency_item_skips_phases_that_did_not_run() -> None:
+    item = checker.latency_item(TIMINGS)
+
+    assert set(item) == {"dns", "connect", "ttfb", "total"}
+    assert str(item["ttfb"]) == "3.0"
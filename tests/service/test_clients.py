@@ -0,0 +1,26 @@
+# tests/service/test_clients.py
+
+import pytest
+
+from service.common import clients
+
+
+def test_get_table_is_cached_across_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+
+    first = clients.get_table("endpoint-checker-table")
+
+    assert clients.get_table("endpoint-checker-table") is first
+    assert clients.get_table("endpoint-checker-results") is not first
+    assert clients.get_table("endpoint-checker-results").meta.client is first.meta.client
+
+
+def test_client_config_reads_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("AWS_CLIENT_TCP_KEEPALIVE", "false")
+    monkeypatch.setenv("AWS_CLIENT_MAX_ATTEMPTS", "5")
+    monkeypatch.setenv("AWS_CLIENT_RETRY_MODE", "adaptive")
+
+    config = clients.get_client_config()
+
+    assert config.tcp_keepalive is False  # type: ignore
+    assert config.retries == {"mode": "adaptive", "max_attempts": 5}  # type: ignore
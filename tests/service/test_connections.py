@@ -0,0 +1,203 @@
+# tests/service/test_connections.py
+
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+from typing_extensions import Self
+
+from service.prober.connections import ConnectionPool, Target, parse_targets
+from service.prober.probes import BODY_CHUNK_SIZE, BODY_READ_LIMIT
+from tests.benchmarks.fakes import returning
+
+
+class CountingServer(ThreadingHTTPServer):
+    connections = 0
+
+    def get_request(self: Self) -> tuple:  # type: ignore
+        self.connections += 1
+        return super().get_request()
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self: Self) -> None:
+        self.send_response(204)
+        self.end_headers()
+
+    def do_GET(self: Self) -> None:
+        # The marker straddles the first chunk boundary, /large puts it past the read limit
+        size = BODY_READ_LIMIT * 4 if self.path == "/large" else BODY_CHUNK_SIZE * 2
+        offset = size - 10 if self.path == "/large" else BODY_CHUNK_SIZE - 3
+        body = b"x" * offset + b"healthy" + b"x" * (size - offset - 7)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self: Self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[CountingServer]:
+    server = CountingServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize(
+    "url, targets",
+    [
+        ("https://example.com/health", [Target("https", "example.com", 443)]),
+        ("http://Example.com:8080/", [Target("http", "example.com", 8080)]),
+        (
+            "example.com/health",
+            [Target("http", "example.com", 80), Target("https", "example.com", 443)],
+        ),
+        ("example.com:443", [Target("https", "example.com", 443)]),
+    ],
+)
+def test_parse_targets(url: str, targets: list[Target]) -> None:
+    assert parse_targets(url) == targets
+
+
+def test_request_reuses_keep_alive_connections(server: CountingServer) -> None:
+    pool = ConnectionPool()
+    target = Target("http", "localhost", server.server_address[1])
+
+    statuses = [pool.request(target, "HEAD", "/", timeout=1) for _ in range(5)]
+
+    assert statuses == [204] * 5
+    assert server.connections == 1
+    pool.close()
+
+
+def test_request_timed_reports_phases_of_new_connections_only(server: CountingServer) -> None:
+    pool = ConnectionPool()
+    target = Target("http", "localhost", server.server_address[1])
+
+    _, first, _ = pool.request_timed(target, "HEAD", "/", timeout=1)
+    _, second, _ = pool.request_timed(target, "HEAD", "/", timeout=1)
+
+    assert first.dns is not None and first.connect is not None and first.tls is None
+    assert second.dns is None and second.connect is None
+    assert 0 <= second.ttfb <= second.total
+    pool.close()
+
+
+def test_request_timed_matches_body_across_chunks(server: CountingServer) -> None:
+    pool = ConnectionPool()
+    target = Target("http", "localhost", server.server_address[1])
+
+    status, _, matched = pool.request_timed(target, "GET", "/", 1, b"healthy")
+    _, _, missing = pool.request_timed(target, "GET", "/", 1, b"unhealthy")
+
+    assert (status, matched, missing) == (200, True, False)
+    # Both bodies were read to the end, so the connection stayed open
+    assert server.connections == 1
+    pool.close()
+
+
+def test_request_timed_stops_reading_at_the_body_limit(server: CountingServer) -> None:
+    pool = ConnectionPool()
+    target = Target("http", "localhost", server.server_address[1])
+
+    _, _, matched = pool.request_timed(target, "GET", "/large", 1, b"healthy")
+    pool.request_timed(target, "GET", "/", 1)
+
+    assert matched is False
+    # The unread rest of the large body makes the connection unusable
+    assert server.connections == 2
+    pool.close()
+
+
+def test_request_retries_dropped_keep_alive_connection(server: CountingServer) -> None:
+    pool = ConnectionPool()
+    target = Target("http", "localhost", server.server_address[1])
+    pool.request(target, "HEAD", "/", timeout=1)
+    # Swap the idle socket for one whose peer has already hung up
+    local, remote = socket.socketpair()
+    remote.close()
+    pool._idle[target][0].sock = local  # type: ignore
+
+    assert pool.request(target, "HEAD", "/", timeout=1) == 204
+    assert server.connections == 2
+
+
+def test_request_raises_when_nothing_listens() -> None:
+    pool = ConnectionPool()
+
+    with pytest.raises(OSError):
+        pool.request(Target("http", "127.0.0.1", 9), "HEAD", "/", timeout=1)
+
+
+def test_request_falls_back_to_the_next_address(
+    server: CountingServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    port = server.server_address[1]
+    pool = ConnectionPool()
+    # The server only listens on IPv4, so the first address is refused or unreachable
+    addresses = [("::1", port), ("127.0.0.1", port)]
+    monkeypatch.setattr(pool.resolver, "resolve", returning((addresses, 0.0)))
+
+    assert pool.request(Target("http", "dual.example.com", port), "HEAD", "/", timeout=1) == 204
+    assert server.connections == 1
+
+
+def test_failed_tls_handshake_closes_the_socket(
+    server: CountingServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    opened: list[socket.socket] = []
+    create_connection = socket.create_connection
+
+    def recording_create_connection(*args: Any, **kwargs: Any) -> socket.socket:
+        opened.append(create_connection(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(socket, "create_connection", recording_create_connection)
+    pool = ConnectionPool()
+
+    # The server speaks plain http, so the handshake fails after the TCP connect succeeded
+    with pytest.raises(ssl.SSLError):
+        pool.request(Target("https", "127.0.0.1", server.server_address[1]), "HEAD", "/", timeout=1)
+    assert len(opened) == 1 and opened[0].fileno() == -1
+
+
+@pytest.mark.skipif(shutil.which("openssl") is None, reason="openssl is needed for a test cert")
+def test_https_request_resumes_tls_session(server: CountingServer, tmp_path: Path) -> None:
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+        + ["-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost"]
+        + ["-keyout", str(key), "-out", str(cert)],
+        check=True,
+        capture_output=True,
+    )
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.maximum_version = ssl.TLSVersion.TLSv1_2
+    server_context.load_cert_chain(cert, key)
+    server.socket = server_context.wrap_socket(server.socket, server_side=True)
+
+    pool = ConnectionPool(max_idle_per_host=0)
+    pool.ssl_context.load_verify_locations(cert)
+    target = Target("https", "localhost", server.server_address[1])
+
+    assert pool.request(target, "HEAD", "/", timeout=1) == 204
+    connection, reused = pool.acquire(target, timeout=1)
+    connection.request("HEAD", "/")
+    connection.getresponse().read()
+
+    assert reused is False
+    assert isinstance(connection.sock, ssl.SSLSocket)
+    assert connection.sock.session_reused
+    connection.close()
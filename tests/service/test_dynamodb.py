@@ -0,0 +1,155 @@
+# tests/service/test_dynamodb.py
+
+from decimal import Decimal
+from typing import Any, Generator, Union, cast
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+from typing_extensions import Self, Unpack
+
+from service.common.dynamodb import (
+    ACTIVE_INDEX_SHARDS,
+    ScanKwargs,
+    active_shard,
+    parallel_scan_pages,
+    plain_item,
+    projection,
+    query_active_page,
+    query_active_page_plain,
+    scan_pages,
+    wire_value,
+)
+from tests.benchmarks.stubs import StubClient, StubTable, make_endpoint_items
+
+
+class PagedTable:
+    def __init__(self: Self, pages: list[list[dict[str, Any]]]) -> None:
+        self.pages = pages
+        self.calls: list[ScanKwargs] = []
+
+    def scan(self: Self, **kwargs: Unpack[ScanKwargs]) -> dict[str, Any]:
+        self.calls.append(kwargs)
+        index = int(kwargs.get("ExclusiveStartKey", {}).get("page", 0))
+        response: dict[str, Any] = {"Items": self.pages[index]}
+        if index + 1 < len(self.pages):
+            response["LastEvaluatedKey"] = {"page": index + 1}
+        return response
+
+
+def test_scan_pages_yields_every_page() -> None:
+    table = PagedTable([[{"id": "1"}, {"id": "2"}], [{"id": "3"}], [{"id": "4"}]])
+
+    pages = list(scan_pages(table, **projection("id")))  # type: ignore
+
+    assert pages == [[{"id": "1"}, {"id": "2"}], [{"id": "3"}], [{"id": "4"}]]
+    assert [call.get("ExclusiveStartKey") for call in table.calls] == [
+        None,
+        {"page": 1},
+        {"page": 2},
+    ]
+    assert all(call.get("ProjectionExpression") == "#id" for call in table.calls)
+
+
+def test_scan_pages_is_lazy() -> None:
+    table = PagedTable([[{"id": "1"}], [{"id": "2"}]])
+
+    pages = scan_pages(table)  # type: ignore
+    next(pages)
+
+    assert len(table.calls) == 1
+
+
+def test_projection_uses_placeholders() -> None:
+    assert projection("id", "target_url") == {
+        "ProjectionExpression": "#id, #target_url",
+        "ExpressionAttributeNames": {"#id": "id", "#target_url": "target_url"},
+    }
+
+
+def test_parallel_scan_pages_merges_all_segments() -> None:
+    items = make_endpoint_items(1_050)
+    table = StubTable(items, page_size=100, latency=0)
+
+    pages = list(parallel_scan_pages(table, 4, **projection("id")))  # type: ignore
+
+    assert sorted(item["id"] for page in pages for item in page) == [item["id"] for item in items]
+    assert {len(page) for page in pages} <= {100, 63, 62}
+
+
+def test_parallel_scan_pages_raises_segment_errors() -> None:
+    class FailingTable(StubTable):
+        def scan(self: Self, **kwargs: Unpack[ScanKwargs]) -> dict[str, Any]:
+            if kwargs.get("Segment") == 1:
+                raise RuntimeError("segment failed")
+            return super().scan(**kwargs)
+
+    table = FailingTable(make_endpoint_items(10), page_size=5, latency=0)
+
+    with pytest.raises(RuntimeError, match="segment failed"):
+        list(parallel_scan_pages(table, 2))  # type: ignore
+
+
+def test_parallel_scan_pages_stops_when_closed_early() -> None:
+    table = StubTable(make_endpoint_items(1_000), page_size=10, latency=0.001)
+
+    pages = cast(Generator[Any, None, None], parallel_scan_pages(table, 4))  # type: ignore
+    next(pages)
+    pages.close()
+
+    assert table.requests < 100
+
+
+def test_active_shard_is_stable_and_in_range() -> None:
+    ids = [f"endpoint-{index}" for index in range(1_000)]
+
+    shards = [active_shard(id) for id in ids]
+
+    assert shards == [active_shard(id) for id in ids]
+    assert set(shards) == set(range(ACTIVE_INDEX_SHARDS))
+
+
+def test_plain_item_maps_wire_values_to_json_ready_values() -> None:
+    item = {
+        "id": "abc",
+        "created_at": Decimal(1700000000),
+        "ratio": Decimal("0.25"),
+        "is_active": True,
+        "error": None,
+        "probe": {"method": "GET", "expected_status": [[Decimal(200), Decimal(299)]]},
+        "tags": {"a", "b"},
+        "ports": {Decimal(80)},
+    }
+    serializer = TypeSerializer()
+
+    plain = plain_item({name: serializer.serialize(value) for name, value in item.items()})
+
+    assert sorted(plain.pop("tags")) == ["a", "b"]
+    assert plain == {name: value for name, value in item.items() if name != "tags"} | {
+        "ports": [80]
+    }
+    assert isinstance(plain["created_at"], int) and isinstance(plain["ratio"], float)
+
+
+@pytest.mark.parametrize(
+    "value, wire", [("a", {"S": "a"}), (3, {"N": "3"}), (True, {"BOOL": True})]
+)
+def test_wire_value(value: Union[str, int, bool], wire: dict[str, Any]) -> None:
+    assert wire_value(value) == wire
+
+
+def test_query_active_page_plain_pages_like_the_resource_path() -> None:
+    table = StubTable(make_endpoint_items(300, inactive_every=4), page_size=25, latency=0)
+    client = StubClient(table)
+    cursor: Any = None
+    pages = 0
+
+    while True:
+        items, next_cursor = query_active_page(table, 40, cursor)  # type: ignore
+        plain_items, plain_cursor = query_active_page_plain(client, "t", 40, cursor)  # type: ignore
+        assert plain_items == items and plain_cursor == next_cursor
+        pages += 1
+        cursor = next_cursor
+        if not cursor:
+            break
+
+    assert pages == 225 // 40 + 1
@@ -0,0 +1,27 @@
+# tests/service/test_imports.py
+
+import subprocess
+import sys
+
+import pytest
+
+from tests.benchmarks.bench_startup import HANDLERS
+
+# Installed for type checking only, they are not packaged into the lambda layer
+TYPING_ONLY_PACKAGES = ("aws_lambda_typing", "mypy_boto3_dynamodb", "mypy_boto3_sqs")
+
+
+@pytest.mark.parametrize("handler", HANDLERS)
+def test_handlers_do_not_import_typing_only_packages(handler: str) -> None:
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, service.handlers.{handler}; print(' '.join(sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+
+    assert not [module for module in loaded if module.startswith(TYPING_ONLY_PACKAGES)]
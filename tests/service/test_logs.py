@@ -0,0 +1,90 @@
+# tests/service/test_logs.py
+
+import json
+import logging
+import time
+
+import pytest
+from typing_extensions import Self
+
+from service.common.alerts import Transition
+from service.common.logs import JsonFormatter, SamplingFilter, get_logger, get_sample_rate
+from service.handlers import checker
+from service.handlers.checker import CheckResult
+
+
+def record(level: int, message: str, *args: object) -> logging.LogRecord:
+    return logging.LogRecord("service.test", level, __file__, 1, message, args, None)
+
+
+def test_json_formatter_writes_one_object_with_the_extra_fields() -> None:
+    entry = record(logging.INFO, "Stored %s results", 3)
+    entry.table = "results"
+
+    line = json.loads(JsonFormatter().format(entry))
+
+    assert line["message"] == "Stored 3 results"
+    assert (line["level"], line["logger"], line["table"]) == ("INFO", "service.test", "results")
+
+
+def test_skipped_records_are_never_formatted(monkeypatch: pytest.MonkeyPatch) -> None:
+    class Expensive:
+        def __str__(self: Self) -> str:
+            raise AssertionError("formatted a skipped record")
+
+    monkeypatch.setenv("LOG_LEVEL", "WARNING")
+    logger = get_logger("service.test.level")
+    logger.info("Loaded %s", Expensive())
+    logger.addFilter(SamplingFilter(0, sample=lambda: 0.5))
+    logger.setLevel(logging.INFO)
+    logger.info("Sampled %s", Expensive())
+
+
+def test_sampling_keeps_the_rate_and_every_warning() -> None:
+    samples = iter([0.05, 0.5, 0.95, 0.5])
+    sampling = SamplingFilter(0.1, sample=lambda: next(samples))
+
+    kept = [sampling.filter(record(logging.INFO, "probe")) for _ in range(3)]
+
+    assert kept == [True, False, False]
+    assert sampling.filter(record(logging.WARNING, "deadline reached"))
+
+
+def test_sample_rates_are_set_per_logger(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LOG_SAMPLE_RATES", json.dumps({"service.handlers.urls_get": 0.1}))
+    monkeypatch.setenv("LOG_SAMPLE_RATE", "0.5")
+
+    assert get_sample_rate("service.handlers.urls_get") == 0.1
+    assert get_sample_rate("service.handlers.urls_get", default=1) == 0.1
+    assert get_sample_rate("service.handlers.urls_put") == 0.5
+    assert get_sample_rate("service.handlers.checker.summary", default=1) == 1
+
+
+def test_checker_logs_one_summary_per_run(capsys: pytest.CaptureFixture[str]) -> None:
+    results = [
+        CheckResult(f"id-{index}", f"host-{index}.example.com", True, "") for index in range(50)
+    ]
+    results += [
+        CheckResult("id-50", "gone.example.com", False, "dns lookup failed", failure="dns"),
+        CheckResult("id-51", "slow.example.com", False, checker.DEADLINE_ERROR, checked=False),
+    ]
+    transitions = [Transition("id-50", "gone.example.com", "online", "offline", "dns", 1)]
+
+    checker.log_run_summary(results, transitions, time.monotonic())
+
+    (line,) = capsys.readouterr().out.splitlines()
+    summary = json.loads(line)
+    assert summary["message"] == "Checker run summary"
+    assert summary["endpoints"] == 52
+    assert summary["statuses"] == {"online": 50, "offline": 1, "unchecked": 1}
+    assert summary["failures"] == {"dns": 1}
+    assert summary["carried_over"] == ["id-51"]
+    assert summary["changed"] == [
+        {
+            "id": "id-50",
+            "url": "gone.example.com",
+            "from": "online",
+            "to": "offline",
+            "error": "dns",
+        }
+    ]
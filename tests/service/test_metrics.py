@@ -0,0 +1,66 @@
+# tests/service/test_metrics.py
+
+import json
+import random
+
+import pytest
+
+from service.common.metrics import QuantileSketch, emf_record, emit_emf
+
+
+def test_sketch_quantiles_are_within_relative_accuracy() -> None:
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3, 1) for _ in range(10000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+    assert len(sketch.buckets) < 1000
+
+
+def test_sketch_merge_matches_a_single_sketch() -> None:
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for value in range(1, 201):
+        whole.add(value)
+        (left if value % 2 else right).add(value)
+
+    left.merge(right)
+
+    assert left.count == whole.count
+    assert left.quantile(0.95) == whole.quantile(0.95)
+
+
+def test_sketch_distributions_hold_every_sample() -> None:
+    sketch = QuantileSketch()
+    for value in (0, 10, 10.01, 250, 250):
+        sketch.add(value)
+
+    (distribution,) = sketch.distributions()
+
+    assert distribution["Values"][0] == 0.0
+    assert distribution["Counts"] == [1, 2, 2]
+    assert distribution["Values"][1] == pytest.approx(10, rel=0.01)
+    assert [len(chunk["Values"]) for chunk in sketch.distributions(max_values=2)] == [2, 1]
+
+
+def test_empty_sketch_has_no_quantiles() -> None:
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_emit_emf_writes_bare_json_lines(capsys: pytest.CaptureFixture[str]) -> None:
+    record = emf_record(
+        "Checker", {"Function": "f"}, {"ttfb_p99": 12.5}, {"ttfb_p99": "Milliseconds"}
+    )
+
+    emit_emf([record])
+
+    line = json.loads(capsys.readouterr().out)
+    directive = line["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "Checker"
+    assert directive["Dimensions"] == [["Function"]]
+    assert directive["Metrics"] == [{"Name": "ttfb_p99", "Unit": "Milliseconds"}]
+    assert line["Function"] == "f" and line["ttfb_p99"] == 12.5
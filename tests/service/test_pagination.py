@@ -0,0 +1,71 @@
+# tests/service/test_pagination.py
+
+from decimal import Decimal
+from typing import Any
+
+import pytest
+
+from service.common.pagination import (
+    DEFAULT_PAGE_LIMIT,
+    InvalidPageRequest,
+    decode_next_token,
+    encode_next_token,
+    parse_limit,
+)
+
+RESULTS_CURSOR = {"endpoint_id": str, "checked_at": int}
+
+
+def test_next_token_round_trips_last_evaluated_key() -> None:
+    last_evaluated_key = {"endpoint_id": "abc", "checked_at": Decimal(1700000000)}
+
+    next_token = encode_next_token(last_evaluated_key)
+
+    assert next_token is not None
+    assert decode_next_token(next_token, RESULTS_CURSOR) == {
+        "endpoint_id": "abc",
+        "checked_at": 1700000000,
+    }
+
+
+def test_next_token_is_empty_on_the_last_page() -> None:
+    assert encode_next_token(None) is None
+    assert decode_next_token(None) is None
+
+
+@pytest.mark.parametrize("next_token", ["not-base64!", "bm90IGpzb24=", "WzEsMl0="])
+def test_decode_next_token_rejects_garbage(next_token: str) -> None:
+    with pytest.raises(InvalidPageRequest):
+        decode_next_token(next_token)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        {"foo": 1},
+        {"endpoint_id": "abc"},
+        {"endpoint_id": "abc", "checked_at": "1700000000"},
+        {"endpoint_id": "abc", "checked_at": True},
+        {"endpoint_id": "abc", "checked_at": 1700000000, "extra": 1},
+    ],
+)
+def test_decode_next_token_rejects_cursors_of_the_wrong_shape(cursor: dict[str, Any]) -> None:
+    with pytest.raises(InvalidPageRequest):
+        decode_next_token(encode_next_token(cursor), RESULTS_CURSOR)
+
+
+def test_decode_next_token_accepts_any_of_the_shapes() -> None:
+    shapes = ({"after": str}, {"shard": int, "key": (type(None), {"id": str})})
+
+    for cursor in ({"after": "a"}, {"shard": 1, "key": None}, {"shard": 1, "key": {"id": "a"}}):
+        assert decode_next_token(encode_next_token(cursor), *shapes) == cursor
+    with pytest.raises(InvalidPageRequest):
+        decode_next_token(encode_next_token({"shard": 1, "key": {"id": 2}}), *shapes)
+
+
+def test_parse_limit() -> None:
+    assert parse_limit(None) == DEFAULT_PAGE_LIMIT
+    assert parse_limit("25") == 25
+    for limit in ("0", "-1", "ten", "100000"):
+        with pytest.raises(InvalidPageRequest):
+            parse_limit(limit)
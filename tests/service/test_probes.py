@@ -0,0 +1,87 @@
+# tests/service/test_probes.py
+
+from typing import Any
+
+import pytest
+from pydantic import ValidationError
+
+from service.common.models import Endpoint, ProbeSpec, endpoint_item
+from service.prober.probes import (
+    DEFAULT_PROBE,
+    Probe,
+    UnexpectedResponse,
+    check_response,
+    probe_from_item,
+    request_path,
+)
+
+
+def test_probe_spec_defaults_to_head_with_healthy_statuses() -> None:
+    spec = ProbeSpec()
+
+    assert spec.method == "HEAD"
+    assert spec.expected_status == [[200, 399]]
+    assert probe_from_item(spec.model_dump()) == DEFAULT_PROBE
+
+
+def test_probe_spec_expands_single_statuses() -> None:
+    spec = ProbeSpec.model_validate(
+        {"method": "GET", "expected_status": [200, [300, 304]], "body_match": "ok"}
+    )
+
+    assert spec.expected_status == [[200, 200], [300, 304]]
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {"method": "POST"},
+        {"path": "health"},
+        {"expected_status": []},
+        {"expected_status": [[500, 200]]},
+        {"expected_status": [[200, 700]]},
+        {"body_match": "ok"},
+        {"method": "GET", "body_match": "x" * 257},
+    ],
+)
+def test_probe_spec_rejects_invalid_specs(spec: dict[str, Any]) -> None:
+    with pytest.raises(ValidationError):
+        ProbeSpec.model_validate(spec)
+
+
+def test_probe_from_item_reads_stored_and_queued_probes() -> None:
+    entry = Endpoint.model_validate(
+        {
+            "target_url": "https://example.com/status",
+            "is_active": True,
+            "created_at": 1,
+            "probe": {"method": "GET", "expected_status": [200], "body_match": "ok"},
+        }
+    )
+    probe = Probe("GET", None, ((200, 200),), "ok")
+
+    assert probe_from_item(endpoint_item(entry)["probe"]) == probe
+    assert probe_from_item(["GET", None, [[200, 200]], "ok"]) == probe
+    assert probe_from_item(None) == DEFAULT_PROBE
+
+
+@pytest.mark.parametrize(
+    "url, probe, path",
+    [
+        ("https://example.com/", DEFAULT_PROBE, "/"),
+        ("example.com", DEFAULT_PROBE, "/"),
+        ("https://example.com/health?deep=1", DEFAULT_PROBE, "/health?deep=1"),
+        ("https://example.com/health", Probe(path="/ready"), "/ready"),
+    ],
+)
+def test_request_path(url: str, probe: Probe, path: str) -> None:
+    assert request_path(url, probe) == path
+
+
+def test_check_response_rejects_unexpected_statuses_and_bodies() -> None:
+    check_response(DEFAULT_PROBE, 301, True)
+
+    with pytest.raises(UnexpectedResponse, match="unexpected status 500"):
+        check_response(DEFAULT_PROBE, 500, True)
+    with pytest.raises(UnexpectedResponse, match="'ok' not found"):
+        check_response(Probe("GET", body_match="ok"), 200, False)
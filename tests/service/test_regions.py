@@ -0,0 +1,131 @@
+# tests/service/test_regions.py
+
+import json
+
+import pytest
+
+from service.common import clients
+from service.common.models import Endpoint, endpoint_item
+from service.common.regions import assigned_regions, quorum_status
+from service.handlers import checker
+from service.prober.connections import ProbeTimings
+from tests.benchmarks.bench_handlers import FakeContext
+from tests.benchmarks.fakes import ENDPOINT_INDEXES, FakeDynamoDB, FakeSQS, FakeTable, returning
+
+REGIONS = ["eu-west-1", "us-east-1", "ap-southeast-2"]
+
+
+def test_assigned_regions_are_stable_and_spread() -> None:
+    ids = [f"id-{index}" for index in range(300)]
+    assignments = [assigned_regions(id, REGIONS, 2) for id in ids]
+
+    assert all(len(set(regions)) == 2 for regions in assignments)
+    assert assignments == [assigned_regions(id, REGIONS, 2) for id in ids]
+    for region in REGIONS:
+        assert 150 < sum(region in regions for regions in assignments) < 250
+    assert assigned_regions("id-0", REGIONS, 5) == assigned_regions("id-0", REGIONS, 3)
+
+
+def test_assigned_regions_only_move_endpoints_of_a_removed_region() -> None:
+    ids = [f"id-{index}" for index in range(300)]
+
+    for id in ids:
+        before = assigned_regions(id, REGIONS, 2)
+        after = assigned_regions(id, REGIONS[:2], 2)
+        if "ap-southeast-2" not in before:
+            assert after == before
+
+
+@pytest.mark.parametrize(
+    "statuses, expected, status",
+    [
+        ({"a": "online", "b": "online"}, 3, "online"),
+        ({"a": "online", "b": "offline"}, 3, None),
+        ({"a": "online", "b": "offline", "c": "offline"}, 3, "offline"),
+        ({"a": "online", "b": "unchecked", "c": "offline"}, 3, "offline"),
+        ({"a": "online", "b": "suppressed", "c": "unchecked"}, 3, "online"),
+        ({"a": "suppressed", "b": "unchecked"}, 2, "suppressed"),
+        ({"a": "unchecked"}, 1, "unchecked"),
+    ],
+)
+def test_quorum_status(statuses: dict[str, str], expected: int, status: str) -> None:
+    assert quorum_status(statuses, expected) == status
+
+
+def test_dispatch_regions_sends_each_region_only_its_endpoints(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    queues = {region: FakeSQS() for region in REGIONS}
+    monkeypatch.setattr(checker, "get_sqs", queues.__getitem__)
+    queue_urls = {region: f"https://sqs.{region}.amazonaws.com/1/checks" for region in REGIONS}
+    targets = [
+        checker.CheckTarget(f"id-{index}", f"host-{index}.example.com") for index in range(60)
+    ]
+
+    checker.dispatch_regions(queue_urls, REGIONS, 2, targets, 100, now=1000)
+
+    for region in REGIONS:
+        (body,) = queues[region].messages[queue_urls[region]]
+        message = json.loads(body)
+        ids = [endpoint[0] for endpoint in message["endpoints"]]
+        assert ids == [t.id for t in targets if region in assigned_regions(t.id, REGIONS, 2)]
+        assert (message["round"], message["regions"], message["replicas"]) == (1000, REGIONS, 2)
+
+
+def test_simulated_regions_agree_on_one_result_per_endpoint(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Every region is simulated in process: the coordinator dispatches to one fake queue per
+    # region and the worker runs once per region. The path from ap-southeast-2 is broken and it
+    # reports first.
+    endpoints = FakeTable(indexes=ENDPOINT_INDEXES)
+    for index in range(20):
+        entry = Endpoint(
+            target_url=f"https://host-{index}.example.com", is_active=True, created_at=1
+        )
+        endpoints.items[(entry.id,)] = endpoint_item(entry)
+    results = FakeTable(key=("endpoint_id", "checked_at"))
+    verdicts = FakeTable(key=("id", "round"))
+    tables = {"endpoints": endpoints, "results": results, "verdicts": verdicts}
+    monkeypatch.setattr(clients, "_dynamodb", FakeDynamoDB(tables))
+    monkeypatch.setattr(clients, "_tables", {})
+    queues = {region: FakeSQS() for region in REGIONS}
+    monkeypatch.setattr(checker, "get_sqs", queues.__getitem__)
+    queue_urls = {region: f"https://sqs.{region}.amazonaws.com/1/checks" for region in REGIONS}
+    monkeypatch.setenv("TABLE_NAME", "endpoints")
+    monkeypatch.setenv("RESULTS_TABLE_NAME", "results")
+    monkeypatch.setenv("VERDICT_TABLE_NAME", "verdicts")
+    monkeypatch.setenv("PROBE_REGIONS", ",".join(REGIONS))
+    monkeypatch.setenv("PROBE_REPLICAS", "3")
+    monkeypatch.setenv("CHECK_QUEUE_URLS", json.dumps(queue_urls))
+    monkeypatch.delenv("ALERT_TOPIC_ARN", raising=False)
+
+    def regional_probe(url: str, **kwargs: object) -> ProbeTimings:
+        if checker.get_probe_region() == "ap-southeast-2":
+            raise TimeoutError("timed out")
+        return ProbeTimings(None, None, None, 5.0, 10.0)
+
+    monkeypatch.setattr(checker, "probe_endpoint", regional_probe)
+    monkeypatch.setattr(checker, "prefetch_host", returning(None))
+
+    assert checker.main({}, FakeContext())["statusCode"] == 200  # type: ignore
+    for region in reversed(REGIONS):
+        monkeypatch.setenv("PROBE_REGION", region)
+        for body in queues[region].messages[queue_urls[region]]:
+            checker.worker({"Records": [{"body": body}]}, FakeContext())  # type: ignore
+
+    stored = list(results.items.values())
+    assert len(stored) == 20
+    assert all(item["status"] == "online" for item in stored)
+    assert all(item["regions"]["ap-southeast-2"] == "offline" for item in stored)
+    assert all(item["latency_ms"]["total"] == 10 for item in stored)
+    # Every endpoint is scheduled once, by the region that completed its quorum
+    assert all(item["next_check_at"] > 1 for item in endpoints.items.values())
+
+
+def test_stored_latencies_without_a_response_are_not_timings() -> None:
+    stored = checker.latency_item(ProbeTimings(None, 2.0, None, 3.0, 5.0))
+
+    assert checker.timings_from_item(stored) == ProbeTimings(None, 2.0, None, 3.0, 5.0)
+    assert checker.timings_from_item({"dns": stored["connect"]}) is None
+    assert checker.timings_from_item(None) is None
@@ -0,0 +1,114 @@
+# tests/service/test_resolver.py
+
+import socket
+import threading
+import time
+from typing import Any
+
+import pytest
+from typing_extensions import Self
+
+from service.prober.resolver import DNSFailure, Resolver, ResolverBusy
+from tests.benchmarks.fakes import returning
+
+
+class Clock:
+    def __init__(self: Self) -> None:
+        self.now = 0.0
+
+    def __call__(self: Self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def lookups(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    lookups: list[str] = []
+
+    def fake_getaddrinfo(host: str, *args: object, **kwargs: object) -> list[tuple[Any, ...]]:
+        lookups.append(host)
+        time.sleep(0.05)
+        if host.startswith("gone"):
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 0))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+    return lookups
+
+
+def test_resolve_caches_answers_until_they_expire(lookups: list[str]) -> None:
+    clock = Clock()
+    resolver = Resolver(ttl=300, clock=clock)
+
+    addresses, dns_ms = resolver.resolve("example.com", 443, timeout=1)
+    cached_addresses, cached_ms = resolver.resolve("example.com", 80, timeout=1)
+    clock.now = 301
+    resolver.resolve("example.com", 443, timeout=1)
+
+    assert (addresses, cached_addresses) == ([("192.0.2.1", 443)], [("192.0.2.1", 80)])
+    assert dns_ms is not None and dns_ms > 0 and cached_ms is None
+    assert lookups == ["example.com", "example.com"]
+
+
+def test_resolve_caches_failures_for_less(lookups: list[str]) -> None:
+    clock = Clock()
+    resolver = Resolver(ttl=300, negative_ttl=60, clock=clock)
+
+    for _ in range(3):
+        with pytest.raises(DNSFailure, match="dns lookup of gone.example.com failed"):
+            resolver.resolve("gone.example.com", 443, timeout=1)
+    clock.now = 61
+    with pytest.raises(DNSFailure):
+        resolver.resolve("gone.example.com", 443, timeout=1)
+
+    assert lookups == ["gone.example.com", "gone.example.com"]
+
+
+def test_resolve_returns_every_address_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    answers = [
+        (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("2001:db8::1", 0, 0, 0)),
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 0)),
+        (socket.AF_INET, socket.SOCK_STREAM, 132, "", ("192.0.2.1", 0)),
+    ]
+    monkeypatch.setattr(socket, "getaddrinfo", returning(answers))
+
+    addresses, _ = Resolver().resolve("example.com", 443, timeout=1)
+
+    assert addresses == [("2001:db8::1", 443), ("192.0.2.1", 443)]
+
+
+def test_concurrent_lookups_of_a_host_share_one_query(lookups: list[str]) -> None:
+    resolver = Resolver()
+    resolver.prefetch("example.com")
+    threads = [
+        threading.Thread(target=resolver.resolve, args=("example.com", 443, 1)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert lookups == ["example.com"]
+
+
+def test_resolve_stops_waiting_at_the_timeout(lookups: list[str]) -> None:
+    resolver = Resolver()
+
+    start = time.monotonic()
+    with pytest.raises(DNSFailure, match="timed out"):
+        resolver.resolve("slow.example.com", 443, timeout=0.01)
+
+    assert time.monotonic() - start < 0.04
+    # The lookup still completes and is cached for the next probe
+    time.sleep(0.1)
+    assert resolver.resolve("slow.example.com", 443, timeout=0.01)[1] is None
+
+
+def test_resolve_tells_a_busy_resolver_from_a_slow_lookup(lookups: list[str]) -> None:
+    resolver = Resolver(max_workers=1)
+    resolver.prefetch("slow.example.com")
+
+    # The only resolver thread is busy with another host, this lookup never starts
+    with pytest.raises(ResolverBusy):
+        resolver.resolve("queued.example.com", 443, timeout=0.01)
+    with pytest.raises(DNSFailure, match="timed out"):
+        resolver.resolve("slow.example.com", 443, timeout=0.01)
@@ -0,0 +1,24 @@
+# tests/service/test_scheduling.py
+
+from service.common.scheduling import MAX_CHECK_INTERVAL, MIN_CHECK_INTERVAL, next_interval
+
+
+def test_healthy_endpoints_back_off_up_to_the_limit() -> None:
+    intervals = [300]
+    for _ in range(4):
+        intervals.append(next_interval(300, intervals[-1], True))
+
+    assert intervals == [300, 600, 1200, 1200, 1200]
+
+
+def test_failing_endpoints_are_checked_more_often() -> None:
+    assert next_interval(300, 1200, False) == 75
+    assert next_interval(120, 120, False) == MIN_CHECK_INTERVAL
+
+
+def test_recovered_endpoints_restart_from_the_configured_interval() -> None:
+    assert next_interval(300, 75, True) == 300
+
+
+def test_intervals_never_exceed_the_maximum() -> None:
+    assert next_interval(MAX_CHECK_INTERVAL, MAX_CHECK_INTERVAL, True) == MAX_CHECK_INTERVAL
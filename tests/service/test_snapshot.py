@@ -0,0 +1,168 @@
+# tests/service/test_snapshot.py
+
+from typing import Any, Optional
+
+import pytest
+from boto3.dynamodb.types import Binary, TypeSerializer
+from botocore.exceptions import ClientError
+from typing_extensions import Self
+
+from service.common.dynamodb import ACTIVE_INDEX_KEY, active_shard
+from service.common.snapshot import SnapshotEntry, SnapshotReader, pack_entries, unpack_entries
+from service.handlers import snapshot
+from tests.benchmarks.fakes import ENDPOINT_INDEXES, FakeTable, returning
+
+serializer = TypeSerializer()
+
+
+class StubSnapshotTable:
+    def __init__(self: Self, items: dict[int, dict[str, Any]]) -> None:
+        self.items = items
+        self.reads: list[int] = []
+
+    def get_item(self: Self, Key: dict[str, int], **kwargs: object) -> dict[str, Any]:
+        self.reads.append(Key["shard"])
+        item = self.items.get(Key["shard"])
+        return {"Item": item} if item else {}
+
+
+def shard_item(entries: dict[str, tuple[str, int]], version: int) -> dict[str, Any]:
+    return {"version": version, "endpoints": Binary(pack_entries(entries))}
+
+
+def record(
+    event: str, id: str, new: Optional[dict[str, Any]], old: Optional[dict[str, Any]]
+) -> dict[str, Any]:
+    images: dict[str, Any] = {"Keys": {"id": serializer.serialize(id)}}
+    for name, image in (("NewImage", new), ("OldImage", old)):
+        if image:
+            images[name] = {key: serializer.serialize(value) for key, value in image.items()}
+    return {"eventName": event, "dynamodb": images}
+
+
+def test_pack_entries_round_trips() -> None:
+    entries = {"b": ("https://b.example.com/", 2), "a": ("https://a.example.com/", 1)}
+
+    assert unpack_entries(pack_entries(entries)) == entries
+
+
+def test_reader_only_fetches_shards_whose_version_moved() -> None:
+    table = StubSnapshotTable(
+        {
+            -1: {"v0": 1, "v1": 1},
+            0: shard_item({"a": ("https://a.example.com/", 1)}, 1),
+            1: shard_item({"b": ("https://b.example.com/", 2)}, 1),
+        }
+    )
+    reader = SnapshotReader()
+
+    assert reader.refresh(table)  # type: ignore
+    table.reads.clear()
+    table.items[-1]["v1"] = 2
+    table.items[1] = shard_item({"c": ("https://c.example.com/", 3)}, 2)
+    assert reader.refresh(table)  # type: ignore
+
+    assert table.reads == [-1, 1]
+    assert reader.ids == ["a", "c"]
+
+
+def test_reader_without_snapshot_reports_missing() -> None:
+    assert SnapshotReader().refresh(StubSnapshotTable({})) is False  # type: ignore
+
+
+def test_reader_pages_in_id_order() -> None:
+    entries = {f"id-{index}": (f"https://{index}.example.com/", index) for index in range(5)}
+    table = StubSnapshotTable({-1: {"v0": 1}, 0: shard_item(entries, 1)})
+    reader = SnapshotReader()
+    reader.refresh(table)  # type: ignore
+
+    first, cursor = reader.page(3, None)
+    second, last = reader.page(3, cursor)
+
+    assert [row[0] for row in first + second] == [f"id-{index}" for index in range(5)]
+    assert cursor == {"after": "id-2"} and last is None
+
+
+def test_endpoint_changes_skip_schedule_updates() -> None:
+    active = {"id": "a", "target_url": "https://a.example.com/", "is_active": True, "created_at": 1}
+    records = [
+        record("INSERT", "a", active, None),
+        record("MODIFY", "b", {**active, "id": "b", "next_check_at": 9}, {**active, "id": "b"}),
+        record("MODIFY", "c", {**active, "id": "c", "is_active": False}, {**active, "id": "c"}),
+        record("REMOVE", "d", None, {**active, "id": "d"}),
+    ]
+
+    changes = snapshot.endpoint_changes(records)
+
+    flattened = {id: entry for shard in changes.values() for id, entry in shard.items()}
+    assert flattened == {"a": ("https://a.example.com/", 1), "c": None, "d": None}
+    assert set(changes[active_shard("a")]) >= {"a"}
+
+
+def test_apply_changes_retries_when_a_concurrent_writer_won(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    table = StubSnapshotTable({0: shard_item({"a": ("https://a.example.com/", 1)}, 4)})
+    writes: list[tuple[dict[str, tuple[str, int]], Optional[int]]] = []
+
+    def write_shard(table_name: str, shard: int, packed: bytes, version: Optional[int]) -> None:
+        writes.append((unpack_entries(packed), version))
+        if len(writes) == 1:
+            error = {"Code": "TransactionCanceledException", "Message": "conflict"}
+            raise ClientError({"Error": error}, "TransactWriteItems")  # type: ignore
+
+    monkeypatch.setattr(snapshot, "get_table", returning(table))
+    monkeypatch.setattr(snapshot, "write_shard", write_shard)
+
+    snapshot.apply_changes("endpoints", "snapshots", 0, {"b": ("https://b.example.com/", 2)})
+
+    assert len(writes) == 2
+    assert writes[1] == (
+        {"a": ("https://a.example.com/", 1), "b": ("https://b.example.com/", 2)},
+        4,
+    )
+
+
+def test_first_write_publishes_every_shard(monkeypatch: pytest.MonkeyPatch) -> None:
+    endpoints = FakeTable(indexes=ENDPOINT_INDEXES)
+    for index in range(20):
+        id = f"id-{index}"
+        endpoints.put_item(
+            Item={
+                "id": id,
+                "target_url": f"https://{index}.example.com/",
+                "created_at": index,
+                ACTIVE_INDEX_KEY: active_shard(id),
+            }
+        )
+    snapshots = FakeTable(key=("shard",))
+    tables = {"endpoints": endpoints, "snapshots": snapshots}
+    monkeypatch.setattr(snapshot, "get_table", tables.__getitem__)
+    added: dict[str, Optional[SnapshotEntry]] = {"id-20": ("https://20.example.com/", 20)}
+
+    snapshot.update_snapshot("endpoints", "snapshots", {active_shard("id-20"): added})
+
+    reader = SnapshotReader()
+    assert reader.refresh(snapshots)  # type: ignore
+    assert reader.ids == sorted(f"id-{index}" for index in range(21))
+
+
+def test_oversized_shard_disables_the_snapshot(monkeypatch: pytest.MonkeyPatch) -> None:
+    snapshots = FakeTable(key=("shard",))
+    snapshots.put_item(Item={"shard": -1, "v0": 1})
+    snapshots.put_item(Item={"shard": 0, **shard_item({"a": ("https://a.example.com/", 1)}, 1)})
+    writes: list[int] = []
+    monkeypatch.setattr(snapshot, "get_table", returning(snapshots))
+
+    def write_shard(snapshot_table_name: str, shard: int, *args: object) -> None:
+        writes.append(shard)
+
+    monkeypatch.setattr(snapshot, "write_shard", write_shard)
+    monkeypatch.setattr(snapshot, "MAX_SHARD_BYTES", 10)
+
+    snapshot.update_snapshot("endpoints", "snapshots", {0: {"b": ("https://b.example.com/", 2)}})
+    # Later changes leave the stale shard alone
+    snapshot.update_snapshot("endpoints", "snapshots", {0: {"c": None}})
+
+    assert writes == []
+    assert SnapshotReader().refresh(snapshots) is False  # type: ignore
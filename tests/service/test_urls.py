@@ -0,0 +1,34 @@
+# tests/service/test_urls.py
+
+import pytest
+
+from service.common.urls import canonical_url, endpoint_id
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("HTTP://Example.COM:80/a/", "http://example.com/a"),
+        ("https://example.com:443", "https://example.com/"),
+        ("https://example.com:8443/#top", "https://example.com:8443/"),
+        ("https://example.com./path?q=1", "https://example.com/path?q=1"),
+        ("Example.com", "example.com/"),
+        ("example.com:8080/a//", "example.com:8080/a"),
+        ("https://[::1]:443/", "https://[::1]/"),
+    ],
+)
+def test_canonical_url(url: str, expected: str) -> None:
+    assert canonical_url(url) == expected
+
+
+@pytest.mark.parametrize("url", ["ftp://example.com", "https://", "https://example.com:99999"])
+def test_canonical_url_rejects_invalid_urls(url: str) -> None:
+    with pytest.raises(ValueError):
+        canonical_url(url)
+
+
+def test_endpoint_id_is_stable_per_canonical_url() -> None:
+    assert endpoint_id(canonical_url("HTTPS://Example.com/")) == endpoint_id(
+        canonical_url("https://example.com:443")
+    )
+    assert endpoint_id("https://example.com/") != endpoint_id("http://example.com/")
@@ -0,0 +1,139 @@
+# tests/service/test_urls_batch_post.py
+
+import json
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from typing_extensions import Self
+
+from service.common.dynamodb import batch_existing_keys, put_new_items
+from service.common.urls import endpoint_id
+from service.handlers import urls_batch_post
+from tests.benchmarks.fakes import response_body, returning
+
+deserializer = TypeDeserializer()
+
+
+class StubDynamoDB:
+    # Conditional puts fail for ids already in `existing`, lookups leave the `throttled` ids
+    # unprocessed
+    def __init__(
+        self: Self, existing: tuple[str, ...] = (), throttled: tuple[str, ...] = ()
+    ) -> None:
+        self.existing = set(existing)
+        self.throttled = set(throttled)
+        self.written: list[dict[str, Any]] = []
+        self.meta = SimpleNamespace(client=self)
+
+    def put_item(
+        self: Self, TableName: str, Item: dict[str, Any], **kwargs: object
+    ) -> dict[str, Any]:
+        item = {name: deserializer.deserialize(value) for name, value in Item.items()}
+        if item["id"] in self.existing:
+            error = {"Code": "ConditionalCheckFailedException", "Message": "exists"}
+            raise ClientError({"Error": error}, "PutItem")  # type: ignore
+        self.existing.add(item["id"])
+        self.written.append(item)
+        return {}
+
+    def batch_get_item(self: Self, RequestItems: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        (table_name, request), *_ = RequestItems.items()
+        keys = [key for key in request["Keys"] if key["id"] not in self.throttled]
+        unprocessed = [key for key in request["Keys"] if key["id"] in self.throttled]
+        found = [key for key in keys if key["id"] in self.existing]
+        response: dict[str, Any] = {"Responses": {table_name: found}, "UnprocessedKeys": {}}
+        if unprocessed:
+            response["UnprocessedKeys"] = {table_name: {**request, "Keys": unprocessed}}
+        return response
+
+
+def test_put_new_items_never_overwrites_existing_items() -> None:
+    dynamodb = StubDynamoDB(existing=("2",))
+    items = [
+        {"id": str(index), "target_url": f"https://{index}.example.com/"} for index in range(4)
+    ]
+
+    failed = put_new_items(dynamodb, "table", "id", items)  # type: ignore
+
+    assert failed == {"2": "duplicate"}
+    assert [item["id"] for item in dynamodb.written] == ["0", "1", "3"]
+
+
+def test_batch_existing_keys_reports_keys_left_unprocessed() -> None:
+    dynamodb = StubDynamoDB(existing=("1", "2"), throttled=("2", "3"))
+
+    existing, unprocessed = batch_existing_keys(
+        dynamodb, "table", "id", ["1", "2", "3", "4"], max_attempts=3, base_delay=0  # type: ignore
+    )
+
+    assert existing == {"1"}
+    assert unprocessed == ["2", "3"]
+
+
+def test_main_reports_a_result_per_endpoint(monkeypatch: pytest.MonkeyPatch) -> None:
+    dynamodb = StubDynamoDB()
+    monkeypatch.setattr(urls_batch_post, "get_dynamodb", lambda: dynamodb)
+    body = {"endpoints": [{"target_url": "https://example.com"}, {"target_url": 42}, "oops"]}
+
+    response = urls_batch_post.main({"body": json.dumps(body)}, None)  # type: ignore
+
+    results = response_body(response)["message"]
+    assert response["statusCode"] == 200
+    assert [result["status"] for result in results] == ["created", "invalid", "invalid"]
+    assert results[0]["id"] == dynamodb.written[0]["id"]
+    assert dynamodb.written[0]["active_shard"] is not None
+
+
+def test_main_skips_duplicate_endpoints(monkeypatch: pytest.MonkeyPatch) -> None:
+    dynamodb = StubDynamoDB(existing=(endpoint_id("https://registered.example.com/"),))
+    monkeypatch.setattr(urls_batch_post, "get_dynamodb", lambda: dynamodb)
+    urls = ["https://example.com", "HTTPS://Example.com:443/", "https://registered.example.com/"]
+    body = {"endpoints": [{"target_url": url} for url in urls]}
+
+    response = urls_batch_post.main({"body": json.dumps(body)}, None)  # type: ignore
+
+    results = response_body(response)["message"]
+    assert [result["status"] for result in results] == ["created", "duplicate", "duplicate"]
+    assert results[1]["id"] == results[0]["id"]
+    assert [item["target_url"] for item in dynamodb.written] == ["https://example.com/"]
+
+
+@pytest.mark.parametrize("body", [None, "{}", '{"endpoints": []}', "[1, 2]"])
+def test_main_rejects_requests_without_endpoints(body: str) -> None:
+    response = urls_batch_post.main({"body": body}, None)  # type: ignore
+
+    assert response["statusCode"] == 400
+
+
+def test_main_reports_endpoints_it_could_not_look_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    throttled = endpoint_id("https://throttled.example.com/")
+    dynamodb = StubDynamoDB(throttled=(throttled,))
+    monkeypatch.setattr(urls_batch_post, "get_dynamodb", lambda: dynamodb)
+    urls = ["https://example.com", "https://throttled.example.com/"]
+    body = {"endpoints": [{"target_url": url} for url in urls]}
+
+    response = urls_batch_post.main({"body": json.dumps(body)}, None)  # type: ignore
+
+    results = response_body(response)["message"]
+    assert [result["status"] for result in results] == ["created", "failed"]
+    assert [item["target_url"] for item in dynamodb.written] == ["https://example.com/"]
+
+
+def test_main_reports_urls_registered_since_the_lookup(monkeypatch: pytest.MonkeyPatch) -> None:
+    dynamodb = StubDynamoDB()
+    monkeypatch.setattr(urls_batch_post, "get_dynamodb", lambda: dynamodb)
+    # Registered by a concurrent request between the lookup and the put
+    monkeypatch.setattr(
+        urls_batch_post, "batch_existing_keys", returning((set[str](), list[str]()))
+    )
+    dynamodb.existing.add(endpoint_id("https://example.com/"))
+    body = {"endpoints": [{"target_url": "https://example.com"}]}
+
+    response = urls_batch_post.main({"body": json.dumps(body)}, None)  # type: ignore
+
+    (result,) = response_body(response)["message"]
+    assert result["status"] == "duplicate"
+    assert dynamodb.written == []
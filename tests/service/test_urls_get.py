@@ -0,0 +1,140 @@
+# tests/service/test_urls_get.py
+
+import json
+from typing import Any, Iterator, Optional
+
+import pytest
+
+from service.common.pagination import encode_next_token
+from service.common.snapshot import SnapshotReader
+from service.handlers import urls_get
+from tests.benchmarks.fakes import returning
+from tests.benchmarks.stubs import StubClient, StubTable, make_endpoint_items
+from tests.service.test_snapshot import StubSnapshotTable, shard_item
+
+
+@pytest.fixture
+def table(monkeypatch: pytest.MonkeyPatch) -> Iterator[StubTable]:
+    table = StubTable(make_endpoint_items(250, inactive_every=5), page_size=1_000, latency=0)
+    monkeypatch.setattr(urls_get, "get_table", returning(table))
+    monkeypatch.setenv("LISTING_CACHE_TTL", "60")
+    urls_get.listing_cache.clear()
+    yield table
+    urls_get.listing_cache.clear()
+
+
+def request(
+    limit: Optional[str] = None, next_token: Optional[str] = None, etag: Optional[str] = None
+) -> dict[str, Any]:
+    parameters = {"limit": limit, "next_token": next_token}
+    event: Any = {
+        "queryStringParameters": {key: value for key, value in parameters.items() if value},
+        "headers": {"If-None-Match": etag} if etag else None,
+    }
+    return urls_get.main(event, None)  # type: ignore
+
+
+def test_pages_through_every_active_endpoint(table: StubTable) -> None:
+    ids: list[str] = []
+    next_token = None
+    while True:
+        response = request(limit="30", next_token=next_token)
+        body = json.loads(response["body"])
+        assert len(body["message"]) <= 30
+        ids.extend(record["id"] for record in body["message"])
+        next_token = body["next_token"]
+        if not next_token:
+            break
+
+    assert sorted(ids) == sorted(item["id"] for item in table.items if item["is_active"])
+
+
+def test_repeated_request_is_served_from_cache(table: StubTable) -> None:
+    first = request(limit="10")
+    requests = table.requests
+
+    second = request(limit="10")
+
+    assert second["body"] == first["body"]
+    assert table.requests == requests
+
+
+def test_matching_etag_returns_not_modified_without_table_read(table: StubTable) -> None:
+    etag = request()["headers"]["ETag"]
+    requests = table.requests
+
+    response = request(etag=etag)
+
+    assert response["statusCode"] == 304
+    assert response["body"] == ""
+    assert table.requests == requests
+
+
+def test_stale_etag_returns_listing(table: StubTable) -> None:
+    response = request(etag='"stale"')
+
+    assert response["statusCode"] == 200
+    assert response["headers"]["ETag"] != '"stale"'
+
+
+@pytest.mark.parametrize(
+    "limit, next_token",
+    [
+        ("0", None),
+        ("ten", None),
+        (None, "%%%"),
+        (None, encode_next_token({"foo": 1})),
+        (None, encode_next_token({"shard": 0, "key": {"offset": 30}})),
+    ],
+)
+def test_invalid_page_request(table: StubTable, limit: str, next_token: str) -> None:
+    assert request(limit=limit, next_token=next_token)["statusCode"] == 400
+
+
+def test_listing_reads_the_snapshot_when_one_exists(
+    table: StubTable, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    active = {item["id"]: item for item in table.items if item["is_active"]}
+    entries = {id: (item["target_url"], item["created_at"]) for id, item in active.items()}
+    snapshots = StubSnapshotTable({-1: {"v0": 1}, 0: shard_item(entries, 1)})
+
+    def get_table(table_name: str) -> object:
+        return snapshots if table_name == "snapshots" else table
+
+    monkeypatch.setattr(urls_get, "get_table", get_table)
+    monkeypatch.setattr(urls_get, "snapshot", SnapshotReader())
+    monkeypatch.setenv("SNAPSHOT_TABLE_NAME", "snapshots")
+
+    ids: list[str] = []
+    next_token = None
+    while True:
+        body = json.loads(request(limit="75", next_token=next_token)["body"])
+        ids.extend(record["id"] for record in body["message"])
+        next_token = body["next_token"]
+        if not next_token:
+            break
+
+    assert ids == sorted(active)
+    assert table.requests == 0
+
+
+def test_client_reads_serve_the_same_pages(
+    table: StubTable, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def listing() -> list[str]:
+        bodies: list[str] = []
+        next_token = None
+        while True:
+            bodies.append(request(limit="40", next_token=next_token)["body"])
+            urls_get.listing_cache.clear()
+            next_token = json.loads(bodies[-1])["next_token"]
+            if not next_token:
+                return bodies
+
+    monkeypatch.delenv("SNAPSHOT_TABLE_NAME", raising=False)
+    resource_bodies = listing()
+    monkeypatch.setenv("DYNAMODB_CLIENT_READS", "true")
+    monkeypatch.setattr(urls_get, "get_table", returning(None))
+    monkeypatch.setattr(urls_get, "get_dynamodb_client", lambda: StubClient(table))
+
+    assert listing() == resource_bodies
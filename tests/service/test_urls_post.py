@@ -0,0 +1,47 @@
+# tests/service/test_urls_post.py
+
+import json
+from typing import Any
+
+import pytest
+
+from service.handlers import urls_post
+from tests.benchmarks.fakes import ENDPOINT_INDEXES, FakeTable, returning
+
+
+@pytest.fixture
+def table(monkeypatch: pytest.MonkeyPatch) -> FakeTable:
+    table = FakeTable(indexes=ENDPOINT_INDEXES)
+    monkeypatch.setattr(urls_post, "get_table", returning(table))
+    return table
+
+
+def request(body: dict[str, Any]) -> dict[str, Any]:
+    event: Any = {"body": json.dumps(body)}
+    return urls_post.main(event, None)  # type: ignore
+
+
+def test_post_registers_an_endpoint_once(table: FakeTable) -> None:
+    first = request({"target_url": "https://example.com"})
+    second = request({"target_url": "HTTPS://Example.com/"})
+
+    assert (first["statusCode"], second["statusCode"]) == (200, 409)
+    assert len(table.items) == 1
+
+
+@pytest.mark.parametrize(
+    "body, message",
+    [
+        ({"target_url": "ftp://example.com"}, "scheme"),
+        ({"target_url": "https://example.com", "check_interval": 1}, "greater than or equal"),
+        ({"target_url": "https://example.com", "probe": {"method": "POST"}}, "'HEAD' or 'GET'"),
+    ],
+)
+def test_post_rejects_invalid_endpoints(
+    table: FakeTable, body: dict[str, Any], message: str
+) -> None:
+    response = request(body)
+
+    assert response["statusCode"] == 400
+    assert message in json.loads(response["body"])["message"]
+    assert not table.items
@@ -0,0 +1,46 @@
+# tests/service/test_urls_put.py
+
+import json
+from typing import Any
+
+import pytest
+
+from service.common.dynamodb import ACTIVE_INDEX_KEY, DUE_INDEX_KEY
+from service.handlers import checker, urls_put
+from tests.benchmarks.fakes import ENDPOINT_INDEXES, FakeTable, returning
+
+
+@pytest.fixture
+def table(monkeypatch: pytest.MonkeyPatch) -> FakeTable:
+    table = FakeTable(indexes=ENDPOINT_INDEXES)
+    table.put_item(Item={"id": "id-0", "target_url": "https://example.com", "is_active": False})
+    monkeypatch.setattr(urls_put, "get_table", returning(table))
+    monkeypatch.setattr(checker, "get_table", returning(table))
+    return table
+
+
+def request(id: str, is_active: bool) -> dict[str, Any]:
+    event: Any = {"pathParameters": {"id": id}, "body": json.dumps({"is_active": is_active})}
+    return urls_put.main(event, None)  # type: ignore
+
+
+def test_put_activates_a_registered_endpoint(table: FakeTable) -> None:
+    response = request("id-0", True)
+
+    assert response["statusCode"] == 200
+    assert [target.id for target in checker.scan_table("endpoints", 2**40)] == ["id-0"]
+
+
+@pytest.mark.parametrize("is_active", [True, False])
+def test_put_to_an_unknown_id_creates_nothing(table: FakeTable, is_active: bool) -> None:
+    response = request("id-1", is_active)
+
+    assert response["statusCode"] == 404
+    assert [item["id"] for item in table.items.values()] == ["id-0"]
+
+
+def test_checker_skips_items_without_a_target_url(table: FakeTable) -> None:
+    table.put_item(Item={"id": "id-1", ACTIVE_INDEX_KEY: 0, DUE_INDEX_KEY: 0})
+    request("id-0", True)
+
+    assert [target.id for target in checker.scan_table("endpoints", 2**40)] == ["id-0"]